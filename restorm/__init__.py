@@ -1 +1,3 @@
 __version__ = (0, 3, 1)
+
+from restorm.sessions import session  # NOQA
@@ -0,0 +1,212 @@
+"""
+Aggregation over querysets.
+
+``RestQuerySet.aggregate()`` returns a dictionary with the result of each
+aggregate, keyed by its alias (``<field>__<name>`` by default)::
+
+    from restorm.aggregates import Count, Sum
+
+    Book.objects.all().aggregate(Sum('price'), books=Count('id'))
+    # {'price__sum': Decimal('1234.50'), 'books': 100}
+
+    Book.objects.all().group_by('author').aggregate(Sum('price'))
+    # [{'author': 1, 'price__sum': Decimal('180.25')}, ...]
+
+If the resource ``Meta`` declares an ``aggregate`` URI pattern, the API
+computes the aggregates. It is requested with the query parameters of the
+queryset, an ``aggregate`` query parameter with a comma separated list of the
+default aliases, and a ``group_by`` query parameter with a comma separated
+list of fields, if any. The response is an object mapping the default aliases
+to their values, or a list of such objects that also contain the group_by
+fields.
+
+Otherwise, the rows are streamed page by page and each aggregate is updated
+per page, such that only one page is kept in memory. Pages of numbers are
+aggregated with NumPy if it is installed.
+"""
+from decimal import Decimal, InvalidOperation
+
+NUMPY_FOUND = True
+try:
+    import numpy
+except ImportError:
+    NUMPY_FOUND = False
+
+
+def _number(value):
+    """
+    Returns ``value`` as a number, or ``None`` if it is not one. Decimals are
+    often sent as strings.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return value
+    try:
+        return Decimal('%s' % value)
+    except InvalidOperation:
+        return None
+
+
+def _numeric_array(values):
+    """
+    Returns ``values`` as a NumPy array if NumPy is installed and they are
+    all integers or floats, or ``None`` otherwise.
+    """
+    if not NUMPY_FOUND or not values:
+        return None
+    array = numpy.asarray(values)
+    if array.dtype.kind not in 'iuf':
+        return None
+    return array
+
+
+class Aggregate(object):
+    """
+    Computes a value over the values of ``field``, a page at a time. The state
+    of the computation starts as ``initial()``, is updated with ``add()`` for
+    the (non-null) values of each page and is turned into the result with
+    ``result()``.
+    """
+    name = None
+
+    def __init__(self, field):
+        self.field = field
+
+    @property
+    def default_alias(self):
+        return '%s__%s' % (self.field, self.name)
+
+    def initial(self):
+        return None
+
+    def add(self, state, values):
+        raise NotImplementedError()
+
+    def result(self, state):
+        return state
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.field)
+
+
+class Count(Aggregate):
+    name = 'count'
+
+    def initial(self):
+        return 0
+
+    def add(self, state, values):
+        return state + len(values)
+
+
+class Sum(Aggregate):
+    name = 'sum'
+
+    def add(self, state, values):
+        if not values:
+            return state
+        array = _numeric_array(values)
+        if array is not None:
+            total = array.sum().item()
+        else:
+            total = sum(_number(v) for v in values)
+        if state is None:
+            return total
+        return state + total
+
+
+class Avg(Aggregate):
+    name = 'avg'
+
+    def initial(self):
+        return (0, 0)
+
+    def add(self, state, values):
+        array = _numeric_array(values)
+        if array is not None:
+            total = array.sum().item()
+        else:
+            total = sum(_number(v) for v in values)
+        return (state[0] + total, state[1] + len(values))
+
+    def result(self, state):
+        total, count = state
+        if not count:
+            return None
+        if isinstance(total, Decimal):
+            return total / count
+        return float(total) / count
+
+
+class _Extreme(Aggregate):
+    """
+    The smallest or largest value. Values are compared as numbers if they
+    are numbers (or numeric strings), and the value is returned as it was
+    sent by the API.
+    """
+    select = None
+
+    def add(self, state, values):
+        if not values:
+            return state
+        array = _numeric_array(values)
+        if array is not None:
+            value = getattr(array, self.select.__name__)().item()
+            key = value
+        else:
+            numbers = [_number(v) for v in values]
+            if None in numbers:
+                key = value = self.select(values)
+            else:
+                key, value = self.select(
+                    zip(numbers, values), key=lambda pair: pair[0])
+        if state is None or self.select(key, state[0]) is key:
+            return (key, value)
+        return state
+
+    def result(self, state):
+        return None if state is None else state[1]
+
+
+class Min(_Extreme):
+    name = 'min'
+    select = min
+
+
+class Max(_Extreme):
+    name = 'max'
+    select = max
+
+
+class Aggregation(object):
+    """
+    The state of the aggregates of a single group.
+    """
+    def __init__(self, aggregates):
+        self.aggregates = aggregates
+        self.states = [aggregate.initial() for alias, aggregate in aggregates]
+
+    def add(self, rows):
+        for idx, (alias, aggregate) in enumerate(self.aggregates):
+            values = [row.get(aggregate.field) for row in rows]
+            values = [v for v in values if v is not None]
+            self.states[idx] = aggregate.add(self.states[idx], values)
+
+    def result(self):
+        return dict(
+            (alias, aggregate.result(state))
+            for (alias, aggregate), state in zip(self.aggregates, self.states))
+
+
+def get_aggregates(args, kwargs):
+    """
+    Returns a list of tuples of the alias and the aggregate for positional
+    (default alias) and keyword aggregates.
+    """
+    aggregates = [(aggregate.default_alias, aggregate) for aggregate in args]
+    aggregates.extend(sorted(kwargs.items()))
+    for alias, aggregate in aggregates:
+        if not isinstance(aggregate, Aggregate):
+            raise TypeError('%r is not an aggregate.' % (aggregate,))
+    return aggregates
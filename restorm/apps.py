@@ -154,6 +154,7 @@ class RestormAppConfig(AppConfig):
         self.check_models_ready()
         from .registry import registry
 
+        registry.prepare_resources()
         for resource in registry.all_resources[self.label].values():
             yield resource
 
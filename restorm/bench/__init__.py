@@ -0,0 +1,89 @@
+"""
+Benchmarks for RestORM.
+
+Each benchmark module can be run as a script and prints its results as JSON,
+for example::
+
+    $ python -m restorm.bench.middleware --number 10000
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+
+def measure(func, number=1000, repeat=5):
+    """
+    Calls ``func`` ``number`` times, ``repeat`` times over, and returns a
+    dictionary with the best and mean time per call in seconds.
+    """
+    timer = timeit.Timer(func)
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'best': min(times),
+        'mean': sum(times) / len(times),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def measure_allocations(func, number=100):
+    """
+    Calls ``func`` ``number`` times while tracing memory allocations and
+    returns a dictionary with the peak of allocated memory in bytes and the
+    memory in bytes still allocated per call afterwards.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        # Warm up caches, such that only the cost per call is measured.
+        func()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(number):
+            func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {
+        'peak_bytes': peak - start,
+        'retained_bytes_per_call': (current - start) / number,
+    }
+
+
+def setup_django():
+    """
+    Sets up Django, with default settings if no settings module is given.
+    """
+    import django
+    from django.conf import settings
+
+    if not settings.configured and \
+            'DJANGO_SETTINGS_MODULE' not in os.environ:
+        settings.configure()
+    django.setup()
+
+
+def get_parser(description, number=1000):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--number', type=int, default=number,
+        help='Number of calls per measurement (default: %(default)s).')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='Number of measurements (default: %(default)s).')
+    return parser
+
+
+def report(results, stream=None):
+    """
+    Writes ``results`` as JSON to ``stream`` (standard output by default).
+    """
+    if stream is None:
+        stream = sys.stdout
+    json.dump(results, stream, indent=2, sort_keys=True)
+    stream.write('\n')
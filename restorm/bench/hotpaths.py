@@ -0,0 +1,207 @@
+"""
+Measures the time and memory allocations of RestORM hot paths.
+
+All requests are handled by a mock API client that returns pre-encoded
+responses, so no network is involved and the results of different versions
+can be compared::
+
+    $ python -m restorm.bench.hotpaths > before.json
+    $ python -m restorm.bench.hotpaths fetch_page_1k fetch_page_10k
+
+The benchmarks are:
+
+* ``resource_init``: hydrating a ``Resource`` instance from a row.
+* ``fetch_page_1k`` and ``fetch_page_10k``: ``RestQuerySet._fetch_page()``
+  on a page of 1000 and 10000 rows, including decoding the response.
+* ``reverse`` and ``get_absolute_url``: building an item URL with
+  ``utils.reverse()`` and ``ResourcePattern.get_absolute_url()``.
+* ``restify``: ``restify()`` of 100 rows.
+* ``serialize`` and ``deserialize``: ``JSONClientMixin.serialize()`` and
+  ``deserialize()`` of 1000 rows.
+* ``related_get`` and ``related_get_session``: ``RelatedResource.__get__()``
+  with a request, and from the identity map of a session.
+* ``clean_request_data``: cleaning the payload of ``Resource.save()``.
+
+``--number`` is the number of calls of the cheapest benchmarks; expensive
+benchmarks are called proportionally fewer times.
+"""
+import json
+
+from requests import Response
+
+from restorm.bench import (
+    get_parser, measure, measure_allocations, report, setup_django)
+from restorm.conf import settings
+from restorm.examples.mock.api import CatalogApiClient
+
+
+class PrerenderedCatalogApiClient(CatalogApiClient):
+    """
+    Catalog API client that encodes each response once, with authors at
+    ``author/<id>``, such that the cost of the mock API is not measured.
+    """
+    def __init__(self, *args, **kwargs):
+        super(PrerenderedCatalogApiClient, self).__init__(*args, **kwargs)
+        self._rendered = {}
+
+    def render(self, request):
+        path = request.uri[len(self.root_uri):]
+        if path.startswith('author/'):
+            pk = int(path[len('author/'):])
+            response = Response()
+            response.status_code = 200
+            response.headers = {'Content-Type': 'application/json'}
+            response._content = json.dumps(
+                {'id': pk, 'name': 'Author %d' % pk})
+            return response
+        return super(
+            PrerenderedCatalogApiClient, self).get_response_from_request(
+                request)
+
+    def get_response_from_request(self, request):
+        key = (request.method, request.uri)
+        rendered = self._rendered.get(key)
+        if rendered is None or request.method != 'GET':
+            response = self.render(request)
+            rendered = self._rendered[key] = (
+                response.status_code, dict(response.headers),
+                response._content)
+        response = Response()
+        response.status_code, headers, response._content = rendered
+        response.headers = dict(headers)
+        return response
+
+
+_resources = None
+
+
+def get_resources():
+    """
+    Returns the ``Author`` and ``Book`` resources used by the benchmarks,
+    with a catalog of 10000 books.
+    """
+    global _resources
+    if _resources is not None:
+        return _resources
+
+    setup_django()
+    from restorm import fields
+    from restorm.resource import Resource
+
+    catalog_client = PrerenderedCatalogApiClient(size=10000)
+
+    class Author(Resource):
+        id = fields.IntegerField(primary_key=True)
+        name = fields.CharField()
+
+        class Meta:
+            resource_name = 'bench_author'
+            list = r'^author/$'
+            item = r'^author/(?P<id>\d+)$'
+            client = catalog_client
+
+    class Book(Resource):
+        id = fields.IntegerField(primary_key=True)
+        isbn = fields.CharField()
+        title = fields.CharField()
+        author = fields.ToOneField('author', Author)
+        price = fields.DecimalField()
+        pages = fields.IntegerField()
+        in_stock = fields.BooleanField()
+        created = fields.CharField()
+
+        class Meta:
+            resource_name = 'bench_book'
+            list = r'^book/$'
+            item = r'^book/(?P<id>\d+)$'
+            client = catalog_client
+            page_size = 1000
+
+    _resources = Author, Book
+    return _resources
+
+
+def fetch_page(book, page_size):
+    queryset = book.objects.all()
+    queryset._page_size = page_size
+    queryset._fetch_page(0)
+
+
+def get_benchmarks():
+    """
+    Returns a list of tuples of the name, the function and the relative cost
+    of each benchmark.
+    """
+    import restorm
+    from restorm.patterns import ResourcePattern
+    from restorm.rest import restify
+    from restorm.utils import reverse
+
+    Author, Book = get_resources()
+    client = Book._meta.client
+    rows = list(client.books.values())[:1000]
+    encoded = client.serialize(rows)
+    book = Book(
+        data=dict(rows[0]), client=client,
+        absolute_url='http://localhost/api/book/1')
+    item_pattern = ResourcePattern.parse(Book._meta.item)
+    # A book to save, with a related author object.
+    changed_book = Book(
+        data=dict(rows[0], author=Author(data={'id': 2}, client=client)),
+        client=client, absolute_url='http://localhost/api/book/1')
+
+    session = restorm.session()
+    with session:
+        book.author
+
+    def related_get_session():
+        with session:
+            book.author
+
+    return [
+        ('resource_init', lambda: Book(
+            data=rows[0], client=client,
+            absolute_url='http://localhost/api/book/1'), 1),
+        ('fetch_page_1k', lambda: fetch_page(Book, 1000), 1000),
+        ('fetch_page_10k', lambda: fetch_page(Book, 10000), 10000),
+        ('reverse', lambda: reverse(Book._meta.item, id=1), 1),
+        ('get_absolute_url', lambda: item_pattern.get_absolute_url(
+            root=client.root_uri, id=1), 1),
+        ('restify', lambda: restify(rows[:100], book), 100),
+        ('serialize', lambda: client.serialize(rows), 1000),
+        ('deserialize', lambda: client.deserialize(encoded), 1000),
+        ('related_get', lambda: book.author, 10),
+        ('related_get_session', related_get_session, 10),
+        ('clean_request_data', changed_book._clean_request_data, 1),
+    ]
+
+
+def run(number=10000, repeat=5, names=None):
+    results = {}
+    timeout = settings.QUERY_CACHE_TIMEOUT
+    # Every fetch should request and hydrate the page again.
+    settings.QUERY_CACHE_TIMEOUT = 0
+    try:
+        for name, func, cost in get_benchmarks():
+            if names and name not in names:
+                continue
+            calls = max(number // cost, 1)
+            result = measure(func, calls, repeat)
+            result.update(measure_allocations(func, max(calls // 10, 1)))
+            results[name] = result
+    finally:
+        settings.QUERY_CACHE_TIMEOUT = timeout
+    return results
+
+
+def main(argv=None):
+    parser = get_parser(__doc__.strip().splitlines()[0], number=10000)
+    parser.add_argument(
+        'names', nargs='*',
+        help='Names of the benchmarks to run (default: all).')
+    args = parser.parse_args(argv)
+    report(run(args.number, args.repeat, args.names))
+
+
+if __name__ == '__main__':
+    main()
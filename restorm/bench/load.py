@@ -0,0 +1,219 @@
+"""
+Generates load with a ``JSONClient`` against a local mock catalog server.
+
+Starts the ``CatalogApiClient`` mock API as an HTTP server, unless ``--uri``
+points to a running API, and makes requests from ``--concurrency`` threads
+for ``--duration`` seconds. Each request is one of:
+
+* ``get``: a book, ``GET book/<id>``,
+* ``page``: a page of books, ``GET book/?page=<page>&page_size=<size>``,
+* ``save``: an update of a book, ``PATCH book/<id>``,
+
+chosen at random with the weights of ``--mix``. The throughput and the
+latency percentiles, overall and per kind of request, are reported as JSON::
+
+    $ python -m restorm.bench.load --concurrency 8 --duration 30 \\
+        --mix get=70,page=20,save=10
+"""
+import argparse
+import math
+import random
+import threading
+from time import perf_counter
+
+from restorm.bench import report
+from restorm.clients.jsonclient import JSONClient
+from restorm.clients.mockclient import MockHandler
+from restorm.examples.mock.api import CatalogApiClient
+
+PERCENTILES = (50, 75, 90, 95, 99, 99.9)
+
+DEFAULT_MIX = 'get=70,page=20,save=10'
+
+
+class QuietMockHandler(MockHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(size=1000, ip_address='127.0.0.1', port=0):
+    """
+    Starts a threaded HTTP server for a ``CatalogApiClient`` with ``size``
+    books in a background thread and returns the server and its root URI.
+    """
+    import http.server
+
+    api = CatalogApiClient(size=size)
+    handler = type('CatalogHandler', (QuietMockHandler,), {'mock_api': api})
+    server = api.create_server(
+        ip_address, port, handler=handler,
+        server_class=http.server.ThreadingHTTPServer)
+    server.daemon_threads = True
+    root_uri = 'http://%s:%d/api/' % server.server_address[:2]
+    api.root_uri = root_uri
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, root_uri
+
+
+def parse_mix(value):
+    """
+    Returns a list of ``(kind, weight)`` tuples from a string like
+    ``"get=70,page=20,save=10"``.
+    """
+    mix = []
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in OPERATIONS:
+            raise ValueError('Unknown kind of request "%s".' % kind)
+        mix.append((kind, float(weight or 1)))
+    return mix
+
+
+def get_book(client, rng, size, page_size):
+    return client.get('book/%d' % rng.randint(1, size))
+
+
+def get_page(client, rng, size, page_size):
+    pages = max((size + page_size - 1) // page_size, 1)
+    return client.get('book/?page=%d&page_size=%d' % (
+        rng.randint(1, pages), page_size))
+
+
+def save_book(client, rng, size, page_size):
+    pk = rng.randint(1, size)
+    return client.patch('book/%d' % pk, {'title': 'Book %d' % pk})
+
+
+OPERATIONS = {
+    'get': get_book,
+    'page': get_page,
+    'save': save_book,
+}
+
+
+def percentiles(latencies):
+    """
+    Returns a dictionary with the mean, maximum and ``PERCENTILES`` of the
+    ``latencies`` in seconds, using the nearest rank.
+    """
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    result = {
+        'mean': sum(latencies) / len(latencies),
+        'max': latencies[-1],
+    }
+    for percentile in PERCENTILES:
+        rank = int(math.ceil(percentile / 100.0 * len(latencies))) - 1
+        result['p%s' % ('%g' % percentile).replace('.', '_')] = \
+            latencies[min(max(rank, 0), len(latencies) - 1)]
+    return result
+
+
+def run(concurrency=4, duration=10.0, mix=DEFAULT_MIX, size=1000,
+        page_size=50, uri=None, seed=None):
+    if isinstance(mix, str):
+        mix = parse_mix(mix)
+    kinds = [kind for kind, weight in mix]
+    weights = [weight for kind, weight in mix]
+
+    server = None
+    if uri is None:
+        server, uri = start_server(size)
+
+    latencies = dict((kind, []) for kind in kinds)
+    errors = dict((kind, 0) for kind in kinds)
+    lock = threading.Lock()
+
+    def work(idx):
+        client = JSONClient(root_uri=uri)
+        rng = random.Random(None if seed is None else seed + idx)
+        own_latencies = dict((kind, []) for kind in kinds)
+        own_errors = dict((kind, 0) for kind in kinds)
+        deadline = perf_counter() + duration
+        while perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            start = perf_counter()
+            try:
+                response = OPERATIONS[kind](client, rng, size, page_size)
+            except Exception:
+                failed = True
+            else:
+                failed = response.status_code >= 400
+            own_latencies[kind].append(perf_counter() - start)
+            if failed:
+                own_errors[kind] += 1
+        with lock:
+            for kind in kinds:
+                latencies[kind].extend(own_latencies[kind])
+                errors[kind] += own_errors[kind]
+
+    threads = [
+        threading.Thread(target=work, args=(idx,))
+        for idx in range(concurrency)]
+    start = perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    elapsed = perf_counter() - start
+
+    all_latencies = [l for kind in kinds for l in latencies[kind]]
+    return {
+        'concurrency': concurrency,
+        'duration': elapsed,
+        'requests': len(all_latencies),
+        'errors': sum(errors.values()),
+        'throughput': len(all_latencies) / elapsed if elapsed else 0.0,
+        'latency': percentiles(all_latencies),
+        'kinds': dict(
+            (kind, {
+                'requests': len(latencies[kind]),
+                'errors': errors[kind],
+                'latency': percentiles(latencies[kind]),
+            })
+            for kind in kinds),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--concurrency', type=int, default=4,
+        help='Number of concurrent clients (default: %(default)s).')
+    parser.add_argument(
+        '--duration', type=float, default=10.0,
+        help='Duration in seconds (default: %(default)s).')
+    parser.add_argument(
+        '--mix', default=DEFAULT_MIX,
+        help='Weights of the kinds of requests (default: %(default)s).')
+    parser.add_argument(
+        '--size', type=int, default=1000,
+        help='Number of books in the catalog (default: %(default)s).')
+    parser.add_argument(
+        '--page-size', type=int, default=50,
+        help='Number of books per page (default: %(default)s).')
+    parser.add_argument(
+        '--uri', default=None,
+        help='Root URI of a running catalog API, instead of a local server.')
+    parser.add_argument(
+        '--seed', type=int, default=None,
+        help='Seed of the random choices of the clients.')
+    args = parser.parse_args(argv)
+    report(run(
+        args.concurrency, args.duration, args.mix, args.size, args.page_size,
+        args.uri, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures the memory per row of list responses, per pipeline stage (see
+``restorm.memory``)::
+
+    $ python -m restorm.bench.memory --size 5000
+
+The benchmarks fetch pages of books from the ``CatalogApiClient`` mock API:
+
+* ``book_page_100`` and ``book_page_1k``: pages of 100 and 1000 books.
+* ``book_only_page_1k``: pages of 1000 books with ``only('id', 'title')``.
+* ``book_page_1k_session``: pages of 1000 books in an identity map session.
+
+For each benchmark the retained bytes per row and the peak and retained
+bytes per stage are reported as JSON. The bytes per row do not depend much
+on ``--size``, but the time to take the snapshots grows with the number of
+pages times the number of rows.
+"""
+import argparse
+
+from restorm.bench import report, setup_django
+from restorm.conf import settings
+from restorm.examples.mock.api import CatalogApiClient
+
+
+def get_book_resource(catalog_client):
+    setup_django()
+    from restorm import fields
+    from restorm.resource import Resource
+
+    class Book(Resource):
+        id = fields.IntegerField(primary_key=True)
+        isbn = fields.CharField()
+        title = fields.CharField()
+        author = fields.IntegerField()
+        price = fields.DecimalField()
+        pages = fields.IntegerField()
+        in_stock = fields.BooleanField()
+        created = fields.CharField()
+
+        class Meta:
+            resource_name = 'bench_memory_book'
+            list = r'^book/$'
+            item = r'^book/(?P<id>\d+)$'
+            client = catalog_client
+            fields_param = 'fields'
+
+    return Book
+
+
+def get_benchmarks(book):
+    """
+    Returns a list of tuples of the name of each benchmark, a function that
+    returns the queryset to evaluate and whether to evaluate it in a session.
+    """
+    def page(page_size, fields=None):
+        def get_queryset():
+            queryset = book.objects.all()
+            if fields:
+                queryset = queryset.only(*fields)
+            queryset._page_size = page_size
+            return queryset
+        return get_queryset
+
+    return [
+        ('book_page_100', page(100), False),
+        ('book_page_1k', page(1000), False),
+        ('book_only_page_1k', page(1000, ('id', 'title')), False),
+        ('book_page_1k_session', page(1000), True),
+    ]
+
+
+def run(size=2000, names=None):
+    import restorm
+
+    book = get_book_resource(CatalogApiClient(size=size))
+    results = {}
+    timeout = settings.QUERY_CACHE_TIMEOUT
+    # Do not keep the pages of previous benchmarks in the query cache.
+    settings.QUERY_CACHE_TIMEOUT = 0
+    try:
+        for name, get_queryset, in_session in get_benchmarks(book):
+            if names and name not in names:
+                continue
+            queryset = get_queryset()
+            if in_session:
+                with restorm.session():
+                    memory_report = queryset.memory_report()
+            else:
+                memory_report = queryset.memory_report()
+            results[name] = memory_report.as_dict()
+    finally:
+        settings.QUERY_CACHE_TIMEOUT = timeout
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--size', type=int, default=2000,
+        help='Number of books in the catalog (default: %(default)s).')
+    parser.add_argument(
+        'names', nargs='*',
+        help='Names of the benchmarks to run (default: all).')
+    args = parser.parse_args(argv)
+    report(run(args.size, args.names))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Measures the overhead of the client middleware chain.
+
+``direct`` handles a request without ``ClientMixin.request()``,
+``empty_chain`` uses ``request()`` on a client without middleware and
+``noop_middleware`` on a client with a single middleware that does nothing.
+``direct`` runs with metrics and statistics idle, ``observed`` is ``direct``
+with both collecting. The ``overhead`` of an empty chain should be within the
+measurement noise::
+
+    $ python -m restorm.bench.middleware
+"""
+from restorm.bench import get_parser, measure, report
+from restorm.clients.middleware import ClientMiddleware
+from restorm.clients.mockclient import MockApiClient
+from restorm.conf import settings
+from restorm.stats import record
+
+URI = 'http://localhost/api/book/1'
+
+
+def get_client(middleware=()):
+    client = MockApiClient(responses={
+        'book/1': {'GET': ({'Status': 200}, '{"id": 1, "title": "Book 1"}')},
+    }, root_uri='http://localhost/api/')
+    client.middleware = list(middleware)
+    return client
+
+
+def measure_observed(func, number, repeat):
+    settings.COLLECT_METRICS = True
+    try:
+        with record():
+            return measure(func, number, repeat)
+    finally:
+        del settings.COLLECT_METRICS
+
+
+def run(number=10000, repeat=5):
+    client = get_client()
+    noop_client = get_client([ClientMiddleware()])
+
+    def direct():
+        return client.get_response(client.create_request(URI, 'GET'))
+
+    results = {
+        'direct': measure(direct, number, repeat),
+        'observed': measure_observed(direct, number, repeat),
+        'empty_chain': measure(lambda: client.request(URI), number, repeat),
+        'noop_middleware': measure(
+            lambda: noop_client.request(URI), number, repeat),
+    }
+    results['overhead'] = {
+        'observed': results['observed']['best'] - results['direct']['best'],
+        'empty_chain': results['empty_chain']['best'] -
+        results['direct']['best'],
+        'noop_middleware': results['noop_middleware']['best'] -
+        results['direct']['best'],
+    }
+    return results
+
+
+def main(argv=None):
+    parser = get_parser(__doc__.strip().splitlines()[0], number=10000)
+    args = parser.parse_args(argv)
+    report(run(args.number, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
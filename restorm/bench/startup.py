@@ -0,0 +1,129 @@
+"""
+Measures the startup cost of RestORM: importing its modules and defining
+resources.
+
+Each measurement runs in a new Python process, such that nothing is cached::
+
+    $ python -m restorm.bench.startup --number 200
+
+The benchmarks are:
+
+* ``import_restorm``, ``import_restorm_resource`` and
+  ``import_restorm_clients``: importing ``restorm``, ``restorm.resource`` and
+  ``restorm.clients.jsonclient``, without the interpreter startup.
+* ``define``: defining ``--number`` resources with eight fields each, as
+  modules with many resources do when imported.
+* ``prepare``: preparing these resources on first use, see
+  ``ResourceBase.prepare()``.
+
+``--repeat`` is the number of processes per benchmark. The best and mean time
+in seconds are reported as JSON, with the time per resource for ``define``
+and ``prepare``.
+"""
+import json
+import subprocess
+import sys
+from time import perf_counter
+
+from restorm.bench import get_parser, report, setup_django
+
+IMPORTS = [
+    ('import_restorm', 'restorm'),
+    ('import_restorm_resource', 'restorm.resource'),
+    ('import_restorm_clients', 'restorm.clients.jsonclient'),
+]
+
+
+def run_python(code):
+    """
+    Runs ``code`` in a new Python process and returns its decoded JSON
+    output.
+    """
+    return json.loads(subprocess.check_output([sys.executable, '-c', code]))
+
+
+def time_import(module):
+    return run_python(
+        'from time import perf_counter\n'
+        'start = perf_counter()\n'
+        'import %s\n'
+        'print(perf_counter() - start)\n' % module)
+
+
+def define_resources(number=200):
+    """
+    Defines ``number`` resources, prepares them and returns a dictionary with
+    the time it took to define and to prepare them, in seconds.
+    """
+    setup_django()
+    from restorm import fields
+    from restorm.resource import Resource
+
+    resource_base = type(Resource)
+    start = perf_counter()
+    resources = []
+    for idx in range(number):
+        name = 'StartupResource%d' % idx
+        meta = type('Meta', (object,), {
+            'resource_name': name.lower(),
+            'list': r'^%s/$' % name.lower(),
+            'item': r'^%s/(?P<id>\d+)$' % name.lower(),
+        })
+        resources.append(resource_base(name, (Resource,), {
+            '__module__': __name__,
+            'id': fields.IntegerField(primary_key=True),
+            'isbn': fields.CharField(),
+            'title': fields.CharField(),
+            'author': fields.IntegerField(),
+            'price': fields.DecimalField(),
+            'pages': fields.IntegerField(),
+            'in_stock': fields.BooleanField(),
+            'created': fields.CharField(),
+            'Meta': meta,
+        }))
+    defined = perf_counter()
+    for resource in resources:
+        resource._meta
+    return {
+        'define': defined - start,
+        'prepare': perf_counter() - defined,
+    }
+
+
+def summarize(times, number=None):
+    result = {
+        'best': min(times),
+        'mean': sum(times) / len(times),
+        'repeat': len(times),
+    }
+    if number:
+        result['best_per_resource'] = result['best'] / number
+    return result
+
+
+def run(number=200, repeat=5):
+    results = {}
+    for name, module in IMPORTS:
+        results[name] = summarize(
+            [time_import(module) for i in range(repeat)])
+
+    timings = [
+        run_python(
+            'import json, sys\n'
+            'from restorm.bench.startup import define_resources\n'
+            'json.dump(define_resources(%d), sys.stdout)\n' % number)
+        for i in range(repeat)]
+    for phase in ('define', 'prepare'):
+        results[phase] = summarize([t[phase] for t in timings], number)
+        results[phase]['number'] = number
+    return results
+
+
+def main(argv=None):
+    parser = get_parser(__doc__.strip().splitlines()[0], number=200)
+    args = parser.parse_args(argv)
+    report(run(args.number, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import threading
+import time
+
+from restorm.conf import settings
+
+
+class QueryResults(object):
+    """
+    The pages and hydrated objects fetched for a query.
+    """
+    def __init__(self, expires=None):
+        self.expires = expires
+        self.pages_fetched = {}
+        self.result_cache = {}
+        # Indexes over the rows in the result cache, by field name and kind.
+        # See ``restorm.indexes``.
+        self.indexes = {}
+
+
+class QueryCache(object):
+    """
+    Keeps the ``QueryResults`` of recently evaluated querysets, such that
+    querysets with the same resource, query and client share the pages they
+    fetched.
+
+    Results are kept for ``settings.QUERY_CACHE_TIMEOUT`` seconds, for at most
+    ``settings.QUERY_CACHE_SIZE`` queries. Saving or deleting objects through
+    RestORM invalidates the results of their resource.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the ``QueryResults`` for ``key``. New, empty results are
+        returned (and stored) if there are no results yet or if they expired.
+        """
+        timeout = settings.QUERY_CACHE_TIMEOUT
+        if not timeout or key is None:
+            return QueryResults()
+
+        now = time.time()
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None and results.expires > now:
+                self._entries.move_to_end(key)
+                return results
+
+            results = QueryResults(expires=now + timeout)
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.QUERY_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return results
+
+    def peek(self, key):
+        """
+        Returns the ``QueryResults`` for ``key``, or ``None`` if there are no
+        results yet or if they expired.
+        """
+        if key is None:
+            return None
+        with self._lock:
+            results = self._entries.get(key)
+        if results is not None and results.expires > time.time():
+            return results
+        return None
+
+    def invalidate(self, model=None):
+        """
+        Removes the results of all queries on the resource ``model``, or all
+        results if no resource is given.
+        """
+        with self._lock:
+            if model is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] is model]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+query_cache = QueryCache()
@@ -1,12 +1,30 @@
-import logging
 import requests
+from time import perf_counter
 from urllib.parse import urljoin
 
-
-logger = logging.getLogger(__name__)
+from restorm import detector, memory, metrics, profiler
+from restorm.clients import middleware as client_middleware
+# ``logger`` is imported for backwards compatibility.
+from restorm.clients.log import log_exception, log_request, logger
+from restorm.conf import settings
+from restorm.stats import content_size, get_active_stats, record_request
 
 
 class Request(dict):
+    # The time spent per phase of the request, if it is timed, and the time
+    # it was created at.
+    timings = None
+    created_at = None
+    # The observers of the request, looked up once when it is created: the
+    # recording ``QueryStats``, whether metrics are collected, whether slow
+    # requests are profiled, the current unit of work and whether memory is
+    # traced.
+    stats = ()
+    collect_metrics = False
+    profile = False
+    unit_of_work = None
+    trace_memory = False
+
     def __init__(self, uri, method, body=None, headers=None):
         super(Request, self).__init__()
 
@@ -67,11 +85,16 @@ class ClientMixin(object):
 
     If the ``MIME_TYPE`` is also found in the ``Content-Type`` response headers,
     the response contents will be deserialized.
+
+    Requests are handled by the ``middleware`` chain, if any. See
+    ``restorm.clients.middleware``.
     """
     root_uri = ''
 
     MIME_TYPE = None
 
+    middleware = ()
+
     def serialize(self, data):
         """
         Produces a serialized version suitable for transfer over the wire.
@@ -122,22 +145,120 @@ class ClientMixin(object):
                 'Content-Type': self.MIME_TYPE,
             })
 
+        stats = get_active_stats()
+        collect_metrics = metrics.is_enabled()
+        profile = profiler.is_enabled()
+        timed = stats or collect_metrics or profile
+        if timed:
+            start = perf_counter()
+
         data = self.serialize(body)
 
-        return Request(uri, method, data, headers)
+        request = Request(uri, method, data, headers)
+        if timed:
+            now = perf_counter()
+            request.timings = {'serialize': now - start}
+            # The network time of the request is measured from here.
+            request.created_at = now
+            request.stats = stats
+            request.collect_metrics = collect_metrics
+            request.profile = profile
+        unit_of_work = detector.get_unit_of_work()
+        if unit_of_work is not None:
+            request.unit_of_work = unit_of_work
+        if memory.is_enabled():
+            request.trace_memory = True
+        return request
 
     def create_response(self, response, request):
         """
         Returns a ``Response`` object.
         """
+        timings = request.timings
+        if timings is not None:
+            start = perf_counter()
+
+        if request.unit_of_work is not None:
+            request.unit_of_work.add(request)
+
         wrapped_response = Response(self, response, request)
 
         if not self.MIME_TYPE or ('Content-Type' in response.headers and
                                   response.headers['Content-Type'].startswith(self.MIME_TYPE)):
             wrapped_response.content = self.deserialize(response.content)
 
+        if request.trace_memory:
+            memory.checkpoint()
+
+        if timings is not None:
+            self._observe(request, response, start)
         return wrapped_response
 
+    def _observe(self, request, response, start):
+        """
+        Records the timings of ``request`` in the statistics and metrics.
+        ``start`` is the time the response was received at.
+        """
+        timings = request.timings
+        deserialize_time = perf_counter() - start
+        network_time = start - request.created_at
+        # Transports that cannot tell the time until the response headers
+        # were received spend all network time waiting.
+        wait_time = min(timings.get('wait', network_time), network_time)
+        timings.update({
+            'wait': wait_time,
+            'transfer': network_time - wait_time,
+            'deserialize': deserialize_time,
+        })
+
+        if request.stats:
+            record_request(
+                request, response, network_time, deserialize_time,
+                request.stats)
+        if request.collect_metrics:
+            metrics.observe_request(
+                request.method, response.status_code,
+                content_size(request.body), content_size(response.content),
+                timings)
+        if request.profile and \
+                sum(timings.values()) >= settings.SLOW_REQUEST_THRESHOLD:
+            profiler.profiler.capture(request, response, timings)
+
+    def request(self, uri, method='GET', body=None, headers=None):
+        """
+        Creates a ``Request`` object by calling
+        ``self.create_request(uri, method, body, headers)`` and returns the
+        ``Response`` to it, from the middleware chain or directly from
+        ``self.get_response(request)`` if there is no middleware.
+        """
+        request = self.create_request(uri, method, body, headers)
+        if self.middleware:
+            return client_middleware.handle(self, request)
+        return self.get_response(request)
+
+    async def arequest(self, uri, method='GET', body=None, headers=None):
+        """
+        Asynchronous version of ``request()``. The request is sent in the
+        default executor of the event loop, such that other tasks can run
+        while waiting for the response.
+        """
+        request = self.create_request(uri, method, body, headers)
+        return await client_middleware.ahandle(self, request)
+
+    def get_response(self, request):
+        """
+        Sends ``request`` and returns the ``Response`` object created by
+        calling ``self.create_response(response, request)``.
+        """
+        return self.create_response(self.send(request), request)
+
+    def send(self, request):
+        """
+        Performs the low level request and returns the response of the
+        transport, with ``status_code``, ``headers`` and ``content``.
+        """
+        raise NotImplementedError()
+
     def get(self, uri):
         """
         Convenience method that performs a GET-request.
@@ -156,6 +277,12 @@ class ClientMixin(object):
         """
         return self.request(uri, 'PUT', data)
 
+    def patch(self, uri, data):
+        """
+        Convenience method that performs a PATCH-request.
+        """
+        return self.request(uri, 'PATCH', data)
+
     def delete(self, uri):
         """
         Convenience method that performs a DELETE-request.
@@ -169,27 +296,23 @@ class BaseClient(object):
     """
     def __init__(self, *args, **kwargs):
         """
-        Takes one additional argument ``root_uri``. All other arguments are
-        passed to the ``httplib2.Http`` constructor.
+        Takes the additional arguments ``root_uri`` and ``middleware``. All
+        other arguments are passed to the ``httplib2.Http`` constructor.
         """
         if 'root_uri' in kwargs:
             self.root_uri = kwargs.pop('root_uri')
+        if 'middleware' in kwargs:
+            self.middleware = list(kwargs.pop('middleware'))
 
         super(BaseClient, self).__init__(*args, **kwargs)
 
-    def request(self, uri, method='GET', body=None, headers=None):
+    def send(self, request):
         """
-        Creates a ``Request`` object by calling
-        ``self.create_request(uri, method, body, headers)`` and performs the low
-        level HTTP-request using this request object. A ``Response`` object is
-        created with the data returned from the request, by calling
-        ``self.create_response(response_headers, response_content, request)``
-        and is returned.
+        Performs the low level HTTP-request using the ``request`` object and
+        returns the ``requests.Response``.
         """
-        # Create request.
-        request = self.create_request(uri, method, body, headers)
-
-        # Perform an HTTP-request with ``httplib2``.
+        # Perform an HTTP-request with ``requests``.
+        start = perf_counter()
         try:
             response = requests.request(
                 url=request.uri,
@@ -197,41 +320,13 @@ class BaseClient(object):
                 data=request.body,
                 headers=request)
         except Exception as e:
-            # Logging.
-            logger.critical(
-                '%(method)s %(uri)s\n%(headers)s\n\n%(body)s\n\n\nException: %(exception)s', {
-                    'method': request.method,
-                    'uri': request.uri,
-                    'headers': '\n'.join(['%s: %s' % (k, v) for k, v in request.items()]),
-                    'body': request.body if request.body else '',
-                    'exception': unicode(e),
-                })
+            log_exception(request, e, perf_counter() - start)
             raise
-        else:
-            wrapped_response = self.create_response(response, request)
-            # Logging.
-            if logger.level > logging.DEBUG:
-                logger.info('%(method)s %(uri)s (HTTP %(response_status)s)' % {
-                    'method': request.method,
-                    'uri': request.uri,
-                    'response_status': response.status_code
-                })
-            else:
-                logger.debug(
-                    '%(method)s %(uri)s\n%(headers)s\n\n%(body)s\n\n\nHTTP %(response_status)s\n'
-                    '%(response_headers)s\n\n%(response_content)s', {
-                        'method': request.method,
-                        'uri': request.uri,
-                        'headers': '\n'.join(['%s: %s' % (k, v) for k, v in request.items()]),
-                        'body': request.body if request.body else '',
-                        'response_status': response.status_code,
-                        'response_headers': '\n'.join(
-                            ['%s: %s' % (k, v) for k, v in response.headers.items()]),
-                        # Show the actual content, not response.content
-                        'response_content': response.content
-                    })
-
-            return wrapped_response
+
+        if request.timings is not None:
+            request.timings['wait'] = response.elapsed.total_seconds()
+        log_request(request, response, perf_counter() - start)
+        return response
 
 
 class Client(BaseClient, ClientMixin):
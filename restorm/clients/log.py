@@ -0,0 +1,146 @@
+"""
+Request logging.
+
+``BaseClient`` logs each request to the ``restorm.clients.base`` logger: a
+summary line at ``INFO`` level, or the headers and bodies as well at
+``DEBUG`` level. Messages are only formatted when a handler emits them, and
+the request, response and duration are passed to handlers as the
+``http_request``, ``http_response`` and ``duration`` attributes of the log
+record, for structured logging.
+
+* ``settings.REQUEST_LOG_SAMPLE_RATE`` is the fraction of requests that is
+  logged. Requests that fail or get a server error response are always
+  logged.
+* ``settings.REQUEST_LOG_MAX_BODY`` is the maximum number of characters of
+  request and response bodies that are logged.
+* Requests that take ``settings.SLOW_REQUEST_THRESHOLD`` seconds or more are
+  logged at ``WARNING`` level to the ``restorm.clients.slow`` logger,
+  regardless of the sample rate.
+"""
+import logging
+import random
+
+from restorm.conf import settings
+
+
+# The logger of ``restorm.clients.base``, which clients have always used.
+logger = logging.getLogger('restorm.clients.base')
+slow_logger = logging.getLogger('restorm.clients.slow')
+
+
+def truncate(body, limit=None):
+    """
+    Returns ``body`` as text of at most ``limit`` characters, by default
+    ``settings.REQUEST_LOG_MAX_BODY``.
+    """
+    if body is None:
+        return ''
+    if limit is None:
+        limit = settings.REQUEST_LOG_MAX_BODY
+    if isinstance(body, bytes):
+        size = len(body)
+        body = body[:limit].decode('utf-8', 'replace')
+    else:
+        body = '%s' % body
+        size = len(body)
+    if limit is not None and size > limit:
+        return '%s... (truncated, %d in total)' % (body[:limit], size)
+    return body
+
+
+def format_headers(headers):
+    return '\n'.join(['%s: %s' % (k, v) for k, v in headers.items()])
+
+
+class RequestMessage(object):
+    """
+    A log message of a request, which is only formatted when it is emitted.
+    """
+    def __init__(self, request, response=None, duration=None, exception=None,
+                 verbose=False):
+        self.request = request
+        self.response = response
+        self.duration = duration
+        self.exception = exception
+        self.verbose = verbose
+
+    def summary(self):
+        request, response = self.request, self.response
+        if self.exception is not None:
+            return '%s %s (%s: %s)' % (
+                request.method, request.uri,
+                self.exception.__class__.__name__, self.exception)
+        return '%s %s (HTTP %s, %.3fs)' % (
+            request.method, request.uri, response.status_code, self.duration)
+
+    def __str__(self):
+        if not self.verbose:
+            return self.summary()
+
+        request, response = self.request, self.response
+        lines = [
+            self.summary(),
+            format_headers(request),
+            '',
+            truncate(request.body),
+        ]
+        if response is not None:
+            lines.extend([
+                '',
+                'HTTP %s' % response.status_code,
+                format_headers(response.headers),
+                '',
+                truncate(response.content),
+            ])
+        return '\n'.join(lines)
+
+
+def _extra(request, response, duration):
+    return {
+        'http_request': request,
+        'http_response': response,
+        'duration': duration,
+    }
+
+
+def _sampled():
+    rate = settings.REQUEST_LOG_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+def log_request(request, response, duration):
+    """
+    Logs ``request`` with its ``response``, which took ``duration`` seconds.
+    """
+    threshold = settings.SLOW_REQUEST_THRESHOLD
+    if threshold is not None and duration >= threshold and \
+            slow_logger.isEnabledFor(logging.WARNING):
+        slow_logger.warning(
+            RequestMessage(request, response, duration, verbose=True),
+            extra=_extra(request, response, duration))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif logger.isEnabledFor(logging.INFO):
+        level = logging.INFO
+    else:
+        return
+    if response.status_code < 500 and not _sampled():
+        return
+    logger.log(
+        level,
+        RequestMessage(
+            request, response, duration, verbose=level == logging.DEBUG),
+        extra=_extra(request, response, duration))
+
+
+def log_exception(request, exception, duration):
+    """
+    Logs ``request``, which raised ``exception`` after ``duration`` seconds.
+    """
+    if logger.isEnabledFor(logging.CRITICAL):
+        logger.critical(
+            RequestMessage(
+                request, duration=duration, exception=exception,
+                verbose=True),
+            extra=_extra(request, None, duration))
@@ -0,0 +1,93 @@
+"""
+Client middleware.
+
+Middleware wraps the handling of each request by a client, after the
+``Request`` is created and until the ``Response`` is returned, to add
+behaviour like signing, caching, metrics or retries without subclassing the
+client. Pass a list of middleware to the client, the first middleware is the
+outermost::
+
+    from restorm.clients.jsonclient import JSONClient
+    from restorm.clients.middleware import ClientMiddleware
+
+    class TokenAuthMiddleware(ClientMiddleware):
+        def __init__(self, token):
+            self.token = token
+
+        def process_request(self, client, request):
+            request['Authorization'] = 'Token %s' % self.token
+
+    client = JSONClient(
+        root_uri='http://localhost/api/',
+        middleware=[TokenAuthMiddleware('secret')])
+
+A middleware either implements the ``process_request()`` and
+``process_response()`` hooks, which are used for both synchronous and
+asynchronous requests, or overrides ``__call__()`` and ``acall()`` to call
+the next handler itself, for example to retry it.
+
+Without middleware, requests are handled directly, without any additional
+function calls.
+"""
+import asyncio
+from contextvars import copy_context
+from functools import partial
+
+
+class ClientMiddleware(object):
+    """
+    Base class for client middleware.
+    """
+    def process_request(self, client, request):
+        """
+        Called before the request is sent. Return a ``Response`` to skip the
+        rest of the chain, or ``None`` to continue.
+        """
+        return None
+
+    def process_response(self, client, request, response):
+        """
+        Called with the ``Response`` of the request. Returns a ``Response``.
+        """
+        return response
+
+    def __call__(self, client, request, get_response):
+        response = self.process_request(client, request)
+        if response is None:
+            response = get_response(request)
+        return self.process_response(client, request, response)
+
+    async def acall(self, client, request, get_response):
+        response = self.process_request(client, request)
+        if response is None:
+            response = await get_response(request)
+        return self.process_response(client, request, response)
+
+
+def handle(client, request):
+    """
+    Returns the ``Response`` to ``request`` from the middleware chain of
+    ``client``.
+    """
+    get_response = client.get_response
+    for middleware in reversed(client.middleware):
+        get_response = partial(middleware, client, get_response=get_response)
+    return get_response(request)
+
+
+async def ahandle(client, request):
+    """
+    Returns the ``Response`` to ``request`` from the asynchronous middleware
+    chain of ``client``. The request itself is sent in the default executor
+    of the event loop.
+    """
+    loop = asyncio.get_running_loop()
+
+    def get_response(request):
+        return loop.run_in_executor(
+            None, copy_context().run, client.get_response, request)
+
+    for middleware in reversed(client.middleware):
+        get_response = partial(
+            middleware.acall, client, get_response=get_response)
+    return await get_response(request)
@@ -1,4 +1,3 @@
-from urllib.parse import urljoin
 import os
 from requests import Response
 import http.server
@@ -68,17 +67,15 @@ class BaseMockClient(object):
         self.responses = kwargs.pop('responses', [])
         if 'root_uri' in kwargs:
             self.root_uri = kwargs.pop('root_uri')
+        if 'middleware' in kwargs:
+            self.middleware = list(kwargs.pop('middleware'))
 
         self._response_index = 0
 
-    def request(self, uri, method='GET', body=None, headers=None):
+    def send(self, request):
         if self._response_index >= len(self.responses):
-            raise ValueError('Ran out of responses when requesting: %s' % uri)
-
-        if not uri.startswith(self.root_uri):
-            urljoin(self.root_uri, uri)
-
-        request = self.create_request(uri, method, body, headers)
+            raise ValueError(
+                'Ran out of responses when requesting: %s' % request.uri)
 
         # Get current queued mock response.
         response_headers, response_content = self.responses[self._response_index]
@@ -95,7 +92,7 @@ class BaseMockClient(object):
         }
         response.headers.update(response_headers)
 
-        return self.create_response(response, request)
+        return response
 
 
 class MockClient(BaseMockClient, ClientMixin):
@@ -132,6 +129,8 @@ class BaseMockApiClient(object):
         self.responses = kwargs.pop('responses', {})
         if 'root_uri' in kwargs:
             self.root_uri = kwargs.pop('root_uri')
+        if 'middleware' in kwargs:
+            self.middleware = list(kwargs.pop('middleware'))
 
     def get_response_from_request(self, request):
         """
@@ -166,16 +165,11 @@ class BaseMockApiClient(object):
 
         return response
 
-    def request(self, uri, method='GET', body=None, headers=None):
+    def send(self, request):
         """
-        The main request method. Users should override the
+        Returns the mock response to ``request``. Users should override the
         ``get_response_from_request`` method for custom response logic.
         """
-        if not uri.startswith(self.root_uri):
-            uri = urljoin(self.root_uri, uri)
-
-        request = self.create_request(uri, method, body, headers)
-
         response = self.get_response_from_request(request)
         # Default headers.
         response_headers = {
@@ -184,12 +178,15 @@ class BaseMockApiClient(object):
         }
         response.headers.update(response_headers)
 
-        return self.create_response(response, request)
+        return response
 
-    def create_server(self, ip_address, port, handler=None):
+    def create_server(self, ip_address, port, handler=None,
+                      server_class=http.server.HTTPServer):
         """
         Creates a server instance and returns it. The server instance has
-        access to this mock to provide the responses.
+        access to this mock to provide the responses. Pass
+        ``http.server.ThreadingHTTPServer`` as ``server_class`` to handle
+        requests concurrently.
 
         >>> from restorm.clients.mockclient import MockApiClient, StringResponse
         >>> mock_api_client = MockApiClient(responses={'/': {'GET': ({'Status': 200}, 'My homepage')}})
@@ -201,7 +198,7 @@ class BaseMockApiClient(object):
             MockHandler.mock_api = self
             handler = MockHandler
 
-        return HTTPServer((ip_address, port), handler)
+        return server_class((ip_address, port), handler)
 
 
 class MockHandler(http.server.BaseHTTPRequestHandler):
@@ -216,17 +213,34 @@ class MockHandler(http.server.BaseHTTPRequestHandler):
     def do_PUT(self):
         self.process_request('PUT')
 
+    def do_PATCH(self):
+        self.process_request('PATCH')
+
     def do_DELETE(self):
         self.process_request('DELETE')
 
     def process_request(self, method, body=None):
+        if body is None:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                # The mock API serializes the body again.
+                body = self.mock_api.deserialize(
+                    self.rfile.read(length).decode('utf-8'))
         response = self.mock_api.request(self.path, method, body)
 
+        content = response.raw_content
+        if content is None:
+            content = b''
+        elif isinstance(content, str):
+            content = content.encode('utf-8')
+
         self.send_response(response.status_code)
         for k, v in response.headers.items():
-            self.send_header(k, v)
+            if k.lower() != 'content-length':
+                self.send_header(k, v)
+        self.send_header('Content-Length', '%d' % len(content))
         self.end_headers()
-        self.wfile.write(response.raw_content)
+        self.wfile.write(content)
 
 
 class MockApiClient(BaseMockApiClient, ClientMixin):
@@ -0,0 +1,91 @@
+import logging
+
+import mock
+from requests import Response
+from unittest2 import TestCase
+
+from restorm.clients import log
+from restorm.clients.jsonclient import JSONClient
+from restorm.conf import settings
+
+
+class RequestLogTests(TestCase):
+    def setUp(self):
+        self.client = JSONClient()
+        self.logger = logging.getLogger('restorm.clients.base')
+        self.slow_logger = logging.getLogger('restorm.clients.slow')
+
+    def tearDown(self):
+        self.logger.setLevel(logging.NOTSET)
+        self.slow_logger.setLevel(logging.NOTSET)
+        for name in ('REQUEST_LOG_SAMPLE_RATE', 'REQUEST_LOG_MAX_BODY',
+                     'SLOW_REQUEST_THRESHOLD'):
+            if name in settings.__dict__:
+                delattr(settings, name)
+
+    def get(self, content='{"foo": "bar"}', status_code=200):
+        response = Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers['Content-Type'] = 'application/json'
+        with mock.patch('requests.request', return_value=response):
+            return self.client.post(
+                uri='http://localhost/api', data={'title': 'x' * 20})
+
+    def test_info(self):
+        with self.assertLogs('restorm.clients.base', logging.INFO) as logs:
+            self.get()
+        record, = logs.records
+        self.assertEqual(record.levelno, logging.INFO)
+        self.assertTrue(record.getMessage().startswith(
+            'POST http://localhost/api (HTTP 200, '))
+        self.assertEqual(record.http_request.uri, 'http://localhost/api')
+        self.assertEqual(record.http_response.status_code, 200)
+        self.assertTrue(record.duration >= 0)
+
+    def test_debug(self):
+        settings.REQUEST_LOG_MAX_BODY = 10
+        with self.assertLogs('restorm.clients.base', logging.DEBUG) as logs:
+            self.get()
+        message = logs.records[0].getMessage()
+        self.assertTrue(
+            '\n{"title": ... (truncated, 33 in total)\n' in message)
+        self.assertTrue(
+            message.endswith('\n{"foo": "b... (truncated, 14 in total)'))
+
+    def test_inherited_level(self):
+        # The level of the logger is inherited from the root logger.
+        self.assertEqual(self.logger.level, logging.NOTSET)
+        level = logging.root.level
+        logging.root.setLevel(logging.WARNING)
+        try:
+            with mock.patch.object(log.RequestMessage, '__str__') as format:
+                self.get()
+        finally:
+            logging.root.setLevel(level)
+        self.assertFalse(format.called)
+
+    def test_sampling(self):
+        settings.REQUEST_LOG_SAMPLE_RATE = 0
+        with self.assertLogs('restorm.clients.base', logging.INFO) as logs:
+            self.get()
+            self.get(status_code=500)
+            logging.getLogger('restorm.clients.base').info('done')
+        self.assertEqual(
+            [r.http_response.status_code for r in logs.records[:-1]], [500])
+
+    def test_slow_requests(self):
+        settings.SLOW_REQUEST_THRESHOLD = 0
+        self.logger.setLevel(logging.WARNING)
+        with self.assertLogs('restorm.clients.slow', logging.WARNING) as logs:
+            self.get()
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue('\nHTTP 200\n' in logs.records[0].getMessage())
+
+    def test_exception(self):
+        with self.assertLogs('restorm.clients.base', logging.CRITICAL) as logs:
+            with mock.patch('requests.request', side_effect=IOError('down')):
+                self.assertRaises(
+                    IOError, self.client.get, uri='http://localhost/api')
+        self.assertTrue(logs.records[0].getMessage().startswith(
+            'GET http://localhost/api (OSError: down)'))
@@ -0,0 +1,118 @@
+import asyncio
+
+import mock
+from unittest2 import TestCase
+
+from restorm.clients.middleware import ClientMiddleware
+from restorm.examples.mock.api import LibraryApiClient
+
+
+class RecordingMiddleware(ClientMiddleware):
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def process_request(self, client, request):
+        self.calls.append(('request', self.name, request.uri))
+        request['X-Middleware'] = self.name
+
+    def process_response(self, client, request, response):
+        self.calls.append(('response', self.name, response.status_code))
+        return response
+
+
+class CachingMiddleware(ClientMiddleware):
+    def __init__(self):
+        self.cache = {}
+
+    def process_request(self, client, request):
+        return self.cache.get(request.uri)
+
+    def process_response(self, client, request, response):
+        self.cache[request.uri] = response
+        return response
+
+
+class RetryMiddleware(ClientMiddleware):
+    def __init__(self, retries):
+        self.retries = retries
+
+    def __call__(self, client, request, get_response):
+        for attempt in range(self.retries):
+            response = get_response(request)
+            if response.status_code < 500:
+                break
+        return response
+
+
+class UnavailableLibraryApiClient(LibraryApiClient):
+    def __init__(self, failures, *args, **kwargs):
+        self.failures = failures
+        super(UnavailableLibraryApiClient, self).__init__(*args, **kwargs)
+
+    def get_response_from_request(self, request):
+        response = super(
+            UnavailableLibraryApiClient, self).get_response_from_request(
+                request)
+        if self.failures:
+            self.failures -= 1
+            response.status_code = 503
+        return response
+
+
+class MiddlewareTests(TestCase):
+
+    def test_order(self):
+        calls = []
+        client = LibraryApiClient()
+        client.middleware = [
+            RecordingMiddleware('outer', calls),
+            RecordingMiddleware('inner', calls)]
+        response = client.get('author/1')
+
+        self.assertEqual(response.content['name'], 'Mark Pilgrim')
+        self.assertEqual(response.request['X-Middleware'], 'inner')
+        self.assertEqual(calls, [
+            ('request', 'outer', 'http://localhost/api/author/1'),
+            ('request', 'inner', 'http://localhost/api/author/1'),
+            ('response', 'inner', 200),
+            ('response', 'outer', 200),
+        ])
+
+    def test_short_circuit(self):
+        client = LibraryApiClient()
+        client.middleware = [CachingMiddleware()]
+        with mock.patch.object(
+                client, 'send', wraps=client.send) as send:
+            first = client.get('author/1')
+            self.assertTrue(client.get('author/1') is first)
+        self.assertEqual(send.call_count, 1)
+
+    def test_retry(self):
+        client = UnavailableLibraryApiClient(failures=2)
+        client.middleware = [RetryMiddleware(3)]
+        response = client.get('author/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.failures, 0)
+
+    def test_empty_chain(self):
+        client = LibraryApiClient()
+        with mock.patch('restorm.clients.middleware.handle') as handle:
+            response = client.get('author/1')
+        self.assertFalse(handle.called)
+        self.assertEqual(response.status_code, 200)
+
+    def test_async(self):
+        calls = []
+        client = LibraryApiClient()
+        client.middleware = [RecordingMiddleware('outer', calls)]
+
+        async def get_authors():
+            return await asyncio.gather(
+                client.arequest('author/1'), client.arequest('author/2'))
+
+        responses = asyncio.run(get_authors())
+        self.assertEqual(
+            [r.content['name'] for r in responses],
+            ['Mark Pilgrim', 'Jacob Kaplan-Moss'])
+        self.assertEqual(len(calls), 4)
@@ -59,6 +59,11 @@ class XMLClientMixin(ClientMixin):
             data = etree.tostring(data)
         return super(XMLClientMixin, self).put(uri, data)
 
+    def patch(self, uri, data):
+        if isinstance(data, etree.Element):
+            data = etree.tostring(data)
+        return super(XMLClientMixin, self).patch(uri, data)
+
     def delete(self, uri):
         return super(XMLClientMixin, self).delete(uri)
 
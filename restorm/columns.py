@@ -0,0 +1,147 @@
+"""
+Columnar export of querysets.
+
+``RestQuerySet.to_columns()`` streams the rows of a queryset into one buffer
+per field, without creating ``Resource`` instances::
+
+    columns = Book.objects.all().to_columns('id', 'title', 'price')
+    columns['price'].mean()
+    frame = columns.to_pandas()
+
+If NumPy is installed, each column is a NumPy array: ``int64`` for
+``IntegerField``, ``float64`` for ``DecimalField`` (and for ``IntegerField``
+columns with missing values, which become ``nan``), ``bool`` for
+``BooleanField`` and ``object`` otherwise. Without NumPy, each column is a
+``list`` of the values as decoded from the responses.
+
+``Columns.to_arrow()`` and ``Columns.to_pandas()`` require PyArrow and pandas
+respectively.
+"""
+from collections import OrderedDict
+from importlib.util import find_spec
+from itertools import islice
+
+from restorm.fields import BooleanField, DecimalField, IntegerField
+
+NUMPY_FOUND = True
+try:
+    import numpy
+except ImportError:
+    NUMPY_FOUND = False
+
+# PyArrow and pandas are slow to import, so they are only imported when the
+# columns are converted.
+PYARROW_FOUND = find_spec('pyarrow') is not None
+PANDAS_FOUND = find_spec('pandas') is not None
+
+
+def get_dtype(field):
+    """
+    Returns the NumPy type name used for a column of ``field``.
+    """
+    if isinstance(field, BooleanField):
+        return 'bool'
+    if isinstance(field, IntegerField):
+        return 'int64'
+    if isinstance(field, DecimalField):
+        return 'float64'
+    return 'object'
+
+
+class ColumnBuffer(object):
+    """
+    A growing NumPy array that values are appended to a page at a time. The
+    capacity doubles when it is full, such that appending is amortized
+    constant time per value.
+    """
+    def __init__(self, dtype, capacity=1024):
+        self.dtype = dtype
+        self.size = 0
+        self._data = numpy.empty(capacity, dtype=dtype)
+
+    def _convert(self, values):
+        if self.dtype != 'object' and None in values:
+            # Missing values cannot be stored as integers or booleans.
+            if self.dtype == 'int64':
+                self._retype('float64')
+            elif self.dtype == 'bool':
+                self._retype('object')
+        if self.dtype == 'float64':
+            values = [numpy.nan if v is None else v for v in values]
+        if self.dtype == 'object':
+            array = numpy.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+        return numpy.asarray(values).astype(self.dtype)
+
+    def _retype(self, dtype):
+        self.dtype = dtype
+        self._data = self._data.astype(dtype)
+
+    def extend(self, values):
+        array = self._convert(values)
+        end = self.size + len(array)
+        if end > len(self._data):
+            capacity = max(end, 2 * len(self._data))
+            data = numpy.empty(capacity, dtype=self.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        self._data[self.size:end] = array
+        self.size = end
+
+    def array(self):
+        """
+        Returns the appended values, without the unused capacity.
+        """
+        return self._data[:self.size]
+
+
+class Columns(OrderedDict):
+    """
+    Maps each exported field name to its column.
+    """
+    def to_arrow(self):
+        """
+        Returns the columns as a ``pyarrow.Table``.
+        """
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError('PyArrow is required for to_arrow().') from e
+        return pyarrow.table(OrderedDict(self))
+
+    def to_pandas(self):
+        """
+        Returns the columns as a ``pandas.DataFrame``.
+        """
+        try:
+            import pandas
+        except ImportError as e:
+            raise ImportError('pandas is required for to_pandas().') from e
+        return pandas.DataFrame(OrderedDict(self), columns=list(self))
+
+
+def build_columns(rows, columns, batch_size=1000):
+    """
+    Returns the ``Columns`` of ``rows``, an iterable of decoded rows, which
+    is consumed ``batch_size`` rows at a time. ``columns`` is a list of
+    tuples of the column name, the row key and the ``Field`` (or ``None``)
+    that determines the column type.
+    """
+    if NUMPY_FOUND:
+        buffers = [ColumnBuffer(get_dtype(field)) for n, k, field in columns]
+    else:
+        buffers = [[] for column in columns]
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        for (name, key, field), buffer in zip(columns, buffers):
+            buffer.extend([row.get(key) for row in batch])
+
+    if NUMPY_FOUND:
+        buffers = [buffer.array() for buffer in buffers]
+    return Columns(
+        (name, buffer) for (name, k, f), buffer in zip(columns, buffers))
@@ -4,5 +4,47 @@ import threading
 class Settings(threading.local):
     DEFAULT_CLIENT = None
 
+    # The maximum number of requests performed at the same time by bulk
+    # operations that fall back to a request per object.
+    MAX_CONCURRENT_REQUESTS = 8
+
+    # Bulk operations that pass lists of values in the query string split the
+    # values over several requests to keep URLs below this length.
+    MAX_URL_LENGTH = 2000
+
+    # Querysets with the same resource, query and client share the pages
+    # they fetched for this many seconds, in all threads of the process. 0
+    # disables sharing. Only enable it if results may be shared by users of
+    # the client and may be up to this many seconds stale.
+    QUERY_CACHE_TIMEOUT = 0
+
+    # The maximum number of queries to keep fetched pages for.
+    QUERY_CACHE_SIZE = 100
+
+    # Clients record request metrics in ``restorm.metrics.registry``. Off by
+    # default, as it times every request.
+    COLLECT_METRICS = False
+
+    # The fraction of requests logged by clients, the maximum number of
+    # characters of bodies in the log, and the duration in seconds from which
+    # requests are logged as slow (``None`` to not log slow requests).
+    REQUEST_LOG_SAMPLE_RATE = 1.0
+    REQUEST_LOG_MAX_BODY = 1024
+    SLOW_REQUEST_THRESHOLD = None
+
+    # The number of requests kept in ``qs.stats.requests`` per queryset. The
+    # counters of ``qs.stats`` include all requests.
+    QUERY_STATS_SIZE = 100
+
+    # The number of slow requests kept by ``restorm.profiler.profiler``.
+    SLOW_REQUEST_PROFILE_SIZE = 100
+
+    # Within a unit of work (see ``restorm.detector``), requests for this many
+    # different URLs of a pattern from the same call site are reported as an
+    # N+1 problem, and this many GET requests for the same URL as duplicates.
+    # ``None`` disables the check.
+    N_PLUS_ONE_THRESHOLD = 10
+    DUPLICATE_REQUEST_THRESHOLD = 3
+
 
 settings = Settings()
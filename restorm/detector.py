@@ -0,0 +1,170 @@
+"""
+N+1 and duplicate request detection.
+
+Within a unit of work, such as a Django request or a Celery task, clients
+count the requests made per ``Resource`` class, URI pattern name and call
+site (the innermost caller outside RestORM). When the unit of work ends, two
+kinds of problems are reported:
+
+* ``n+1``: the same pattern was requested for
+  ``settings.N_PLUS_ONE_THRESHOLD`` or more different URLs from the same
+  call site, typically by accessing a related field or calling ``get()`` in
+  a loop.
+* ``duplicate``: the identical URL was requested
+  ``settings.DUPLICATE_REQUEST_THRESHOLD`` or more times with a GET request.
+
+Requests that RestORM itself makes per object from worker threads, such as
+``in_bulk()`` without ``Meta.in_bulk_param`` or the fallback of
+``bulk_create()``, are not reported as N+1 problems.
+
+Each problem is logged as a warning to the ``restorm.detector`` logger, with
+a suggested fix, and counted in the ``restorm_detected_problems_total``
+metric. Use ``detect()`` as a context manager::
+
+    from restorm.detector import detect
+
+    with detect():
+        for book in Book.objects.all()[:100]:
+            print(book.author.name)
+
+In Django projects, add ``restorm.middleware.DetectorMiddleware`` to detect
+problems per request. Counting a request takes a dictionary update and a
+walk up the stack to the call site, so detection can be left enabled in
+production.
+"""
+from collections import namedtuple
+from contextvars import ContextVar
+import logging
+import threading
+
+from restorm.conf import settings
+from restorm.metrics import get_request_labels, registry
+from restorm.profiler import get_call_site, is_fanned_out
+
+
+logger = logging.getLogger('restorm.detector')
+
+_current_unit = ContextVar('restorm_unit_of_work', default=None)
+
+detected_problems_total = registry.counter(
+    'restorm_detected_problems_total',
+    'Number of N+1 and duplicate request problems detected.',
+    ('resource', 'pattern', 'kind'))
+
+
+Problem = namedtuple('Problem', [
+    'kind', 'resource', 'pattern', 'call_site', 'count', 'uri', 'suggestion'])
+
+
+def _suggest(kind, resource, pattern):
+    model = resource or 'the resource'
+    if kind == 'duplicate':
+        return (
+            'Reuse the retrieved object, or use restorm.session() to retrieve '
+            'each %s object once per unit of work.' % model)
+    if pattern == 'item':
+        return (
+            'Retrieve the %s objects at once with %s.objects.in_bulk(ids) '
+            'instead of one request per object.' % (model, model))
+    return (
+        'Retrieve the %s rows at once with a single query, for example with '
+        'an __in lookup, instead of one query per object.' % model)
+
+
+class UnitOfWork(object):
+    """
+    Counts the requests made while it is the current unit of work. Use it as
+    a context manager to make it the current unit of work.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # The URLs requested per resource, pattern and call site.
+        self._groups = {}
+        # The number of GET requests per URL, and their labels.
+        self._urls = {}
+        self._tokens = []
+
+    def add(self, request):
+        labels = get_request_labels()
+        # Requests made per object by bulk operations are not N+1 problems.
+        key = None if is_fanned_out() else labels + (get_call_site(),)
+        uri = request.uri
+        with self._lock:
+            if key is not None:
+                uris = self._groups.get(key)
+                if uris is None:
+                    uris = self._groups[key] = set()
+                uris.add(uri)
+            if request.method == 'GET':
+                count, url_labels = self._urls.get(uri, (0, labels))
+                self._urls[uri] = (count + 1, url_labels)
+
+    def problems(self):
+        """
+        Returns a list of the detected ``Problem`` tuples.
+        """
+        problems = []
+        with self._lock:
+            groups = sorted(
+                self._groups.items(), key=lambda item: -len(item[1]))
+            urls = sorted(self._urls.items(), key=lambda item: -item[1][0])
+
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        for (resource, pattern, call_site), uris in groups:
+            if threshold is None or len(uris) < threshold:
+                break
+            problems.append(Problem(
+                'n+1', resource, pattern, call_site, len(uris), min(uris),
+                _suggest('n+1', resource, pattern)))
+
+        threshold = settings.DUPLICATE_REQUEST_THRESHOLD
+        for uri, (count, (resource, pattern)) in urls:
+            if threshold is None or count < threshold:
+                break
+            problems.append(Problem(
+                'duplicate', resource, pattern, None, count, uri,
+                _suggest('duplicate', resource, pattern)))
+        return problems
+
+    def report(self):
+        """
+        Logs and counts the detected problems, and returns them.
+        """
+        problems = self.problems()
+        for problem in problems:
+            detected_problems_total.inc(
+                (problem.resource, problem.pattern, problem.kind))
+            if problem.kind == 'n+1':
+                message = '%s "%s" requests for %d different URLs from %s' % (
+                    problem.resource or 'Unlabeled', problem.pattern or '-',
+                    problem.count, '%s:%s' % problem.call_site
+                    if problem.call_site else 'an unknown call site')
+            else:
+                message = '%s was requested %d times' % (
+                    problem.uri, problem.count)
+            logger.warning(
+                '%s (%s). %s', message, problem.kind, problem.suggestion,
+                extra={'problem': problem})
+        return problems
+
+    def __enter__(self):
+        self._tokens.append(_current_unit.set(self))
+        return self
+
+    def __exit__(self, type, value, traceback):
+        _current_unit.reset(self._tokens.pop())
+        self.report()
+
+
+def detect():
+    """
+    Returns a new ``UnitOfWork`` to use as a context manager.
+    """
+    return UnitOfWork()
+
+
+def get_unit_of_work():
+    """
+    Returns the current ``UnitOfWork``, or ``None``.
+    """
+    return _current_unit.get()
@@ -23,8 +23,16 @@ Shut it down with CTRL-C. The above Python script basically does:
 >>> server.serve_forever()
 
 """
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qsl
+import threading
+
+from requests import Response
+
 from restorm.clients.jsonclient import JSONClientMixin, json
 from restorm.clients.mockclient import BaseMockApiClient
+from restorm.lookups import LOOKUPS, evaluate
 
 
 class LibraryApiClient(BaseMockApiClient, JSONClientMixin):
@@ -216,3 +224,258 @@ class TicketApiClient(BaseMockApiClient, JSONClientMixin):
             },
         }
         super(TicketApiClient, self).__init__(responses=responses, root_uri=root_uri)
+
+
+class CatalogApiClient(BaseMockApiClient, JSONClientMixin):
+    """
+    Mock catalog webservice containing a configurable number of generated
+    books.
+
+    In contrast to the other mock webservices, responses are computed from the
+    request instead of being looked up. The book list is paginated using the
+    ``page`` and ``page_size`` query parameters and any other query parameter
+    that matches a book attribute, optionally followed by a lookup like
+    ``__in`` (with a comma separated list of values) or ``__gte``, filters the
+    list. The ``ordering`` query parameter orders the list on a comma separated
+    list of attributes, prefixed with "-" for descending order, and the
+    ``fields`` query parameter limits the returned attributes to a comma
+    separated list. The aggregate resource ``book/aggregate/`` returns
+    aggregates, like ``price__sum``, over the filtered books.
+
+    Books can be created, updated and deleted one at a time on the list and
+    item resources, or many at a time by sending a list to the batch resource
+    ``book/batch/``: a list of books to create with POST, a list of partial
+    books, including their ``id``, to update with PATCH and a list of ids to
+    delete with DELETE. A book requires a title.
+
+    >>> from restorm.examples.mock.api import CatalogApiClient
+    >>> client = CatalogApiClient(size=25)
+    >>> response = client.get('book/?page=2&page_size=10')
+    >>> response.content['count']
+    25
+    >>> [row['id'] for row in response.content['results']][:3]
+    [11, 12, 13]
+
+    """
+    def __init__(self, root_uri=None, size=100):
+        if not root_uri:
+            root_uri = 'http://localhost/api/'
+
+        self.books = OrderedDict(
+            (pk, self.create_book(pk)) for pk in range(1, size + 1))
+        self._lock = threading.Lock()
+        super(CatalogApiClient, self).__init__(responses={}, root_uri=root_uri)
+
+    def create_book(self, pk):
+        return {
+            'id': pk,
+            'isbn': '978-%010d' % pk,
+            'title': 'Book %d' % pk,
+            'author': pk % 7 + 1,
+            'price': '%d.%02d' % (pk % 50 + 5, pk % 100),
+            'pages': 100 + (pk * 37) % 900,
+            'in_stock': bool(pk % 3),
+            'created': '2012-%02d-%02d' % (pk % 12 + 1, pk % 28 + 1),
+        }
+
+    def filter_books(self, params):
+        """
+        Returns the books matching all ``params`` that name a book attribute.
+        """
+        books = self.books.values()
+        for key, value in params.items():
+            if key in ('page', 'page_size', 'fields', 'ordering', 'aggregate',
+                       'group_by'):
+                continue
+            name, _, lookup = key.partition('__')
+            if lookup == 'in':
+                values = value.split(',')
+                books = [b for b in books if '%s' % b.get(name) in values]
+            elif lookup in LOOKUPS:
+                other = self.parse_value(value)
+                if lookup == 'range':
+                    other = [self.parse_value(v) for v in value.split(',')]
+                books = [b for b in books
+                         if evaluate(b.get(name), lookup, other)]
+            else:
+                books = [b for b in books if '%s' % b.get(key) == value]
+        books = list(books)
+        if 'ordering' in params:
+            for field in reversed(params['ordering'].split(',')):
+                books.sort(key=lambda b: b.get(field.lstrip('-')),
+                           reverse=field.startswith('-'))
+        return books
+
+    def parse_value(self, value):
+        """
+        Returns a query parameter value as a number if it is one, such that
+        it is compared as a number.
+        """
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            return value
+
+    def validate_book(self, data):
+        if not data.get('title'):
+            return {'title': ['This field is required.']}
+        return None
+
+    def save_book(self, data, pk=None, partial=False):
+        """
+        Creates or updates a book and returns a tuple of the status code and
+        the response content.
+        """
+        with self._lock:
+            if pk is None:
+                pk = max(self.books) + 1 if self.books else 1
+                book, status_code = {'id': pk}, 201
+            elif pk in self.books:
+                book, status_code = dict(self.books[pk]), 200
+            else:
+                return 404, None
+            if not partial:
+                book = {'id': pk}
+            book.update(data)
+            book['id'] = pk
+            errors = self.validate_book(book)
+            if errors:
+                return 400, errors
+            self.books[pk] = book
+        return status_code, book
+
+    def get_response_from_request(self, request):
+        response = Response()
+        response.headers = {'Content-Type': 'application/json'}
+
+        path = request.uri
+        if path.startswith(self.root_uri):
+            path = path[len(self.root_uri):]
+        path, _, query_string = path.partition('?')
+        params = dict(parse_qsl(query_string))
+        data = json.loads(request.body) if request.body else None
+
+        status_code, content = 404, None
+        if path == 'book/' and request.method == 'GET':
+            books = self.filter_books(params)
+            if 'page_size' in params:
+                page_size = int(params['page_size'])
+                offset = (int(params.get('page', 1)) - 1) * page_size
+                content = {
+                    'count': len(books),
+                    'results': books[offset:offset + page_size],
+                }
+            else:
+                content = books
+            status_code = 200
+        elif path == 'book/' and request.method == 'POST':
+            status_code, content = self.save_book(data)
+        elif path == 'book/aggregate/' and request.method == 'GET':
+            status_code, content = 200, self.aggregate(
+                self.filter_books(params), params)
+        elif path == 'book/batch/':
+            status_code, content = self.batch(request.method, data)
+        elif path.startswith('book/'):
+            try:
+                pk = int(path[len('book/'):])
+            except ValueError:
+                pk = None
+            if pk not in self.books:
+                pass
+            elif request.method == 'GET':
+                status_code, content = 200, self.books[pk]
+            elif request.method in ('PUT', 'PATCH'):
+                status_code, content = self.save_book(
+                    data, pk, partial=request.method == 'PATCH')
+            elif request.method == 'DELETE':
+                with self._lock:
+                    self.books.pop(pk, None)
+                status_code, content = 204, ''
+
+        if status_code == 200 and 'fields' in params:
+            names = params['fields'].split(',')
+            sparse = lambda book: dict(
+                (k, v) for k, v in book.items() if k in names)
+            if isinstance(content, list):
+                content = [sparse(b) for b in content]
+            elif 'results' in content:
+                content['results'] = [sparse(b) for b in content['results']]
+            else:
+                content = sparse(content)
+
+        response.status_code = status_code
+        if status_code == 404:
+            response.headers = {'Content-Type': 'text/plain'}
+            response._content = 'Page not found'
+        elif content == '':
+            response._content = ''
+        else:
+            response._content = json.dumps(content)
+
+        return response
+
+    def aggregate(self, books, params):
+        """
+        Returns the aggregates named by the ``aggregate`` query parameter,
+        like ``price__sum``, over ``books``, or a list of them per group of
+        the ``group_by`` query parameter fields. Sums and averages are sent as
+        strings.
+        """
+        number = lambda value: Decimal('%s' % value)
+        functions = {
+            'count': len,
+            'sum': lambda values: '%s' % sum(number(v) for v in values),
+            'avg': lambda values: '%s' % (
+                sum(number(v) for v in values) / len(values)),
+            'min': lambda values: min(values, key=number),
+            'max': lambda values: max(values, key=number),
+        }
+
+        def get_result(books):
+            result = {}
+            for alias in params['aggregate'].split(','):
+                field, _, function = alias.rpartition('__')
+                values = [b[field] for b in books if b.get(field) is not None]
+                result[alias] = functions[function](values)
+            return result
+
+        if not params.get('group_by'):
+            return get_result(books)
+        fields = params['group_by'].split(',')
+        groups = OrderedDict()
+        for book in books:
+            key = tuple(book.get(field) for field in fields)
+            groups.setdefault(key, []).append(book)
+        results = []
+        for key, group in groups.items():
+            result = get_result(group)
+            result.update(zip(fields, key))
+            results.append(result)
+        return results
+
+    def batch(self, method, data):
+        """
+        Handles a request to the batch resource. All books are validated
+        before any book is changed.
+        """
+        if method == 'DELETE':
+            with self._lock:
+                for pk in data:
+                    self.books.pop(pk, None)
+            return 204, ''
+        if method not in ('POST', 'PATCH'):
+            return 405, 'Method not allowed'
+
+        errors = []
+        for item in data:
+            if method == 'PATCH':
+                item = dict(self.books.get(item.get('id'), {}), **item)
+            errors.append(self.validate_book(item) or {})
+        if any(errors):
+            return 400, errors
+
+        if method == 'POST':
+            return 201, [self.save_book(item)[1] for item in data]
+        return 200, [
+            self.save_book(item, item['id'], partial=True)[1]
+            for item in data]
@@ -10,6 +10,10 @@ class RestServerException(RestException):
     pass
 
 
+class RestNotFoundException(RestServerException):
+    pass
+
+
 class RestValidationException(RestServerException):
     def __init__(self, msg, response=None):
         self.response = response
@@ -1,16 +1,7 @@
 """restorm resource fields."""
 from decimal import Decimal
 import json
-try:
-    from django.utils import six
-except ImportError:
-    import six
-
-from django import forms
-from django.core.validators import URLValidator
-from django.core.exceptions import ValidationError
-from django.utils.encoding import smart_text
-from django.utils.text import capfirst
+
 #from jsonfield.encoder import JSONEncoder
 #from jsonfield.fields import JSONFormField
 #from jsonfield_compat.fields import JSONField
@@ -59,6 +50,8 @@ class Field(object):
             limit_choices_to=None):
         """Returns choices with a default blank choices included, for use
         as SelectField choices for this field."""
+        from django.utils.encoding import smart_text
+
         blank_defined = False
         choices = list(self.choices) if self.choices else []
         named_groups = choices and isinstance(choices[0][1], (list, tuple))
@@ -92,9 +85,20 @@ class Field(object):
             verbose_name = self.attname.replace('_', ' ')
         return verbose_name
 
+    def load_deferred(self, instance):
+        """
+        Loads the field data if the field was deferred on ``instance`` and is
+        not loaded yet.
+        """
+        deferred_fields = getattr(instance, '_deferred_fields', None)
+        if deferred_fields and self.attname in deferred_fields and \
+                self.attname not in instance.data:
+            instance._load_deferred_fields()
+
     def __get__(self, instance, instance_type=None):
         if instance is None or not hasattr(instance, 'client'):
             return self
+        self.load_deferred(instance)
         return instance.data.get(self.attname, self.default)
 
     def clean(self, instance, value):
@@ -149,6 +153,9 @@ class Field(object):
         """
         Returns a django.forms.Field instance for this database Field.
         """
+        from django import forms
+        from django.utils.text import capfirst
+
         defaults = {'required': not self.blank,
                     'label': capfirst(self.verbose_name),
                     'help_text': self.help_text}
@@ -195,6 +202,8 @@ class BooleanField(Field):
         return bool(value)
 
     def formfield(self, **kwargs):
+        from django import forms
+
         # Unlike most fields, BooleanField figures out include_blank from
         # self.null instead of self.blank.
         if self.choices:
@@ -215,6 +224,8 @@ class IntegerField(Field):
             return int(value)
 
     def formfield(self, **kwargs):
+        from django import forms
+
         defaults = {'form_class': forms.IntegerField}
         kwargs.pop('choices', None)
         # assert not choices, choices
@@ -229,6 +240,8 @@ class DecimalField(Field):
         return Decimal(value)
 
     def formfield(self, **kwargs):
+        from django import forms
+
         defaults = {'form_class': forms.DecimalField}
         defaults.update(kwargs)
         return super(DecimalField, self).formfield(**defaults)
@@ -269,6 +282,8 @@ class TextField(Field):
         return value
 
     def formfield(self, **kwargs):
+        from django import forms
+
         # Passing max_length to forms.CharField means that the value's length
         # will be validated twice. This is considered acceptable since we want
         # the value in the form field (to pass into widget for example).
@@ -314,7 +329,7 @@ class JSONField(TextField):
     def dumps_for_display(self, value):
         kwargs = {"indent": 2}
         kwargs.update(self.dump_kwargs)
-        if isinstance(value, six.string_types):
+        if isinstance(value, str):
             return json.dumps(json.loads(value), **kwargs)
         elif value.__class__.__name__ == 'DynamicRestObject':
             return json.dumps(value._obj, **kwargs)
@@ -336,15 +351,16 @@ class URLField(CharField):
         super(URLField, self).__init__(**kwargs)
 
     def clean(self, instance, value):
+        from django.core.validators import URLValidator
+
         value = super(URLField, self).clean(instance, value)
         validate = URLValidator()
-        try:
-            validate(value)
-        except ValidationError as e:
-            raise e
+        validate(value)
         return value
 
     def formfield(self, **kwargs):
+        from django import forms
+
         # As with CharField, this will cause URL validation to be performed
         # twice.
         defaults = {
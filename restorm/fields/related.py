@@ -1,9 +1,6 @@
-from django import forms
-from django.utils.functional import SimpleLazyObject, cached_property
-from django.utils.module_loading import import_string
-from django.db.models import FieldDoesNotExist
+from functools import cached_property
 
-from restorm.forms import ResourceChoiceField
+from restorm.utils import import_string
 
 from .base import Field
 
@@ -63,6 +60,8 @@ class ManyToOneRel(Relation):
         self.field_name = field_name
 
     def get_related_field(self):
+        from django.core.exceptions import FieldDoesNotExist
+
         field = self.to._meta.get_field(self.field_name)
         if not field.concrete:
             raise FieldDoesNotExist(
@@ -84,6 +83,8 @@ class ManyToManyRel(Relation):
         self.through = through
 
     def get_related_field(self):
+        from django.core.exceptions import FieldDoesNotExist
+
         field = self.to._meta.get_field(self.field_name)
         if not field.concrete:
             raise FieldDoesNotExist(
@@ -97,17 +98,19 @@ class RelatedResource(Field):
     def __init__(self, field, resource, get_itm_params=None, **kwargs):
         super(RelatedResource, self).__init__(**kwargs)
         self.is_relation = True
+        # A dotted path to the resource is imported on first use.
         if isinstance(resource, str):
-            def lazy_resource(resource_str):
-                def import_resource():
-                    return import_string(resource_str)
-                return SimpleLazyObject(import_resource)
-            resource = lazy_resource(resource)
-        self._resource = resource
+            self._resource_path = resource
+        else:
+            self._resource = resource
         if get_itm_params is None:
             get_itm_params = _default_get_itm_params
         self._get_itm_params = get_itm_params
 
+    @cached_property
+    def _resource(self):
+        return import_string(self._resource_path)
+
     @cached_property
     def rel(self):
         return self.relation_class(self, self._resource)
@@ -142,6 +145,7 @@ class RelatedResource(Field):
         # may be easier to call the Fields parent first
         if instance is None or not hasattr(instance, 'client'):
             return self
+        self.load_deferred(instance)
         itm_params = self._get_itm_params(instance.data.get(self.attname, self.default), self.rel.to)
         return self._resource._default_manager.get(**itm_params)
 
@@ -152,6 +156,8 @@ class RelatedResource(Field):
 
         itm_params = self._get_itm_params(value, self.rel.to)
         if bool([True for v in itm_params.values() if v]):
+            from django.utils.functional import SimpleLazyObject
+
             def lazy_wrap(resource, itm_params):
                 def get_obj():
                     return resource._default_manager.get(**itm_params)
@@ -173,6 +179,8 @@ class ToOneField(RelatedResource):
             self, self._resource, self._resource._meta.pk.attname)
 
     def formfield(self, **kwargs):
+        from restorm.forms import ResourceChoiceField
+
         defaults = {
             'form_class': ResourceChoiceField,
             'queryset': self.rel.to._default_manager.get_queryset(),
@@ -198,23 +206,19 @@ class ToManyField(RelatedResource):
     relation_class = ManyToManyRel
 
     def __init__(self, *args, **kwargs):
-        through = kwargs.pop('through', None)
-        if through and isinstance(through, str):
-            def lazy_resource(resource_str):
-                def import_resource():
-                    return import_string(resource_str)
-                return SimpleLazyObject(import_resource)
-            through = lazy_resource(through)
-        self._through = through
+        self._through = kwargs.pop('through', None)
         return super(ToManyField, self).__init__(*args, **kwargs)
 
     @cached_property
     def rel(self):
+        through = self._through
+        if through and isinstance(through, str):
+            through = import_string(through)
         return self.relation_class(
             self,
             self._resource,
             self._resource._meta.pk.attname,
-            through=self._through)
+            through=through)
 
     def __set__(self, instance, value):
         if instance is None:
@@ -225,6 +229,8 @@ class ToManyField(RelatedResource):
             self._get_itm_params(x, self.rel.to) for x in value]
 
         if value and itm_params_list:
+            from django.utils.functional import SimpleLazyObject
+
             def lazy_wrap(resource, itm_params):
                 def get_obj():
                     return resource._default_manager.get(**itm_params)
@@ -243,6 +249,8 @@ class ToManyField(RelatedResource):
         return [[obj.pk, obj.__unicode__()] for obj in self.rel.to._default_manager.get_queryset()]
 
     def formfield(self, **kwargs):
+        from django import forms
+
         defaults = {
             'form_class': forms.TypedMultipleChoiceField,
             'choices': self.get_queryset_choices,
@@ -0,0 +1,138 @@
+"""
+Secondary indexes over the cached rows of a queryset.
+
+``RestQuerySet.index_by()`` fetches all rows of a queryset and builds an index
+on each given field. Querysets filtered from an indexed queryset, and ``get()``
+on it, are then evaluated on the cached rows using the index instead of
+requesting the API::
+
+    books = Book.objects.all().index_by('isbn')
+    book = books.get(isbn='978-1441413024')
+
+    prices = Book.objects.all().index_by('price', kind='sorted')
+    cheap = prices.filter(price__lt=10)
+
+A ``hash`` index answers ``exact`` and ``in`` lookups in constant time, a
+``sorted`` index also answers ``gt``, ``gte``, ``lt``, ``lte`` and ``range``
+lookups in logarithmic time.
+"""
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from restorm.lookups import format_value
+
+
+class Index(object):
+    """
+    Maps the values of ``field`` to the positions of the rows in the result
+    cache of a queryset.
+    """
+    lookups = ()
+
+    def __init__(self, field, rows):
+        self.field = field
+        self.build(rows)
+
+    def build(self, rows):
+        raise NotImplementedError()
+
+    def positions(self, lookup, value):
+        """
+        Returns the sorted positions of the rows that (may) match the lookup,
+        or ``None`` if this index cannot answer it.
+        """
+        raise NotImplementedError()
+
+
+class HashIndex(Index):
+    lookups = ('exact', 'in')
+
+    def build(self, rows):
+        self._positions = {}
+        for pos, row in rows:
+            value = row.get(self.field)
+            if value is not None:
+                self._positions.setdefault(format_value(value), []).append(pos)
+
+    def positions(self, lookup, value):
+        if lookup == 'exact':
+            return self._positions.get(format_value(value), [])
+        if lookup == 'in':
+            return sorted(
+                pos for v in set(format_value(v) for v in value)
+                for pos in self._positions.get(v, ()))
+        return None
+
+
+class SortedIndex(Index):
+    lookups = ('exact', 'in', 'gt', 'gte', 'lt', 'lte', 'range')
+
+    def build(self, rows):
+        entries = [
+            (pos, row.get(self.field)) for pos, row in rows
+            if row.get(self.field) is not None]
+        # Numbers are often sent as strings, like decimals. Compare values as
+        # numbers if they all are, as text otherwise.
+        self.numeric = all(
+            self._number(value) is not None for pos, value in entries)
+        if self.numeric:
+            entries = [(self._number(value), pos) for pos, value in entries]
+        else:
+            entries = [(format_value(value), pos) for pos, value in entries]
+        entries.sort()
+        self._keys = [key for key, pos in entries]
+        self._positions = [pos for key, pos in entries]
+
+    def _number(self, value):
+        if isinstance(value, bool):
+            return None
+        try:
+            return Decimal('%s' % value)
+        except InvalidOperation:
+            return None
+
+    def _key(self, value):
+        if self.numeric:
+            return self._number(value)
+        if isinstance(value, (int, float, Decimal)):
+            return None
+        return format_value(value)
+
+    def _range(self, lookup, value):
+        if lookup == 'range':
+            low, high = self._key(value[0]), self._key(value[1])
+            if low is None or high is None:
+                return None
+            return bisect_left(self._keys, low), bisect_right(self._keys, high)
+
+        key = self._key(value)
+        if key is None:
+            return None
+        if lookup == 'exact':
+            return bisect_left(self._keys, key), bisect_right(self._keys, key)
+        if lookup == 'gt':
+            return bisect_right(self._keys, key), len(self._keys)
+        if lookup == 'gte':
+            return bisect_left(self._keys, key), len(self._keys)
+        if lookup == 'lt':
+            return 0, bisect_left(self._keys, key)
+        if lookup == 'lte':
+            return 0, bisect_right(self._keys, key)
+        return None
+
+    def positions(self, lookup, value):
+        if lookup == 'in':
+            ranges = [self._range('exact', v) for v in value]
+        else:
+            ranges = [self._range(lookup, value)]
+        if None in ranges:
+            return None
+        return sorted(set(
+            pos for start, stop in ranges
+            for pos in self._positions[start:stop]))
+
+
+INDEX_TYPES = {
+    'hash': HashIndex,
+    'sorted': SortedIndex,
+}
@@ -0,0 +1,138 @@
+"""
+Django-style field lookups, like ``title__icontains`` or ``price__gte``.
+
+``RestQuerySet.filter()`` compiles lookups into query parameters using the
+``lookups`` translation table of the resource ``Meta``. The table maps a
+lookup name, or a ``<field>__<lookup>`` combination for a specific field, to
+either a query parameter name pattern or a callable::
+
+    class Book(Resource):
+        # ...
+
+        class Meta:
+            lookups = {
+                'in': '%(field)s__in',
+                'gte': '%(field)s__gte',
+                'title__icontains': 'search',
+                'created__lt': lambda field, value: {'before': value},
+            }
+
+A callable gets the field name and the value and returns a ``dict`` of query
+parameters. Lists and tuples (as used by ``in`` and ``range``) are sent as
+comma separated values, dates and times as ISO 8601 strings.
+
+Exact lookups are always sent as ``<field>=<value>``. If the resource declares
+a table, lookups that are not in it are evaluated locally on the rows
+returned by the API, which requests all pages. Without a table, lookups are
+sent as query parameters as is.
+"""
+import datetime
+from decimal import Decimal, InvalidOperation
+
+
+def _coerce(value, other):
+    """
+    Converts the API value ``value`` to the type of the Python value
+    ``other``, such that both can be compared.
+    """
+    if value is None or other is None:
+        return value
+    if isinstance(other, bool):
+        if isinstance(value, str):
+            return value.lower() in ('1', 'true', 'yes', 'on')
+        return bool(value)
+    if isinstance(other, (int, float, Decimal)):
+        try:
+            return Decimal('%s' % value)
+        except InvalidOperation:
+            return value
+    if isinstance(other, (datetime.date, datetime.time)):
+        return '%s' % value
+    if isinstance(other, str) and not isinstance(value, str):
+        return '%s' % value
+    return value
+
+
+def _prepare(other):
+    """
+    Converts the Python value ``other`` to the type ``_coerce`` converts API
+    values to.
+    """
+    if isinstance(other, bool) or other is None:
+        return other
+    if isinstance(other, (int, float, Decimal)):
+        return Decimal('%s' % other)
+    if isinstance(other, (datetime.date, datetime.time)):
+        return other.isoformat()
+    return other
+
+
+def _compare(func):
+    def lookup(value, other):
+        if value is None:
+            return False
+        return func(_coerce(value, other), _prepare(other))
+    return lookup
+
+
+def _text(func):
+    def lookup(value, other):
+        if value is None:
+            return False
+        return func('%s' % value, '%s' % other)
+    return lookup
+
+
+LOOKUPS = {
+    'exact': _compare(lambda a, b: a == b),
+    'iexact': _text(lambda a, b: a.lower() == b.lower()),
+    'gt': _compare(lambda a, b: a > b),
+    'gte': _compare(lambda a, b: a >= b),
+    'lt': _compare(lambda a, b: a < b),
+    'lte': _compare(lambda a, b: a <= b),
+    'contains': _text(lambda a, b: b in a),
+    'icontains': _text(lambda a, b: b.lower() in a.lower()),
+    'startswith': _text(lambda a, b: a.startswith(b)),
+    'istartswith': _text(lambda a, b: a.lower().startswith(b.lower())),
+    'endswith': _text(lambda a, b: a.endswith(b)),
+    'iendswith': _text(lambda a, b: a.lower().endswith(b.lower())),
+    'in': lambda value, others: any(
+        LOOKUPS['exact'](value, o) for o in others),
+    'range': lambda value, bounds: (
+        LOOKUPS['gte'](value, bounds[0]) and LOOKUPS['lte'](value, bounds[1])),
+    'isnull': lambda value, other: (value is None) == bool(other),
+}
+
+# A translation table for APIs that accept Django-style lookups as query
+# parameters, like APIs built with django-filter.
+DJANGO_LOOKUPS = dict(
+    (name, '%%(field)s__%s' % name) for name in LOOKUPS if name != 'exact')
+
+
+def evaluate(value, lookup, other):
+    """
+    Returns whether the API value ``value`` matches the lookup ``lookup`` with
+    the Python value ``other``.
+    """
+    return LOOKUPS[lookup](value, other)
+
+
+def clean_value(lookup, value):
+    """
+    Returns the Python value ``value`` of the lookup ``lookup`` as it is
+    evaluated locally: a comma separated string of ``in`` values is split.
+    """
+    if lookup == 'in' and isinstance(value, str):
+        return value.split(',')
+    return value
+
+
+def format_value(value):
+    """
+    Returns ``value`` as it is sent in a query parameter.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ','.join(format_value(v) for v in value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return '%s' % value
@@ -1,7 +1,24 @@
 # -*- coding: utf-8 -*-
-from restorm.exceptions import RestServerException, RestValidationException
+from itertools import islice
+
+from restorm import metrics
+from restorm.cache import query_cache
+from restorm.exceptions import (
+    ResourceException, RestServerException, RestValidationException)
 from restorm.patterns import ResourcePattern
 from restorm.query import RestQuerySet
+from restorm.utils import concurrent_map
+
+
+class BulkResult(list):
+    """
+    The list of objects passed to a bulk operation. Objects that could not be
+    saved are also listed in ``errors``, as tuples of the object and the
+    raised exception.
+    """
+    def __init__(self, objs=(), errors=None):
+        super(BulkResult, self).__init__(objs)
+        self.errors = errors or []
 
 
 class ResourceManagerDescriptor(object):
@@ -58,8 +75,160 @@ class ResourceManager(object):
     def order_by(self, *args):
         return self.get_queryset().order_by(*args)
 
+    def in_bulk(self, id_list=None):
+        return self.get_queryset().in_bulk(id_list)
+
+    def get_many(self, id_list):
+        return self.get_queryset().get_many(id_list)
+
+    def only(self, *fields):
+        return self.get_queryset().only(*fields)
+
+    def defer(self, *fields):
+        return self.get_queryset().defer(*fields)
+
+    def aggregate(self, *args, **kwargs):
+        return self.get_queryset().aggregate(*args, **kwargs)
+
+    def group_by(self, *fields):
+        return self.get_queryset().group_by(*fields)
+
     def create(self, **kwargs):
         """Send POST request to resource and return Resource instance."""
         instance = self.object_class(kwargs)
         instance.save()
         return instance
+
+    def bulk_create(self, objs, batch_size=None):
+        """
+        Creates all objects in ``objs`` and returns them as a ``BulkResult``.
+
+        If the resource declares a ``batch`` URI pattern, the objects are sent
+        to it as a list, with a POST request for every ``batch_size`` objects
+        (or a single request if not given). Otherwise, each object is saved
+        with its own request, with at most
+        ``settings.MAX_CONCURRENT_REQUESTS`` requests at the same time.
+
+        Data returned by the API, like the primary key, is stored on each
+        object. A failing object (or batch), including connection errors and
+        batch responses with a different number of objects, does not stop the
+        other objects from being created, its exception is added to
+        ``BulkResult.errors`` instead.
+        """
+        return self._bulk_save(objs, 'POST', batch_size=batch_size)
+
+    def bulk_update(self, objs, fields=None, batch_size=None):
+        """
+        Updates all objects in ``objs`` and returns them as a ``BulkResult``.
+        If ``fields`` are given, only these fields are sent.
+
+        If the resource declares a ``batch`` URI pattern, the objects are sent
+        to it as a list, with a PATCH request for every ``batch_size``
+        objects. Otherwise, each object is saved with its own request like in
+        ``bulk_create``. Objects that were never saved are not created, they
+        are added to ``BulkResult.errors`` instead.
+        """
+        return self._bulk_save(
+            objs, 'PATCH', fields=fields, batch_size=batch_size)
+
+    def _bulk_save(self, objs, method, fields=None, batch_size=None):
+        try:
+            return self._bulk_save_objects(objs, method, fields, batch_size)
+        finally:
+            query_cache.invalidate(self.object_class)
+
+    def _bulk_save_objects(self, objs, method, fields, batch_size):
+        result = BulkResult()
+
+        def is_unsaved(obj):
+            return method == 'PATCH' and not obj.absolute_url
+
+        def unsaved_error(obj):
+            return ResourceException(
+                'Cannot update an unsaved %s.' % obj.__class__.__name__)
+
+        if not self.options.batch:
+            def save(obj):
+                if is_unsaved(obj):
+                    return obj, unsaved_error(obj)
+                try:
+                    if method == 'PATCH':
+                        obj.save(update_fields=fields)
+                    else:
+                        obj.save()
+                except Exception as e:
+                    # Includes connection errors and timeouts of the client.
+                    return obj, e
+                return obj, None
+
+            for obj, error in concurrent_map(save, objs):
+                result.append(obj)
+                if error is not None:
+                    result.errors.append((obj, error))
+            return result
+
+        pattern = ResourcePattern.parse(self.options.batch)
+        absolute_url = pattern.get_absolute_url(root=self.options.root)
+        pk_attr = self.options.pk.attname
+        if fields is not None:
+            fields = set(fields)
+            fields.add(pk_attr)
+
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, batch_size)) if batch_size else list(objs)
+            if not batch:
+                break
+            result.extend(batch)
+
+            result.errors.extend(
+                (obj, unsaved_error(obj)) for obj in batch if is_unsaved(obj))
+            batch = [obj for obj in batch if not is_unsaved(obj)]
+            if not batch:
+                if not batch_size:
+                    break
+                continue
+
+            client = batch[0].client
+            try:
+                with metrics.request_labels(self.object_class, 'batch'):
+                    response = client.request(absolute_url, method, [
+                        obj._clean_request_data(fields=fields)
+                        for obj in batch])
+            except Exception as e:
+                result.errors.extend((obj, e) for obj in batch)
+                if not batch_size:
+                    break
+                continue
+
+            if response.status_code in [200, 201, 204]:
+                rows = response.content
+                if isinstance(rows, list) and len(rows) != len(batch):
+                    error = RestServerException(
+                        'Cannot save "%s" (%d): %d objects returned for %d '
+                        'objects sent.' % (
+                            response.request.uri, response.status_code,
+                            len(rows), len(batch)))
+                    result.errors.extend((obj, error) for obj in batch)
+                elif isinstance(rows, list):
+                    for obj, row in zip(batch, rows):
+                        if isinstance(row, dict):
+                            obj._set_response_data(
+                                row, partial=method == 'PATCH')
+            else:
+                if response.status_code in [400]:
+                    error = RestValidationException(
+                        'Cannot save "%s" (%d): %s' % (
+                            response.request.uri, response.status_code,
+                            response.content),
+                        response)
+                else:
+                    error = RestServerException('Cannot save "%s" (%d): %s' % (
+                        response.request.uri, response.status_code,
+                        response.content))
+                result.errors.extend((obj, error) for obj in batch)
+
+            if not batch_size:
+                break
+
+        return result
@@ -0,0 +1,258 @@
+"""
+Memory profiling of querysets and resources.
+
+``MemoryReport`` traces memory allocations with ``tracemalloc`` and
+attributes the allocated bytes to the stages of the pipeline from a response
+to ``Resource`` instances:
+
+* ``response``: the raw responses, allocated by the HTTP client libraries or
+  by the mock API clients,
+* ``deserialize``: the decoded JSON content (dictionaries, lists, strings),
+* ``rest_objects``: ``RestObject`` instances and their dynamic classes, see
+  ``restorm.rest.restify()``,
+* ``hydrate``: ``Resource`` instances and the result cache of querysets,
+* ``other``: everything else.
+
+Allocations are attributed to the stage of the most recent RestORM, client
+library or mock API frame of their traceback. Use it as a context manager::
+
+    from restorm.memory import MemoryReport
+
+    with MemoryReport() as report:
+        books = Book.objects.all()[0:1000]
+    print(report)
+    # stage          peak (bytes)  retained (bytes)
+    # response             153078              6174
+    # deserialize          558835            282467
+    # ...
+    # 1000 rows, 1188 bytes per row
+
+or evaluate a queryset, or a slice of it, with ``qs.memory_report()``.
+
+``retained`` is the memory still allocated at the end of the block. The
+``peak`` of each stage is the most memory it had allocated after a response
+was deserialized or a page was hydrated; the total peak is the highest
+amount of memory allocated at any moment. Allocations of other threads made
+while tracing are included. Tracing makes Python code several times slower, so
+this is meant for profiling, not for production.
+"""
+from collections import OrderedDict
+import http.client
+import os
+import socket
+import tracemalloc
+
+import requests
+
+from restorm.stats import record
+
+STAGES = ('response', 'deserialize', 'rest_objects', 'hydrate', 'other')
+
+_RESTORM_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def _package_dir(module):
+    return os.path.dirname(os.path.abspath(module.__file__)) + os.sep
+
+
+_RESPONSE_PATHS = [
+    os.path.join(_RESTORM_DIR, 'clients') + os.sep,
+    os.path.join(_RESTORM_DIR, 'examples', 'mock') + os.sep,
+    _package_dir(requests),
+    os.path.abspath(http.client.__file__),
+    os.path.abspath(socket.__file__),
+]
+
+try:
+    import urllib3
+except ImportError:
+    pass
+else:
+    _RESPONSE_PATHS.append(_package_dir(urllib3))
+
+# Path prefixes of the files per stage, checked in order for each frame.
+_STAGE_PATHS = (
+    ('rest_objects', (os.path.join(_RESTORM_DIR, 'rest.py'),)),
+    ('deserialize', (os.path.join(_RESTORM_DIR, 'clients', 'jsonclient.py'),)),
+    ('hydrate', (
+        os.path.join(_RESTORM_DIR, 'resource.py'),
+        os.path.join(_RESTORM_DIR, 'query.py'),
+        os.path.join(_RESTORM_DIR, 'sessions.py'),
+        os.path.join(_RESTORM_DIR, 'fields') + os.sep,
+    )),
+    ('response', tuple(_RESPONSE_PATHS)),
+)
+
+_file_stages = {}
+
+# Allocations made by the snapshots and reports themselves.
+_IGNORED_FILES = frozenset([tracemalloc.__file__, __file__])
+
+_active_reports = []
+
+
+def is_enabled():
+    return bool(_active_reports)
+
+
+def checkpoint():
+    """
+    Lets the active reports take a snapshot to update the peak memory per
+    stage. Called after deserializing a response and after hydrating a page.
+    """
+    for report in _active_reports:
+        report.checkpoint()
+
+
+def get_stage(traceback):
+    """
+    Returns the pipeline stage of an allocation with the
+    ``tracemalloc.Traceback`` ``traceback``.
+    """
+    return _get_frames_stage([
+        (frame.filename, frame.lineno) for frame in reversed(traceback)
+    ]) or 'other'
+
+
+def _get_frames_stage(frames):
+    """
+    Returns the stage of the (filename, lineno) ``frames``, from the most
+    recent to the oldest, or ``''`` for allocations of the reports.
+    """
+    if frames and frames[0][0] in _IGNORED_FILES:
+        return ''
+    for filename, lineno in frames:
+        stage = _get_file_stage(filename)
+        if stage is not None:
+            return stage
+    return 'other'
+
+
+def _get_file_stage(filename):
+    try:
+        return _file_stages[filename]
+    except KeyError:
+        pass
+    path = os.path.abspath(filename)
+    stage = None
+    for name, prefixes in _STAGE_PATHS:
+        if path.startswith(prefixes):
+            stage = name
+            break
+    _file_stages[filename] = stage
+    return stage
+
+
+class MemoryReport(object):
+    """
+    Traces the memory allocated within the ``with`` block, per pipeline
+    stage. ``nframes`` is the number of frames stored per allocation; deeper
+    call stacks are attributed to ``other``.
+    """
+    def __init__(self, nframes=30):
+        self.nframes = nframes
+        self.stats = None
+        self.peak = OrderedDict((stage, 0) for stage in STAGES)
+        self.retained = OrderedDict((stage, 0) for stage in STAGES)
+        self.peak_total = 0
+        self._started = False
+        self._start_sizes = None
+        self._start_memory = self._peak_memory = 0
+        self._recording = None
+
+    @property
+    def rows(self):
+        """
+        Returns the number of ``Resource`` instances hydrated from list
+        responses.
+        """
+        return self.stats.hydrated if self.stats is not None else 0
+
+    @property
+    def bytes_per_row(self):
+        """
+        Returns the retained bytes per hydrated row, or ``None`` if no rows
+        were hydrated.
+        """
+        if not self.rows:
+            return None
+        return sum(self.retained.values()) / float(self.rows)
+
+    def checkpoint(self):
+        # The snapshots themselves are traced, so the peak is read before
+        # and reset after taking one.
+        self._peak_memory = max(
+            self._peak_memory, tracemalloc.get_traced_memory()[1])
+        allocated = OrderedDict(
+            (stage, max(size - self._start_sizes[stage], 0))
+            for stage, size in self._stage_sizes().items())
+        tracemalloc.reset_peak()
+        for stage, size in allocated.items():
+            if size > self.peak[stage]:
+                self.peak[stage] = size
+        return allocated
+
+    def _stage_sizes(self):
+        sizes = OrderedDict((stage, 0) for stage in STAGES)
+        # Grouping by traceback computes the stage once per call stack, which
+        # is much faster than filtering or comparing snapshots per stage.
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.statistics('traceback'):
+            stage = _get_frames_stage([
+                (frame.filename, frame.lineno)
+                for frame in reversed(stat.traceback)])
+            if stage:
+                sizes[stage] += stat.size
+        return sizes
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started = True
+        self._start_sizes = self._stage_sizes()
+        tracemalloc.reset_peak()
+        self._start_memory = self._peak_memory = \
+            tracemalloc.get_traced_memory()[0]
+        self._recording = record()
+        self.stats = self._recording.__enter__()
+        _active_reports.append(self)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        _active_reports.remove(self)
+        recording, self._recording = self._recording, None
+        recording.__exit__(type, value, traceback)
+        try:
+            self.retained = self.checkpoint()
+            self.peak_total = self._peak_memory - self._start_memory
+        finally:
+            self._start_sizes = None
+            if self._started:
+                tracemalloc.stop()
+                self._started = False
+
+    def as_dict(self):
+        return {
+            'peak': dict(self.peak),
+            'retained': dict(self.retained),
+            'peak_total': self.peak_total,
+            'rows': self.rows,
+            'bytes_per_row': self.bytes_per_row,
+        }
+
+    def __str__(self):
+        lines = ['%-14s %14s %17s' % (
+            'stage', 'peak (bytes)', 'retained (bytes)')]
+        for stage in STAGES:
+            lines.append('%-14s %14d %17d' % (
+                stage, self.peak[stage], self.retained[stage]))
+        lines.append('%-14s %14d %17d' % (
+            'total', self.peak_total, sum(self.retained.values())))
+        if self.bytes_per_row is not None:
+            lines.append('%d rows, %d bytes per row' % (
+                self.rows, self.bytes_per_row))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return '<MemoryReport: %d bytes retained>' % sum(
+            self.retained.values())
@@ -0,0 +1,267 @@
+"""
+Request metrics.
+
+Clients record, for every request, histograms of the time spent in each
+phase:
+
+* ``serialize``: serializing the request body,
+* ``wait``: connecting and waiting for the response headers,
+* ``transfer``: receiving the response body,
+* ``deserialize``: deserializing the response body,
+* ``hydrate``: creating ``Resource`` instances from the rows of a page.
+
+Requests are counted per status code, and the bytes sent and received are
+counted too. All metrics are labeled with the ``Resource`` class and the
+name of its ``ResourcePattern`` (``list``, ``item``, ``create``, ``batch``,
+...) the request was made for, rather than the URL, to keep the number of
+label values bounded. Requests made outside RestORM querysets and resources
+have empty labels.
+
+The metrics are kept in ``restorm.metrics.registry``::
+
+    from restorm.metrics import registry
+    from restorm.metrics.prometheus import render
+
+    snapshot = registry.collect()
+    text = render(snapshot)
+
+Set ``settings.COLLECT_METRICS`` to ``True`` to collect them. To
+aggregate the metrics of several worker processes, see
+``restorm.metrics.shared``.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+
+from restorm.conf import settings
+
+
+# In seconds, from 1ms to 10s.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0)
+
+PHASES = ('serialize', 'wait', 'transfer', 'deserialize', 'hydrate')
+
+_request_labels = ContextVar('restorm_request_labels', default=('', ''))
+
+
+class Metric(object):
+    """
+    A metric with a value per combination of label values.
+    """
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        # The ``SharedSegment`` the values are also added to, if any.
+        self.segment = None
+
+    def collect(self):
+        """
+        Returns a dictionary describing the metric, with a copy of its values
+        keyed by the tuples of label values.
+        """
+        with self._lock:
+            values = dict(
+                (labels, self._copy(value))
+                for labels, value in self._values.items())
+        return {
+            'name': self.name,
+            'type': self.type,
+            'help': self.help,
+            'labelnames': self.labelnames,
+            'values': values,
+        }
+
+    def _copy(self, value):
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+            if self.segment is not None:
+                self.segment.add(self.name, labels, ((0, amount),))
+
+
+class Histogram(Metric):
+    """
+    Counts the observed values per bucket. The value per label values is a
+    list of the count per bucket (not cumulative, the last one for values
+    above the largest bucket), followed by the sum and the count of all
+    observed values.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 3)
+            counts[idx] += 1
+            counts[-2] += value
+            counts[-1] += 1
+            if self.segment is not None:
+                size = len(counts)
+                self.segment.add(self.name, labels, (
+                    (idx, 1), (size - 2, value), (size - 1, 1)))
+
+    def _copy(self, value):
+        return list(value)
+
+    def collect(self):
+        data = super(Histogram, self).collect()
+        data['buckets'] = self.buckets
+        return data
+
+
+class MetricsRegistry(object):
+    """
+    The metrics of this process, by name.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.segment = None
+
+    def _get_or_create(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(
+                    name, *args, **kwargs)
+                metric.segment = self.segment
+        if not isinstance(metric, metric_class):
+            raise ValueError(
+                'Metric "%s" is already registered as a %s.' % (
+                    name, metric.type))
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(
+            Histogram, name, help, labelnames, buckets=buckets)
+
+    def collect(self):
+        """
+        Returns a list with the description of each metric (see
+        ``Metric.collect()``), sorted by name.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return [metric.collect() for name, metric in metrics]
+
+    def get(self, name):
+        """
+        Returns the metric registered as ``name``, or ``None``.
+        """
+        with self._lock:
+            return self._metrics.get(name)
+
+    def share(self, segment):
+        """
+        Also adds the values of all metrics to the ``SharedSegment``
+        ``segment``, or stops doing so if it is ``None``.
+        """
+        with self._lock:
+            self.segment = segment
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            with metric._lock:
+                metric.segment = segment
+
+    def reset(self):
+        """
+        Resets the values of all metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+request_phase_seconds = registry.histogram(
+    'restorm_request_phase_seconds',
+    'Time spent per phase of handling a request.',
+    ('resource', 'pattern', 'phase'))
+requests_total = registry.counter(
+    'restorm_requests_total',
+    'Number of requests, per method and response status code.',
+    ('resource', 'pattern', 'method', 'status'))
+request_bytes_total = registry.counter(
+    'restorm_request_bytes_total',
+    'Number of bytes sent in request bodies.',
+    ('resource', 'pattern'))
+response_bytes_total = registry.counter(
+    'restorm_response_bytes_total',
+    'Number of bytes received in response bodies.',
+    ('resource', 'pattern'))
+
+
+def is_enabled():
+    return settings.COLLECT_METRICS
+
+
+@contextmanager
+def request_labels(resource, pattern):
+    """
+    Labels the metrics of the requests made within the ``with`` block with
+    the ``Resource`` class ``resource`` and the pattern name ``pattern``.
+    """
+    token = _request_labels.set((resource.__name__, pattern))
+    try:
+        yield
+    finally:
+        _request_labels.reset(token)
+
+
+def get_request_labels():
+    """
+    Returns a tuple of the current resource and pattern label values.
+    """
+    return _request_labels.get()
+
+
+def observe_request(method, status_code, bytes_sent, bytes_received, timings):
+    """
+    Records a request with the time in seconds spent per phase in
+    ``timings``.
+    """
+    labels = _request_labels.get()
+    for phase, duration in timings.items():
+        request_phase_seconds.observe(labels + (phase,), duration)
+    requests_total.inc(labels + (method, '%s' % status_code))
+    if bytes_sent:
+        request_bytes_total.inc(labels, bytes_sent)
+    if bytes_received:
+        response_bytes_total.inc(labels, bytes_received)
+
+
+def observe_hydration(duration):
+    """
+    Records the time in seconds spent hydrating the rows of a page.
+    """
+    request_phase_seconds.observe(
+        _request_labels.get() + ('hydrate',), duration)
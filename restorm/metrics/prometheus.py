@@ -0,0 +1,73 @@
+"""
+Renders metrics in the Prometheus text exposition format, for example in a
+Django view::
+
+    from django.http import HttpResponse
+    from restorm.metrics.prometheus import CONTENT_TYPE, render
+
+    def metrics(request):
+        return HttpResponse(render(), content_type=CONTENT_TYPE)
+"""
+from restorm.metrics import registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return ('%s' % value).replace('\\', '\\\\').replace(
+        '\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, _escape(value))
+        for name, value in zip(names, values))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return '%s' % value
+
+
+def render(metrics=None):
+    """
+    Returns the text exposition of ``metrics``, a list of metric descriptions
+    as returned by ``MetricsRegistry.collect()``, or of the metrics in
+    ``restorm.metrics.registry``.
+    """
+    if metrics is None:
+        metrics = registry.collect()
+
+    lines = []
+    for metric in metrics:
+        name, labelnames = metric['name'], metric['labelnames']
+        lines.append('# HELP %s %s' % (name, _escape(metric['help'])))
+        lines.append('# TYPE %s %s' % (name, metric['type']))
+        for labels, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append('%s%s %s' % (
+                    name, _format_labels(labelnames, labels),
+                    _format_value(value)))
+                continue
+
+            bucket_names = labelnames + ('le',)
+            cumulative = 0
+            bounds = tuple(metric['buckets']) + (float('inf'),)
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                lines.append('%s_bucket%s %s' % (
+                    name,
+                    _format_labels(bucket_names, labels + (
+                        _format_value(float(bound)),)),
+                    cumulative))
+            lines.append('%s_sum%s %s' % (
+                name, _format_labels(labelnames, labels),
+                _format_value(float(value[-2]))))
+            lines.append('%s_count%s %s' % (
+                name, _format_labels(labelnames, labels), value[-1]))
+    return '\n'.join(lines) + '\n'
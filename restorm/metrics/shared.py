@@ -0,0 +1,304 @@
+"""
+Metrics shared by processes.
+
+Each process has its own ``restorm.metrics.registry``, so the metrics of
+preforked workers (gunicorn, uWSGI, Celery, ...) are scattered over the
+workers and lost when a worker is recycled. A ``SharedSegment`` is a
+memory-mapped file in which each process gets its own slot. Processes only
+ever write to their own slot, so no locks are shared between processes, and
+a reader adds up the slots of all processes.
+
+Create the segment in the master process, before the workers are forked, for
+example in the gunicorn configuration file::
+
+    from restorm.metrics.shared import share
+
+    def on_starting(server):
+        share('/dev/shm/restorm-metrics', clear=True)
+
+Workers claim a slot when they make their first request. The slot of a worker
+that exited is adopted by the next worker that needs one, such that counts
+never decrease. To scrape the metrics of all workers::
+
+    from restorm.metrics import registry
+    from restorm.metrics.prometheus import render
+
+    text = render(registry.segment.collect())
+
+A slot holds a fixed number of series (combinations of a metric and its label
+values), each with a fixed number of values. Values of series that do not fit
+are only kept in the process and counted in ``SharedSegment.dropped``.
+"""
+from contextlib import contextmanager
+import json
+import mmap
+import os
+import struct
+import threading
+
+from restorm.metrics import registry as default_registry
+
+FCNTL_FOUND = True
+try:
+    import fcntl
+except ImportError:
+    FCNTL_FOUND = False
+
+
+MAGIC = b'RSTM'
+VERSION = 1
+
+# The header of the segment: magic, version, slots, series per slot, values
+# per series and key size, padded to 64 bytes.
+_HEADER = struct.Struct('<4sIIIII')
+_HEADER_SIZE = 64
+# The header of a slot, as int64 values: the process id, the number of series
+# and the number of dropped values.
+_SLOT_HEADER_SIZE = 32
+
+
+class SharedSegment(object):
+    """
+    A memory-mapped file with a slot of metric series per process.
+
+    The values of a series are float64 values at 8-byte aligned offsets and
+    are only written by the process that owns the slot, such that readers
+    never see partially written values. Within a process, the lock of the
+    segment serializes claiming the slot and adding series, and the metric
+    locks serialize the writes to the values of their series.
+    """
+    def __init__(self, path, slots=64, series=256, values=16, key_size=192,
+                 clear=False):
+        if key_size % 8:
+            raise ValueError('The key size must be a multiple of 8.')
+        self.path = path
+        self.slots = slots
+        self.series = series
+        self.values = values
+        self.key_size = key_size
+        self.series_size = key_size + values * 8
+        self.slot_size = _SLOT_HEADER_SIZE + series * self.series_size
+        self.size = _HEADER_SIZE + slots * self.slot_size
+
+        header = _HEADER.pack(
+            MAGIC, VERSION, slots, series, values, key_size)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._locked(fd):
+                existing = os.pread(fd, _HEADER.size, 0)
+                if clear or existing != header or \
+                        os.fstat(fd).st_size != self.size:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, header, 0)
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self._ints = memoryview(self._mmap).cast('q')
+        self._doubles = memoryview(self._mmap).cast('d')
+
+        self._pid = None
+        self._slot = None
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, fd=None):
+        """
+        Locks the segment file while slots are initialized or claimed.
+        """
+        if not FCNTL_FOUND:
+            yield
+            return
+        close = fd is None
+        if close:
+            fd = os.open(self.path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            if close:
+                os.close(fd)
+
+    def _slot_offset(self, slot):
+        return _HEADER_SIZE + slot * self.slot_size
+
+    def _series_offset(self, slot, idx):
+        return (self._slot_offset(slot) + _SLOT_HEADER_SIZE +
+                idx * self.series_size)
+
+    def _read_key(self, slot, idx):
+        offset = self._series_offset(slot, idx)
+        return bytes(self._mmap[offset:offset + self.key_size]).rstrip(b'\0')
+
+    def _claim(self):
+        """
+        Claims a slot for the current process: the slot of a process that
+        exited, or otherwise a free slot. Returns ``None`` if all slots are in
+        use.
+        """
+        pid = os.getpid()
+        with self._locked():
+            slot = free = None
+            for idx in range(self.slots):
+                owner = self._ints[self._slot_offset(idx) // 8]
+                if owner == 0:
+                    if free is None:
+                        free = idx
+                elif owner == pid or not _is_alive(owner):
+                    slot = idx
+                    break
+            if slot is None:
+                slot = free
+            if slot is not None:
+                self._ints[self._slot_offset(slot) // 8] = pid
+        if slot is None:
+            return None
+
+        count = self._ints[self._slot_offset(slot) // 8 + 1]
+        self._keys = dict(
+            (self._read_key(slot, idx), idx) for idx in range(count))
+        return slot
+
+    def _get_slot(self):
+        # Called with the lock of the segment held.
+        pid = os.getpid()
+        if self._pid != pid:
+            # A forked process needs a slot of its own.
+            self._slot = self._claim()
+            self._pid = pid
+        return self._slot
+
+    def add(self, name, labels, increments):
+        """
+        Adds the ``(index, amount)`` pairs in ``increments`` to the values of
+        the series of metric ``name`` with the label values ``labels``.
+        """
+        key = json.dumps([name] + list(labels)).encode('utf-8')
+        with self._lock:
+            slot = self._get_slot()
+            if slot is None:
+                return
+            header = self._slot_offset(slot) // 8
+            idx = self._keys.get(key)
+            if idx is None:
+                idx = self._ints[header + 1]
+                if (idx >= self.series or len(key) > self.key_size or
+                        max(i for i, amount in increments) >= self.values):
+                    self._ints[header + 2] += 1
+                    return
+                offset = self._series_offset(slot, idx)
+                self._mmap[offset:offset + len(key)] = key
+                self._keys[key] = idx
+                # Readers only see the series once its key is written.
+                self._ints[header + 1] = idx + 1
+
+        first = (self._series_offset(slot, idx) + self.key_size) // 8
+        for i, amount in increments:
+            self._doubles[first + i] += amount
+
+    @property
+    def dropped(self):
+        """
+        Returns the number of values of series that did not fit, in all slots.
+        """
+        return sum(
+            self._ints[self._slot_offset(slot) // 8 + 2]
+            for slot in range(self.slots))
+
+    def read(self):
+        """
+        Returns a dictionary of the values of all series, added up over all
+        slots, keyed by tuples of the metric name and label values.
+        """
+        totals = {}
+        for slot in range(self.slots):
+            header = self._slot_offset(slot) // 8
+            if not self._ints[header]:
+                continue
+            for idx in range(self._ints[header + 1]):
+                key = tuple(json.loads(
+                    self._read_key(slot, idx).decode('utf-8')))
+                first = (self._series_offset(slot, idx) + self.key_size) // 8
+                values = self._doubles[first:first + self.values].tolist()
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = values
+                else:
+                    totals[key] = [a + b for a, b in zip(total, values)]
+        return totals
+
+    def collect(self, registry=None):
+        """
+        Returns the metrics of all processes, like
+        ``MetricsRegistry.collect()``. The metrics are described by those in
+        ``registry``, by default ``restorm.metrics.registry``.
+        """
+        if registry is None:
+            registry = default_registry
+        totals = self.read()
+
+        metrics = []
+        for metric in registry.collect():
+            values = {}
+            for key, series in totals.items():
+                if key[0] != metric['name']:
+                    continue
+                labels = key[1:]
+                if metric['type'] == 'histogram':
+                    size = len(metric['buckets']) + 3
+                    value = [int(v) for v in series[:size]]
+                    value[-2] = series[size - 2]
+                else:
+                    value = _number(series[0])
+                values[labels] = value
+            metric['values'] = values
+            metrics.append(metric)
+        return metrics
+
+    def clear(self):
+        """
+        Resets all slots.
+        """
+        with self._lock, self._locked():
+            start = _HEADER_SIZE
+            self._mmap[start:self.size] = bytes(self.size - start)
+            self._pid = None
+            self._keys = {}
+
+    def close(self):
+        self._ints.release()
+        self._doubles.release()
+        self._mmap.close()
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _number(value):
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+def share(path, registry=None, **kwargs):
+    """
+    Opens the ``SharedSegment`` at ``path`` and adds the values of all
+    metrics in ``registry``, by default ``restorm.metrics.registry``, to it.
+    Returns the segment.
+    """
+    if registry is None:
+        registry = default_registry
+    segment = SharedSegment(path, **kwargs)
+    registry.share(segment)
+    return segment
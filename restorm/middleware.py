@@ -0,0 +1,29 @@
+from restorm.detector import detect
+from restorm.sessions import session
+
+
+class SessionMiddleware(object):
+    """
+    Django middleware that handles each request within its own RestORM
+    session, such that each resource object is retrieved at most once per
+    request. See ``restorm.sessions``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with session():
+            return self.get_response(request)
+
+
+class DetectorMiddleware(object):
+    """
+    Django middleware that reports N+1 and duplicate RestORM requests made
+    while handling each request. See ``restorm.detector``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect():
+            return self.get_response(request)
@@ -0,0 +1,164 @@
+"""
+Django Debug Toolbar panel that lists the RestORM API calls made while
+handling a request::
+
+    DEBUG_TOOLBAR_PANELS = [
+        ...
+        'restorm.panels.RequestsPanel',
+    ]
+
+For each call the panel shows the URL, the ``Resource`` class and URI
+pattern name, the status code, the time, the bytes sent and received and the
+Python stack. Duplicate requests and N+1 clusters (see ``restorm.detector``)
+are highlighted, with a suggested fix.
+"""
+DEBUG_TOOLBAR_FOUND = True
+try:
+    from debug_toolbar.panels import Panel
+except ImportError:
+    DEBUG_TOOLBAR_FOUND = False
+    # ``PanelStats`` can still be used without Django Debug Toolbar.
+    Panel = object
+
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _, ngettext
+
+from restorm.detector import UnitOfWork
+from restorm.metrics import get_request_labels
+from restorm.profiler import get_call_site, get_stack
+from restorm.stats import QueryStats, record
+
+
+class PanelStats(QueryStats):
+    """
+    Request statistics that also keep the labels, call site and stack of
+    each request, and detect N+1 and duplicate requests.
+    """
+    def __init__(self):
+        super(PanelStats, self).__init__()
+        self.calls = []
+        self.unit_of_work = UnitOfWork()
+
+    def add_request(self, record):
+        super(PanelStats, self).add_request(record)
+        resource, pattern = get_request_labels()
+        call_site = get_call_site()
+        self.unit_of_work.add(record)
+        call = {
+            'method': record.method,
+            'uri': record.uri,
+            'status_code': record.status_code,
+            'resource': resource,
+            'pattern': pattern,
+            'time': (record.network_time + record.decode_time) * 1000,
+            'bytes_sent': record.bytes_sent,
+            'bytes_received': record.bytes_received,
+            'call_site': '%s:%s' % call_site if call_site else None,
+            'stack': get_stack(),
+        }
+        with self._lock:
+            self.calls.append(call)
+
+
+class RequestsPanel(Panel):
+    title = _('RestORM')
+
+    def __init__(self, *args, **kwargs):
+        super(RequestsPanel, self).__init__(*args, **kwargs)
+        self._stats = PanelStats()
+        self._recording = None
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        count = len(stats.get('calls', []))
+        return ngettext(
+            '%(count)d call in %(time).2fms',
+            '%(count)d calls in %(time).2fms', count) % {
+                'count': count, 'time': stats.get('time', 0)}
+
+    def enable_instrumentation(self):
+        self._recording = record(self._stats)
+        self._recording.__enter__()
+
+    def disable_instrumentation(self):
+        if self._recording is not None:
+            self._recording.__exit__(None, None, None)
+            self._recording = None
+
+    def generate_stats(self, request, response):
+        calls = list(self._stats.calls)
+        problems = self._stats.unit_of_work.problems()
+        duplicates = set(p.uri for p in problems if p.kind == 'duplicate')
+        clusters = set(
+            (p.resource, p.pattern, '%s:%s' % p.call_site)
+            for p in problems if p.kind == 'n+1' and p.call_site)
+        for call in calls:
+            call['duplicate'] = call['method'] == 'GET' and \
+                call['uri'] in duplicates
+            call['n_plus_one'] = (
+                call['resource'], call['pattern'], call['call_site']
+            ) in clusters
+
+        self.record_stats({
+            'calls': calls,
+            'problems': [
+                {
+                    'kind': p.kind,
+                    'resource': p.resource,
+                    'pattern': p.pattern,
+                    'count': p.count,
+                    'uri': p.uri,
+                    'suggestion': p.suggestion,
+                }
+                for p in problems],
+            'time': sum(call['time'] for call in calls),
+            'bytes_sent': self._stats.bytes_sent,
+            'bytes_received': self._stats.bytes_received,
+        })
+
+    @property
+    def content(self):
+        stats = self.get_stats()
+        calls = stats.get('calls', [])
+
+        summary = format_html(
+            '<p>{} calls, {}ms, {} bytes sent, {} bytes received.</p>',
+            len(calls), '%.2f' % stats.get('time', 0),
+            stats.get('bytes_sent', 0), stats.get('bytes_received', 0))
+        problems = format_html_join(
+            '', '<li><strong>{}</strong> {} "{}" &times; {}: {}</li>', (
+                (p['kind'], p['resource'] or '-', p['pattern'] or p['uri'],
+                 p['count'], p['suggestion'])
+                for p in stats.get('problems', [])))
+        if problems:
+            problems = format_html('<ul>{}</ul>', problems)
+
+        rows = format_html_join(
+            '',
+            '<tr style="{}"><td>{}</td><td>{}</td><td>{}</td><td>{}</td>'
+            '<td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td>'
+            '<td><details><summary>{}</summary><pre>{}</pre></details></td>'
+            '</tr>', (
+                (
+                    'background-color: #fee' if call['duplicate'] or
+                    call['n_plus_one'] else '',
+                    idx, call['method'], call['uri'],
+                    '%s (%s)' % (call['resource'], call['pattern'])
+                    if call['resource'] else '-',
+                    call['status_code'], '%.2f' % call['time'],
+                    call['bytes_sent'], call['bytes_received'],
+                    ', '.join(
+                        flag for flag, on in (
+                            ('duplicate', call['duplicate']),
+                            ('N+1', call['n_plus_one'])) if on),
+                    call['call_site'] or '-', '\n'.join(call['stack']),
+                )
+                for idx, call in enumerate(calls, start=1)))
+
+        return format_html(
+            '{}{}<table><thead><tr><th>#</th><th>Method</th><th>URL</th>'
+            '<th>Resource</th><th>Status</th><th>Time (ms)</th>'
+            '<th>Sent</th><th>Received</th><th>Problems</th><th>Stack</th>'
+            '</tr></thead><tbody>{}</tbody></table>',
+            summary, problems, rows)
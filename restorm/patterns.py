@@ -1,5 +1,5 @@
 import re
-import urllib
+from urllib.parse import urlencode
 
 from restorm.utils import reverse
 
@@ -36,11 +36,11 @@ class ResourcePattern(object):
 
         def encode_dict(in_dict):
             out_dict = {}
-            for k, v in in_dict.iteritems():
+            for k, v in in_dict.items():
                 out_dict[k] = self.encode_obj(v)
             return out_dict
 
-        if isinstance(in_obj, unicode):
+        if isinstance(in_obj, str):
             return in_obj.encode('utf-8')
         elif isinstance(in_obj, list):
             return encode_list(in_obj)
@@ -53,7 +53,7 @@ class ResourcePattern(object):
 
     def get_url(self, query=None, **kwargs):
         if query:
-            query = '?%s' % urllib.urlencode(self.encode_obj(query))
+            query = '?%s' % urlencode(self.encode_obj(query))
         else:
             query = ''
         return '%s%s' % (reverse(self.pattern, **kwargs), query)
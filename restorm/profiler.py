@@ -0,0 +1,186 @@
+"""
+Slow-request profiler.
+
+When a request takes ``settings.SLOW_REQUEST_THRESHOLD`` seconds or more,
+clients capture a compact ``SlowRequest`` record: the request, the time spent
+per phase, the ``Resource`` class and URI pattern name, the lineage of the
+queryset that made it and the calling stack outside RestORM (the view,
+template or task that triggered it). The last
+``settings.SLOW_REQUEST_PROFILE_SIZE`` records are kept in
+``restorm.profiler.profiler``, a ring buffer that can be dumped on demand::
+
+    from restorm.profiler import profiler
+
+    profiler.dump()
+
+or when the process receives a signal::
+
+    import signal
+
+    profiler.dump_on_signal(signal.SIGUSR1)
+
+Nothing is captured for requests below the threshold, so the profiler can be
+left enabled in production.
+"""
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+from restorm.conf import settings
+from restorm.metrics import get_request_labels
+
+
+_active_queryset = ContextVar('restorm_profiled_queryset', default=None)
+
+# A tuple of the call site of the caller of ``restorm.utils.concurrent_map()``
+# in its worker threads, ``None`` elsewhere.
+_fan_out = ContextVar('restorm_fan_out', default=None)
+
+_RESTORM_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+SlowRequest = namedtuple('SlowRequest', [
+    'time', 'method', 'uri', 'status_code', 'duration', 'timings',
+    'resource', 'pattern', 'lineage', 'stack'])
+
+
+def is_enabled():
+    return settings.SLOW_REQUEST_THRESHOLD is not None and \
+        settings.SLOW_REQUEST_PROFILE_SIZE > 0
+
+
+@contextmanager
+def querying(queryset):
+    """
+    Marks ``queryset`` as the queryset making the requests within the
+    ``with`` block.
+    """
+    token = _active_queryset.set(queryset)
+    try:
+        yield
+    finally:
+        _active_queryset.reset(token)
+
+
+def get_stack(limit=20):
+    """
+    Returns the calling stack outside RestORM as a list of
+    ``"filename:lineno in function"`` strings, innermost last.
+    """
+    frames = [
+        frame for frame in traceback.extract_stack(sys._getframe(1))
+        if not frame.filename.startswith(_RESTORM_DIR)]
+    return [
+        '%s:%s in %s' % (frame.filename, frame.lineno, frame.name)
+        for frame in frames[-limit:]]
+
+
+def get_call_site():
+    """
+    Returns the ``(filename, lineno)`` of the innermost caller outside
+    RestORM, or ``None``. In the worker threads of
+    ``restorm.utils.concurrent_map()``, returns the call site of its caller.
+    """
+    fan_out = _fan_out.get()
+    if fan_out is not None:
+        return fan_out[0]
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_RESTORM_DIR):
+            return filename, frame.f_lineno
+        frame = frame.f_back
+    return None
+
+
+def is_fanned_out():
+    """
+    Returns whether the current thread is a worker thread of
+    ``restorm.utils.concurrent_map()``, which RestORM uses to make a request
+    per object when an API has no bulk endpoint.
+    """
+    return _fan_out.get() is not None
+
+
+class SlowRequestProfiler(object):
+    """
+    A ring buffer of the most recent ``SlowRequest`` records.
+    """
+    def __init__(self, size=None):
+        self._size = size
+        self._records = deque(maxlen=self.size)
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return settings.SLOW_REQUEST_PROFILE_SIZE
+
+    def capture(self, request, response, timings):
+        """
+        Records ``request`` with its ``response`` and the time in seconds spent
+        per phase in ``timings``.
+        """
+        resource, pattern = get_request_labels()
+        queryset = _active_queryset.get()
+        record = SlowRequest(
+            time=time.time(),
+            method=request.method,
+            uri=request.uri,
+            status_code=response.status_code,
+            duration=sum(timings.values()),
+            timings=dict(timings),
+            resource=resource,
+            pattern=pattern,
+            lineage=queryset._lineage() if queryset is not None else None,
+            stack=get_stack())
+        with self._lock:
+            if self._records.maxlen != self.size:
+                self._records = deque(self._records, maxlen=self.size)
+            self._records.append(record)
+        return record
+
+    def records(self):
+        """
+        Returns a list of the records, oldest first.
+        """
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def dump(self, stream=None):
+        """
+        Writes the records to ``stream``, by default ``sys.stderr``, as one
+        JSON object per line.
+        """
+        if stream is None:
+            stream = sys.stderr
+        for record in self.records():
+            stream.write(json.dumps(record._asdict(), sort_keys=True))
+            stream.write('\n')
+        stream.flush()
+
+    def dump_on_signal(self, signum, stream=None):
+        """
+        Dumps the records to ``stream`` when the process receives the signal
+        ``signum``.
+        """
+        import signal
+
+        def handler(signum, frame):
+            self.dump(stream)
+
+        signal.signal(signum, handler)
+
+
+profiler = SlowRequestProfiler()
@@ -1,7 +1,25 @@
+from collections import Counter, OrderedDict, namedtuple
+from contextlib import contextmanager
+from decimal import InvalidOperation
+from itertools import islice
+from time import perf_counter
+from urllib.parse import quote, urljoin
+
+from restorm import memory, metrics, profiler
+from restorm.cache import query_cache
 from restorm.clients.base import BaseClient
 from restorm.clients.jsonclient import JSONClient
-from restorm.exceptions import RestServerException
+from restorm.conf import settings
+from restorm.exceptions import (
+    ResourceException, RestNotFoundException, RestServerException)
+from restorm.fields import RelatedResource, ToManyField, ToOneField
+from restorm.indexes import INDEX_TYPES
+from restorm.lookups import LOOKUPS, clean_value, evaluate, format_value
 from restorm.patterns import ResourcePattern
+from restorm.sessions import get_session
+from restorm.stats import (
+    Plan, PlannedRequest, QueryStats, record, record_hydration)
+from restorm.utils import concurrent_map
 
 VALID_GET_STATUS_RESPONSES = (
     200,  # OK
@@ -16,14 +34,102 @@ class RestQuerySet(object):
         self.opts = self.model._meta
         self.query = query or {}
         self._client = client
-        self._pages_fetched = {}
-        self._result_cache = {}
+        self._results = None
         self._page_size = model._meta.page_size
         self._item_pattern = ResourcePattern.parse(self.opts.item)
         self._list_pattern = ResourcePattern.parse(self.opts.list)
         self._create_pattern = ResourcePattern.parse(self.opts.create)
         self._delete_pattern = ResourcePattern.parse(self.opts.delete)
+        self._loaded_fields = None
+        # Lookups that the API cannot handle, as tuples of the field name,
+        # lookup name and value. They are evaluated locally.
+        self._local_filters = ()
+        self._ordering = ()
+        # An indexed queryset whose cached rows this queryset is filtered
+        # from, instead of requesting the API.
+        self._source = None
         self.ordered = False
+        # The statistics of the requests made by this queryset.
+        self.stats = QueryStats(size=settings.QUERY_STATS_SIZE)
+        # The queryset that this queryset makes requests for, if any.
+        self._origin = None
+
+    def _cache_key(self):
+        """
+        Returns the key under which the fetched pages are shared with other
+        querysets, see ``restorm.cache.QueryCache``.
+        """
+        query = tuple(sorted((k, repr(v)) for k, v in self.query.items()))
+        return (
+            self.model, query, self._client, self._loaded_fields,
+            repr(self._local_filters), self._ordering)
+
+    def _get_results(self):
+        if self._results is None:
+            self._results = query_cache.get(self._cache_key())
+        return self._results
+
+    @property
+    def _pages_fetched(self):
+        return self._get_results().pages_fetched
+
+    @_pages_fetched.setter
+    def _pages_fetched(self, value):
+        self._get_results().pages_fetched = value
+
+    @property
+    def _result_cache(self):
+        return self._get_results().result_cache
+
+    @_result_cache.setter
+    def _result_cache(self, value):
+        self._get_results().result_cache = value
+
+    @contextmanager
+    def _requesting(self, pattern):
+        """
+        Records the requests made within the ``with`` block in the statistics
+        of the queryset, and labels their metrics with the pattern name
+        ``pattern``.
+        """
+        origin = self._origin if self._origin is not None else self
+        with record(self.stats), metrics.request_labels(self.model, pattern):
+            with profiler.querying(origin):
+                yield
+
+    def _lineage(self):
+        """
+        Returns a description of how the queryset was derived, for example
+        ``Book.objects.filter(author=1).order_by('-title')``.
+        """
+        if self._source is not None:
+            lineage = self._source._lineage()
+        else:
+            lineage = '%s.objects' % self.model.__name__
+            filters = ['%s=%r' % item for item in sorted(self.query.items())]
+            if filters:
+                lineage += '.filter(%s)' % ', '.join(filters)
+        filters = [
+            '%s__%s=%r' % (name, lookup, value)
+            for name, lookup, value in self._local_filters]
+        if filters:
+            lineage += '.filter(%s)' % ', '.join(filters)
+        if self._ordering:
+            lineage += '.order_by(%s)' % ', '.join(
+                repr(name) for name in self._ordering)
+        if self._loaded_fields is not None:
+            lineage += '.only(%s)' % ', '.join(
+                repr(name) for name in sorted(self._loaded_fields))
+        return lineage
+
+    def _record_hydration(self, duration, count, pattern='list'):
+        if memory.is_enabled():
+            memory.checkpoint()
+        with record(self.stats):
+            record_hydration(duration, count)
+        if metrics.is_enabled() and count:
+            with metrics.request_labels(self.model, pattern):
+                metrics.observe_hydration(duration)
 
     def _request_list(self, query=None, uri=None, **kwargs):
         if uri:
@@ -31,7 +137,8 @@ class RestQuerySet(object):
         absolute_url = self._list_pattern.get_absolute_url(
             root=self.opts.root, query=query, **kwargs)
 
-        response = self._client.get(absolute_url)
+        with self._requesting('list'):
+            response = self._client.get(absolute_url)
 
         if response.status_code not in VALID_GET_STATUS_RESPONSES:
             raise RestServerException('Cannot get "%s" (%d): %s' % (
@@ -41,50 +148,193 @@ class RestQuerySet(object):
 
     def _page_for_index(self, index):
         if self._page_size:
-            # offset = index % self._page_size
-            page = (index / self._page_size)
-            # if index and offset:
-            #     page -= 1
+            page = index // self._page_size
         else:
             page = 0
         return page
 
-    def _fetch_page(self, page):
-        if page in self._pages_fetched:
-            return
+    def _page_count(self, count):
+        if not self._page_size:
+            return 1
+        pages = count // self._page_size
+        if count % self._page_size:
+            pages += 1
+        return pages
+
+    def _page_query(self, page):
+        """
+        Returns the query parameters to request a single page.
+        """
         params = self.query.copy()
+        params.update(self._fields_query())
+        params.update(self._ordering_query())
         if self._page_size:
             params.update({
                 'page_size': self._page_size,
                 'page': page + 1
             })
-        result = self._request_list(query=params)
-        content = result.content
+        return params
+
+    def _request_page(self, page):
+        """
+        Requests a single page and returns a tuple of the page meta data and
+        the decoded rows on that page. Nothing is hydrated.
+        """
+        response = self._request_list(query=self._page_query(page))
         if self._page_size:
+            content = dict(response.content)
             objects = content.pop('results')
-            self._pages_fetched[page] = content
-            offset_from = page * self._page_size
         else:
-            objects = content
-            offset_from = 0
-        for idx, row in enumerate(objects):
-            pk_attr = self.opts.pk.attname
-            absolute_url = self._item_pattern.get_absolute_url(
-                root=self.opts.root, **{pk_attr: row[pk_attr]})
-            self._result_cache[offset_from + idx] = self.model(
-                data=row, absolute_url=absolute_url, client=self._client)
+            content = {}
+            objects = self._list_pattern.clean(response)
+        return content, objects
+
+    def _fetch_page(self, page):
+        if page in self._pages_fetched:
+            return
+        if self._is_local():
+            self._fetch_local()
+            return
+        content, objects = self._request_page(page)
+        offset_from = page * self._page_size if self._page_size else 0
+        deferred_fields = self._deferred_fields()
+        if deferred_fields:
+            loader = DeferredPageLoader(self, page, deferred_fields)
+        start = perf_counter()
+        hydrated = []
+        for row in objects:
+            obj = self._hydrate_row(row)
+            if deferred_fields:
+                loader.add(obj)
+            hydrated.append(obj)
+        # The results may be shared with other querysets, which must only see
+        # the page as fetched once all its rows are in the result cache.
+        for idx, obj in enumerate(hydrated):
+            self._result_cache[offset_from + idx] = obj
+        self._pages_fetched[page] = content
+        self._record_hydration(perf_counter() - start, len(objects))
+
+    def _hydrate_row(self, row):
+        """
+        Returns a ``Resource`` instance for a row of a list response.
+        """
+        pk_attr = self.opts.pk.attname
+        session = get_session()
+        if session is not None:
+            obj = session.get(self.model, row[pk_attr])
+            if obj is not None:
+                # The row is newer than the registered instance.
+                obj.data.update(row)
+                return obj
+
+        absolute_url = self._item_pattern.get_absolute_url(
+            root=self.opts.root, **{pk_attr: row[pk_attr]})
+        obj = self.model(
+            data=row, absolute_url=absolute_url, client=self._client)
+        if session is not None:
+            obj = session.add(obj)
+        return obj
+
+    def _fetch_local(self):
+        """
+        Fetches all rows that match the local lookups, in the local order, and
+        hydrates them as if they were returned in pages by the API.
+        """
+        idx = -1
+        if self._source is not None:
+            for idx, obj in enumerate(self._iter_source()):
+                self._result_cache[idx] = obj
+            count = idx + 1
+            for page in range(max(self._page_count(count), 1)):
+                self._pages_fetched[page] = {'count': count}
+            return
+
+        deferred_fields = self._deferred_fields()
+        hydration_time = 0.0
+        for idx, row in enumerate(self._iter_rows()):
+            start = perf_counter()
+            obj = self._hydrate_row(row)
+            if deferred_fields:
+                obj._deferred_fields = deferred_fields
+            hydration_time += perf_counter() - start
+            self._result_cache[idx] = obj
+        self._record_hydration(hydration_time, idx + 1)
+        count = idx + 1
+        for page in range(max(self._page_count(count), 1)):
+            self._pages_fetched[page] = {'count': count}
 
     def _fetch_all(self):
         if self._page_size:
-            count = self.count()
-            pages = count / self._page_size
-            if count % self._page_size:
-                pages += 1
+            pages = self._page_count(self.count())
         else:
             pages = 1
         for page in range(pages):
             self._fetch_page(page)
 
+    def _iter_rows(self):
+        """
+        Yields the decoded rows of all pages, in order, without creating
+        ``Resource`` instances. Pages that were already fetched are served from
+        the result cache, other pages are requested one at a time and are not
+        kept in memory.
+
+        If there are local lookups, only the matching rows are yielded. If the
+        rows are ordered locally, all rows are kept in memory to sort them.
+        """
+        if self._source is not None and not self._pages_fetched:
+            for obj in self._iter_source():
+                yield obj.data
+            return
+
+        if self._is_local() and not self._pages_fetched:
+            rows = self._remote_queryset()._iter_rows()
+            if self._local_filters:
+                rows = (row for row in rows if self._matches(row))
+            if self._local_ordering():
+                rows = self._sort_rows(rows)
+            for row in rows:
+                yield row
+            return
+
+        page, pages = 0, 1
+        while page < pages:
+            if page in self._pages_fetched:
+                content = self._pages_fetched[page]
+                if self._page_size:
+                    offset_from = page * self._page_size
+                    offset_to = offset_from + self._page_size
+                else:
+                    offset_from, offset_to = 0, len(self._result_cache)
+                objects = [
+                    self._result_cache[idx].data
+                    for idx in range(offset_from, offset_to)
+                    if idx in self._result_cache]
+            else:
+                content, objects = self._request_page(page)
+            if page == 0:
+                pages = self._page_count(content.get('count', 0))
+            for row in objects:
+                yield row
+            page += 1
+
+    def _iter_pages_backwards(self):
+        """
+        Yields the decoded rows of each page, starting with the last page.
+
+        Deleting or changing the rows of a page only moves rows from later
+        pages, which were already yielded, so the rows of the remaining pages
+        remain the same. Only the first and current page are kept in memory.
+        """
+        if self._is_local():
+            for rows in self._remote_queryset()._iter_pages_backwards():
+                yield [row for row in rows if self._matches(row)]
+            return
+
+        content, first_rows = self._request_page(0)
+        for page in range(self._page_count(content.get('count', 0)) - 1, 0, -1):
+            yield self._request_page(page)[1]
+        yield first_rows
+
     def _pages_for_slice(self, start, stop, step):
         from_page = self._page_for_index(start)
         to_page = self._page_for_index(stop - 1)
@@ -130,26 +380,552 @@ class RestQuerySet(object):
     def get_queryset(self, client=None):
         if client is None:
             client = self._client
-        return self.__class__(
+        clone = self.__class__(
             self.model, query=self.query,
             client=client)
+        clone._loaded_fields = self._loaded_fields
+        clone._local_filters = self._local_filters
+        clone._ordering = self._ordering
+        clone._source = self._source
+        clone.ordered = self.ordered
+        return clone
 
     def _clone(self):
         return self.get_queryset()
 
     def filter(self, **kwargs):
+        """
+        Returns a new queryset filtered on the given lookups. Lookups on
+        declared fields are translated to query parameters using the
+        ``lookups`` table of the resource ``Meta`` (see ``restorm.lookups``)
+        or, if the resource declares a table, evaluated locally when it does
+        not translate them. Other keyword arguments are sent as query
+        parameters as is.
+        """
+        indexed_filters = self._indexed_filters(kwargs)
+        if indexed_filters is not None:
+            clone = self.get_queryset()
+            clone._local_filters = self._local_filters + indexed_filters
+            clone._source = self._source or self
+            return clone
+
         query = self.query.copy()
-        query.update(kwargs)
-        if 'pk' in query:
-            value = query.pop('pk')
-            query[self.opts.pk.attname] = value
+        local_filters = list(self._local_filters)
+        for key, value in kwargs.items():
+            params = self._compile_lookup(key, value)
+            if isinstance(params, tuple):
+                local_filters.append(params)
+            else:
+                query.update(params)
 
-        return RestQuerySet(
-            self.model, query=query, client=self._client)
+        clone = self.get_queryset()
+        clone.query = query
+        clone._local_filters = tuple(local_filters)
+        clone._source = None
+        return clone
+
+    def _parse_lookup(self, key):
+        """
+        Returns the field name and lookup name of the lookup ``key``, or
+        ``None`` if it does not name a declared field.
+        """
+        name, lookup = key, 'exact'
+        if '__' in key:
+            name, lookup = key.rsplit('__', 1)
+            if lookup not in LOOKUPS:
+                return None
+        if name == 'pk':
+            return self.opts.pk.attname, lookup
+        if name not in self.opts.get_fields():
+            return None
+        return name, lookup
+
+    def _compile_lookup(self, key, value):
+        """
+        Returns the query parameters for the lookup ``key`` with ``value``, or
+        a tuple of the field name, lookup name and value if the lookup has to
+        be evaluated locally.
+        """
+        parsed = self._parse_lookup(key)
+        if parsed is None:
+            return {key: value}
+        name, lookup = parsed
+
+        lookups = self.opts.lookups or {}
+        translation = lookups.get('%s__%s' % (name, lookup), lookups.get(lookup))
+        if translation is None:
+            if lookup == 'exact':
+                return {name: value}
+            if not lookups:
+                # Without a translation table the API is assumed to support
+                # the lookup.
+                return {'%s__%s' % (name, lookup): value}
+            return (name, lookup, clean_value(lookup, value))
+        if callable(translation):
+            return translation(name, value)
+        return {translation % {'field': name}: format_value(value)}
+
+    def _is_local(self):
+        return bool(self._local_filters) or self._local_ordering()
+
+    def _local_ordering(self):
+        return bool(self._ordering) and (
+            self._source is not None or not self.opts.ordering_param)
+
+    def index_by(self, *fields, **kwargs):
+        """
+        Fetches all rows and builds an index on each of ``fields`` over them.
+        Returns this queryset.
+
+        Querysets filtered from this queryset on indexed fields, and ``get()``
+        on it, use the index to find the cached rows instead of requesting
+        the API. Use ``kind='hash'`` (the default) for ``exact`` and ``in``
+        lookups, or ``kind='sorted'`` to also support range lookups. See
+        ``restorm.indexes``.
+        """
+        kind = kwargs.pop('kind', 'hash')
+        if kwargs:
+            raise TypeError(
+                'Unexpected keyword arguments to index_by: %s' % (
+                    list(kwargs),))
+        if kind not in INDEX_TYPES:
+            raise ValueError('Unknown index kind "%s".' % kind)
 
-    def values(self, *fields):
         self._fetch_all()
-        return self._result_cache.values()
+        indexes = self._get_results().indexes
+        for name in self._field_names(fields):
+            if (name, kind) not in indexes:
+                rows = [
+                    (pos, obj.data) for pos, obj in self._result_cache.items()]
+                indexes[(name, kind)] = INDEX_TYPES[kind](name, rows)
+        return self
+
+    def _indexes(self):
+        """
+        Returns the indexes over the cached rows of this queryset, including
+        those built by an equivalent queryset.
+        """
+        results = self._results
+        if results is None:
+            results = query_cache.peek(self._cache_key())
+            if results is None or not results.indexes:
+                return {}
+            self._results = results
+        return results.indexes
+
+    def _indexed_filters(self, kwargs):
+        """
+        Returns the lookups of ``kwargs`` as local filters if they can be
+        evaluated on the cached rows of an indexed queryset, or ``None``
+        otherwise.
+        """
+        if self._source is None and not self._indexes():
+            return None
+        filters = []
+        for key, value in kwargs.items():
+            parsed = self._parse_lookup(key)
+            if parsed is None:
+                return None
+            filters.append(parsed + (clean_value(parsed[1], value),))
+        if self._source is None and not any(
+                self._index_for(name, lookup) for name, lookup, v in filters):
+            return None
+        return tuple(filters)
+
+    def _index_for(self, name, lookup):
+        indexes = self._indexes()
+        for kind in INDEX_TYPES:
+            index = indexes.get((name, kind))
+            if index is not None and lookup in index.lookups:
+                return index
+        return None
+
+    def _iter_source(self):
+        """
+        Yields the cached instances of the source queryset that match the
+        local lookups, in the order of the source queryset or the local
+        ordering. The most selective index limits the rows that are checked.
+        """
+        source = self._source
+        positions = None
+        for name, lookup, value in self._local_filters:
+            index = source._index_for(name, lookup)
+            if index is None:
+                continue
+            found = index.positions(lookup, value)
+            if found is not None and (
+                    positions is None or len(found) < len(positions)):
+                positions = found
+        if positions is None:
+            positions = sorted(source._result_cache)
+
+        objs = (source._result_cache[pos] for pos in positions)
+        objs = (obj for obj in objs if self._matches(obj.data))
+        if self._local_ordering():
+            objs = self._sort_rows(objs, data=lambda obj: obj.data)
+        return objs
+
+    def _matches(self, row):
+        for name, lookup, value in self._local_filters:
+            if not evaluate(row.get(name), lookup, value):
+                return False
+        return True
+
+    def _sort_rows(self, rows, data=lambda row: row):
+        rows = list(rows)
+        # Sort on the least significant field first, relying on stable sorts.
+        for field in reversed(self._ordering):
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = self.opts.pk.attname
+            sort_key = self._sort_key(self.opts.get_fields()[name])
+            rows.sort(
+                key=lambda row: sort_key(data(row).get(name)),
+                reverse=field.startswith('-'))
+        return rows
+
+    def _sort_key(self, field):
+        """
+        Returns a function that returns the sort key of an API value of
+        ``field``: values are compared as converted by the field, like
+        decimals sent as strings, after ``None`` and before values that cannot
+        be converted.
+        """
+        def sort_key(value):
+            if value is None:
+                return (0, '')
+            try:
+                return (1, field.clean(None, value))
+            except (InvalidOperation, TypeError, ValueError):
+                return (2, '%s' % value)
+        return sort_key
+
+    def _remote_queryset(self):
+        """
+        Returns a queryset for the rows the API is asked for when lookups or
+        ordering are evaluated locally.
+        """
+        queryset = self.__class__(
+            self.model, query=self.query, client=self._client)
+        queryset.stats = self.stats
+        queryset._origin = self
+        if self._loaded_fields is not None:
+            local_fields = [name for name, lookup, value in self._local_filters]
+            local_fields.extend(f.lstrip('-') for f in self._ordering)
+            queryset._loaded_fields = self._loaded_fields.union(
+                self._field_names(local_fields))
+        if not self._local_ordering():
+            queryset._ordering = self._ordering
+        return queryset
+
+    def _ordering_query(self):
+        if not self._ordering or not self.opts.ordering_param:
+            return {}
+        pk_attr = self.opts.pk.attname
+        ordering = [
+            field.replace('pk', pk_attr) if field.lstrip('-') == 'pk' else field
+            for field in self._ordering]
+        return {self.opts.ordering_param: ','.join(ordering)}
+
+    def only(self, *fields):
+        """
+        Returns a new queryset that only requests the given fields from the
+        API, using the ``fields_param`` query parameter declared on the
+        resource ``Meta``. The primary key is always included.
+
+        Fields that are not loaded are fetched when they are first accessed on
+        an instance.
+        """
+        pk_attr = self.opts.pk.attname
+        loaded = set(self._field_names(fields))
+        loaded.add(pk_attr)
+        clone = self.get_queryset()
+        clone._loaded_fields = frozenset(loaded)
+        return clone
+
+    def defer(self, *fields):
+        """
+        Returns a new queryset that does not request the given fields from
+        the API. See ``only``.
+        """
+        pk_attr = self.opts.pk.attname
+        if self._loaded_fields is None:
+            loaded = set(self.opts.get_fields())
+        else:
+            loaded = set(self._loaded_fields)
+        loaded.difference_update(self._field_names(fields))
+        loaded.add(pk_attr)
+        clone = self.get_queryset()
+        clone._loaded_fields = frozenset(loaded)
+        return clone
+
+    def _fields_query(self, fields=None):
+        """
+        Returns the query parameters to request a sparse fieldset. Nothing is
+        returned if the resource does not declare a ``fields_param``.
+        """
+        if fields is None:
+            fields = self._loaded_fields
+        if fields is None or not self.opts.fields_param:
+            return {}
+        names = [f for f in self.opts.get_fields() if f in fields]
+        names.extend(sorted(set(fields).difference(names)))
+        return {self.opts.fields_param: ','.join(names)}
+
+    def _deferred_fields(self):
+        """
+        Returns the declared fields that are not requested from the API.
+        """
+        if self._loaded_fields is None or not self.opts.fields_param:
+            return frozenset()
+        return frozenset(self.opts.get_fields()).difference(
+            self._loaded_fields)
+
+    def _field_names(self, fields):
+        pk_attr = self.opts.pk.attname
+        return [pk_attr if f == 'pk' else f for f in fields]
+
+    def values(self, *fields):
+        """
+        Returns a list of dictionaries, one for each row. If ``fields`` are
+        given, each dictionary only contains these keys. The rows are taken
+        from the decoded response as is, no ``Resource`` is created.
+        """
+        if not fields:
+            return list(self._iter_rows())
+        names = self._field_names(fields)
+        return [
+            dict(zip(fields, [row.get(n) for n in names]))
+            for row in self._iter_rows()]
+
+    def values_list(self, *fields, **kwargs):
+        """
+        Returns a list of tuples, one for each row, containing the values of
+        ``fields`` (or all declared fields) in the given order.
+
+        Use ``flat=True`` with a single field to get the values themselves and
+        ``named=True`` to get named tuples.
+        """
+        flat = kwargs.pop('flat', False)
+        named = kwargs.pop('named', False)
+        if kwargs:
+            raise TypeError(
+                'Unexpected keyword arguments to values_list: %s' % (
+                    list(kwargs),))
+        if flat and named:
+            raise TypeError("'flat' and 'named' can't be used together.")
+        if flat and len(fields) > 1:
+            raise TypeError(
+                "'flat' is not valid when values_list is called with more "
+                "than one field.")
+
+        if not fields:
+            fields = tuple(self.opts.get_fields())
+        names = self._field_names(fields)
+
+        if flat:
+            name = names[0]
+            return [row.get(name) for row in self._iter_rows()]
+        if named:
+            row_class = namedtuple('Row', fields, rename=True)
+            return [
+                row_class._make([row.get(n) for n in names])
+                for row in self._iter_rows()]
+        return [tuple([row.get(n) for n in names]) for row in self._iter_rows()]
+
+    def to_columns(self, *fields):
+        """
+        Returns the values of ``fields`` (or all declared fields) as columns,
+        streamed from the pages without creating ``Resource`` instances. See
+        ``restorm.columns``.
+        """
+        # NumPy, PyArrow and pandas are only imported when they are used.
+        from restorm.columns import build_columns
+
+        if not fields:
+            fields = tuple(self.opts.get_fields())
+        declared = self.opts.get_fields()
+        columns = [
+            (field, name, declared.get(name))
+            for field, name in zip(fields, self._field_names(fields))]
+        return build_columns(
+            self._iter_rows(), columns, batch_size=self._page_size or 1000)
+
+    def memory_report(self, key=None):
+        """
+        Evaluates this queryset, or ``qs[key]`` for an index or slice ``key``,
+        while tracing memory allocations and returns the
+        ``restorm.memory.MemoryReport``.
+        """
+        with memory.MemoryReport() as report:
+            if key is None:
+                self._fetch_all()
+            else:
+                self[key]
+        return report
+
+    def explain(self, key=None, count=True):
+        """
+        Returns the ``Plan`` of the requests made to evaluate this queryset,
+        or ``qs[key]`` for an index or slice ``key``, taking the pages that
+        were already fetched into account. See ``restorm.stats``.
+
+        The number of pages depends on the count, which is known from the
+        first page. If the first page was not fetched yet, it is requested,
+        unless ``count`` is false.
+        """
+        plan = Plan()
+        if self._source is not None:
+            plan.append(PlannedRequest(
+                'index', None, None, None, True,
+                'filtered from the cached rows of an indexed queryset'))
+            return plan
+
+        queryset = self
+        note = ''
+        if self._is_local():
+            queryset, key = self._remote_queryset(), None
+            note = 'lookups or ordering evaluated locally'
+        fetched = set(queryset._pages_fetched)
+
+        def add(kind, page):
+            uri = queryset._page_url(page)
+            plan.append(PlannedRequest(
+                kind, 'GET', uri, page, page in fetched, note))
+
+        rows = None
+        if not self._page_size:
+            add('page', 0)
+        else:
+            add('count', 0)
+            total = None
+            if 0 in fetched:
+                total = queryset._pages_fetched[0].get('count')
+            elif count:
+                total = queryset.count()
+
+            pages = None
+            if key is None:
+                if total is not None:
+                    rows = total
+                    pages = range(1, self._page_count(total))
+            elif isinstance(key, slice):
+                start, stop = key.start or 0, key.stop
+                if stop is None:
+                    stop = total
+                if stop is not None and start < stop:
+                    rows = len(range(start, stop, key.step or 1))
+                    pages = queryset._pages_for_slice(start, stop, key.step)
+            else:
+                rows = 1
+                pages = [self._page_for_index(key)]
+
+            if pages is None:
+                plan.append(PlannedRequest(
+                    'page', 'GET', None, None, False,
+                    'the other pages, depending on the count'))
+            else:
+                for page in pages:
+                    if page:
+                        add('page', page)
+
+        for name, field in self.opts.get_fields().items():
+            if isinstance(field, RelatedResource):
+                plan.append(PlannedRequest(
+                    'related', 'GET', None, None, False,
+                    '%s requests to %s when accessing %s, one per object '
+                    'that is not in the session' % (
+                        rows if rows is not None else 'n',
+                        field.rel.to.__name__, name)))
+        return plan
+
+    def _page_url(self, page):
+        """
+        Returns the absolute URI that is requested for a single page.
+        """
+        url = self._list_pattern.get_absolute_url(
+            root=self.opts.root, query=self._page_query(page))
+        root_uri = getattr(self._client, 'root_uri', '')
+        if not url.startswith(root_uri):
+            url = urljoin(root_uri, url)
+        return url
+
+    def aggregate(self, *args, **kwargs):
+        """
+        Returns a dictionary with the result of each aggregate, keyed by its
+        alias: the keyword for keyword arguments, ``<field>__<name>``
+        otherwise. See ``restorm.aggregates``.
+        """
+        # NumPy is only imported when it is used.
+        from restorm.aggregates import Aggregation, get_aggregates
+
+        aggregates = get_aggregates(args, kwargs)
+        if self._can_push_down_aggregates():
+            return self._request_aggregates(aggregates)
+
+        aggregation = Aggregation(aggregates)
+        for rows in self._iter_row_batches():
+            aggregation.add(rows)
+        return aggregation.result()
+
+    def group_by(self, *fields):
+        """
+        Returns the groups of rows with the same values of ``fields``, to
+        aggregate per group with ``aggregate()``.
+        """
+        return GroupBy(self, fields)
+
+    def _can_push_down_aggregates(self):
+        return bool(self.opts.aggregate) and not self._local_filters and \
+            self._source is None
+
+    def _request_aggregates(self, aggregates, group_by=()):
+        """
+        Requests the aggregates from the ``aggregate`` URI pattern of the
+        resource and returns the results with their aliases.
+        """
+        query = self.query.copy()
+        query['aggregate'] = ','.join(
+            aggregate.default_alias for alias, aggregate in aggregates)
+        if group_by:
+            query['group_by'] = ','.join(group_by)
+        absolute_url = ResourcePattern.parse(
+            self.opts.aggregate).get_absolute_url(
+                root=self.opts.root, query=query)
+
+        with self._requesting('aggregate'):
+            response = self._client.get(absolute_url)
+        if response.status_code not in VALID_GET_STATUS_RESPONSES:
+            raise RestServerException('Cannot get "%s" (%d): %s' % (
+                response.request.uri, response.status_code, response.content))
+
+        def get_result(content):
+            result = dict(
+                (alias, content.get(aggregate.default_alias))
+                for alias, aggregate in aggregates)
+            for field in group_by:
+                result[field] = content.get(field)
+            return result
+
+        if group_by:
+            return [get_result(content) for content in response.content]
+        return get_result(response.content)
+
+    def _iter_row_batches(self):
+        """
+        Yields the decoded rows a page at a time, in the order of the API.
+        """
+        queryset = self
+        if self._ordering:
+            queryset = self.get_queryset()
+            queryset._ordering = ()
+        rows = queryset._iter_rows()
+        batch_size = self._page_size or 1000
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            yield batch
 
     def all(self):
         return self.get_queryset()
@@ -160,7 +936,8 @@ class RestQuerySet(object):
         absolute_url = self._item_pattern.get_absolute_url(
             root=self.opts.root, query=query, **kwargs)
 
-        response = self._client.get(absolute_url)
+        with self._requesting('item'):
+            response = self._client.get(absolute_url)
 
         # fix for xconf
         if isinstance(response.content, bytes):
@@ -169,6 +946,9 @@ class RestQuerySet(object):
                 if isinstance(self._client, JSONClient):
                     response.content = {}
 
+        if response.status_code == 404:
+            raise RestNotFoundException('Cannot get "%s" (%d): %s' % (
+                response.request.uri, response.status_code, response.content))
         if response.status_code not in VALID_GET_STATUS_RESPONSES:
             raise RestServerException('Cannot get "%s" (%d): %s' % (
                 response.request.uri, response.status_code, response.content))
@@ -177,18 +957,272 @@ class RestQuerySet(object):
         return response
 
     def get(self, **kwargs):
-        response = self._request_item(**kwargs)
+        session = get_session()
+        # Resources without a primary key are not kept in the session.
+        pk_attr = getattr(self.opts, '_pk_attr', None)
+        if pk_attr is None:
+            session = None
+        if session is not None and pk_attr in kwargs and \
+                not set(kwargs).difference([pk_attr, 'client']):
+            obj = session.get(self.model, kwargs[pk_attr])
+            if obj is not None:
+                return obj
+
+        lookups = dict(
+            (k, v) for k, v in kwargs.items() if k not in ('client', 'query'))
+        if lookups and self._indexed_filters(lookups) is not None:
+            return self._get_indexed(**lookups)
+
+        query = kwargs.pop('query', None)
+        fields_query = self._fields_query()
+        if fields_query:
+            item_query = dict(query or {})
+            item_query.update(fields_query)
+        else:
+            item_query = query
+        response = self._request_item(query=item_query, **kwargs)
+
+        # Built like the URLs of list rows, and without the fields query, so
+        # the URL of an object does not depend on how it was fetched.
+        absolute_url = self._item_pattern.get_absolute_url(
+            root=self.opts.root, query=query, **kwargs)
 
         #create delete url
         delete_url = self._delete_pattern.get_absolute_url(
-            root=self.opts.root, query=kwargs.get('query'), **kwargs)
+            root=self.opts.root, query=query, **kwargs)
 
+        start = perf_counter()
         obj = self.model(
             data=response.content, client=self._client,
-            absolute_url=response.request.uri,
+            absolute_url=absolute_url,
             delete_url=delete_url)
+        self._record_hydration(perf_counter() - start, 1, 'item')
+        deferred_fields = self._deferred_fields()
+        if deferred_fields:
+            obj._deferred_fields = deferred_fields
+        if session is not None:
+            obj = session.add(
+                obj, pk=obj.data.get(pk_attr, kwargs.get(pk_attr)))
         return obj
 
+    def _get_indexed(self, **lookups):
+        queryset = self.filter(**lookups)
+        count = queryset.count()
+        if not count:
+            raise RestNotFoundException(
+                '%s matching query does not exist.' % self.model.__name__)
+        if count > 1:
+            raise ResourceException(
+                'get() returned more than one %s -- it returned %d!' % (
+                    self.model.__name__, count))
+        return queryset[0]
+
+    def in_bulk(self, id_list=None):
+        """
+        Returns a dictionary mapping each of the primary keys in ``id_list``
+        to its ``Resource`` instance. Primary keys that cannot be found are
+        left out. Without ``id_list``, all objects in the queryset are
+        returned.
+
+        Objects that were already retrieved by this queryset, or that are in
+        the current session, are not requested again. If the resource
+        declares an ``in_bulk_param``, the other objects are requested from
+        the list endpoint, in as few requests as ``settings.MAX_URL_LENGTH``
+        allows. Otherwise, each object is requested from its item endpoint,
+        with at most ``settings.MAX_CONCURRENT_REQUESTS`` requests at the same
+        time.
+        """
+        pk_attr = self.opts.pk.attname
+        if id_list is None:
+            self._fetch_all()
+            return OrderedDict(
+                (obj.data.get(pk_attr), obj)
+                for obj in self._result_cache.values())
+
+        requested = OrderedDict(('%s' % pk, pk) for pk in id_list)
+        result = OrderedDict()
+        for obj in self._result_cache.values():
+            key = '%s' % obj.data.get(pk_attr)
+            if key in requested:
+                result[requested[key]] = obj
+        session = get_session()
+        if session is not None:
+            for pk in requested.values():
+                obj = session.get(self.model, pk)
+                if obj is not None and pk not in result:
+                    result[pk] = obj
+        missing = [pk for key, pk in requested.items()
+                   if pk not in result]
+        if not missing:
+            return result
+
+        if self.opts.in_bulk_param:
+            for chunk in self._chunk_ids(self.opts.in_bulk_param, missing):
+                queryset = self.get_queryset()
+                queryset.query = dict(self.query, **{
+                    self.opts.in_bulk_param: ','.join(chunk)})
+                queryset.stats = self.stats
+                queryset._fetch_all()
+                for obj in queryset._result_cache.values():
+                    key = '%s' % obj.data.get(pk_attr)
+                    if key in requested:
+                        result[requested[key]] = obj
+        else:
+            def get_or_none(pk):
+                try:
+                    return self.get(**{pk_attr: pk})
+                except RestNotFoundException:
+                    return None
+
+            for pk, obj in zip(missing, concurrent_map(get_or_none, missing)):
+                if obj is not None:
+                    result[pk] = obj
+
+        return result
+
+    def get_many(self, id_list):
+        """
+        Returns a list of the ``Resource`` instances with the primary keys in
+        ``id_list``, in the same order. See ``in_bulk``.
+        """
+        objects = self.in_bulk(id_list)
+        return [objects[pk] for pk in id_list if pk in objects]
+
+    def _chunk_ids(self, param, id_list):
+        """
+        Yields lists of primary keys (as strings) that, joined by commas,
+        keep the list URL below ``settings.MAX_URL_LENGTH``.
+        """
+        query = self.query.copy()
+        query.update(self._fields_query())
+        if self._page_size:
+            query.update({'page_size': self._page_size, 'page': 1})
+        base_url = self._list_pattern.get_absolute_url(
+            root=self.opts.root, query=query)
+        available = settings.MAX_URL_LENGTH - len(base_url) - len(
+            getattr(self._client, 'root_uri', '') or '') - len(param) - 2
+
+        chunk, size = [], 0
+        for pk in id_list:
+            pk = '%s' % pk
+            # Each value is followed by an encoded comma.
+            length = len(quote(pk, safe='')) + 3
+            if chunk and size + length > available:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(pk)
+            size += length
+        if chunk:
+            yield chunk
+
+    def delete(self):
+        """
+        Deletes all objects in the queryset and returns a ``Counter`` of the
+        response status codes.
+
+        If the resource declares a ``batch`` URI pattern, the primary keys of
+        each page are sent to it with a DELETE request. Otherwise, each object
+        is deleted with its own request, with at most
+        ``settings.MAX_CONCURRENT_REQUESTS`` requests at the same time.
+        """
+        pk_attr = self.opts.pk.attname
+        if self.opts.delete:
+            delete_pattern = self._delete_pattern
+        else:
+            delete_pattern = self._item_pattern
+
+        if self.opts.batch:
+            def batch_data(rows):
+                return [row[pk_attr] for row in rows]
+
+            counter = self._fan_out_batches('DELETE', batch_data)
+        else:
+            def delete(row):
+                absolute_url = delete_pattern.get_absolute_url(
+                    root=self.opts.root, **{pk_attr: row[pk_attr]})
+                return self._client.delete(absolute_url).status_code
+
+            counter = self._fan_out(delete, 'delete')
+
+        self._results = None
+        query_cache.invalidate(self.model)
+        return counter
+
+    def update(self, **kwargs):
+        """
+        Updates the given fields of all objects in the queryset and returns a
+        ``Counter`` of the response status codes.
+
+        If the resource declares a ``batch`` URI pattern, the objects of each
+        page are sent to it with a PATCH request. Otherwise, each object is
+        updated with its own PATCH request, with at most
+        ``settings.MAX_CONCURRENT_REQUESTS`` requests at the same time.
+        """
+        pk_attr = self.opts.pk.attname
+        data = {}
+        for name, value in kwargs.items():
+            field = self.opts.get_field(name)
+            if value and isinstance(field, ToOneField):
+                value = value.pk
+            elif value and isinstance(field, ToManyField):
+                value = [o.pk for o in value]
+            data[name] = value
+
+        if self.opts.batch:
+            def batch_data(rows):
+                return [dict(data, **{pk_attr: row[pk_attr]}) for row in rows]
+
+            counter = self._fan_out_batches('PATCH', batch_data)
+        else:
+            def update(row):
+                absolute_url = self._item_pattern.get_absolute_url(
+                    root=self.opts.root, **{pk_attr: row[pk_attr]})
+                return self._client.patch(absolute_url, data).status_code
+
+            counter = self._fan_out(update, 'item')
+
+        self._results = None
+        query_cache.invalidate(self.model)
+        return counter
+
+    def _fan_out(self, func, pattern):
+        """
+        Calls ``func`` for each row with bounded concurrency and counts the
+        returned status codes. The requests are labeled with the pattern name
+        ``pattern``.
+        """
+        queryset = self.only(self.opts.pk.attname)
+        queryset.stats = self.stats
+        queryset._origin = self
+
+        def rows():
+            for page_rows in queryset._iter_pages_backwards():
+                for row in page_rows:
+                    yield row
+
+        with self._requesting(pattern):
+            return Counter(concurrent_map(func, rows()))
+
+    def _fan_out_batches(self, method, batch_data):
+        """
+        Sends ``batch_data(rows)`` for each page to the batch URI pattern and
+        counts the status codes per object.
+        """
+        absolute_url = ResourcePattern.parse(self.opts.batch).get_absolute_url(
+            root=self.opts.root)
+        queryset = self.only(self.opts.pk.attname)
+        queryset.stats = self.stats
+        queryset._origin = self
+
+        counter = Counter()
+        for rows in queryset._iter_pages_backwards():
+            if rows:
+                with self._requesting('batch'):
+                    response = self._client.request(
+                        absolute_url, method, batch_data(rows))
+                counter[response.status_code] += len(rows)
+        return counter
+
     def count(self):
         _page = 0
         self._fetch_page(_page)
@@ -198,9 +1232,22 @@ class RestQuerySet(object):
             count = len(self._result_cache)
         return count
 
-    def order_by(self, *args):
-        # FIXME: validate order_by args
-        return self.get_queryset()
+    def order_by(self, *fields):
+        """
+        Returns a new queryset ordered by the given fields, prefixed with "-"
+        for descending order. The ordering is sent to the API with the
+        ``ordering_param`` query parameter of the resource ``Meta``, or done
+        locally if the resource does not declare one.
+        """
+        for field in fields:
+            name = field.lstrip('-')
+            if name != 'pk' and name not in self.opts.get_fields():
+                raise ValueError(
+                    'Cannot order by unknown field "%s".' % name)
+        clone = self.get_queryset()
+        clone._ordering = tuple(fields)
+        clone.ordered = bool(fields)
+        return clone
 
     def using(self, client=None):
         if client and not isinstance(client, BaseClient):
@@ -218,8 +1265,99 @@ class RestQuerySet(object):
 
 
 class EmptyRestQuerySet(RestQuerySet):
+    def _cache_key(self):
+        return None
+
+    def _request_page(self, page):
+        return {}, []
+
     def _fetch_page(self, page):
         self._result_cache = {}
 
+    def _can_push_down_aggregates(self):
+        return False
+
+    def explain(self, key=None, count=True):
+        return Plan()
+
     def count(self):
         return 0
+
+
+class GroupBy(object):
+    """
+    The rows of a queryset, grouped on the values of ``fields``. See
+    ``RestQuerySet.group_by()``.
+    """
+    def __init__(self, queryset, fields):
+        self.queryset = queryset
+        self.fields = tuple(fields)
+
+    def aggregate(self, *args, **kwargs):
+        """
+        Returns a list of dictionaries, one for each group in order of
+        appearance, with the values of the group fields and the result of
+        each aggregate.
+        """
+        from restorm.aggregates import Aggregation, get_aggregates
+
+        queryset = self.queryset
+        aggregates = get_aggregates(args, kwargs)
+        if queryset._can_push_down_aggregates():
+            return queryset._request_aggregates(aggregates, self.fields)
+
+        names = queryset._field_names(self.fields)
+        groups = OrderedDict()
+        for rows in queryset._iter_row_batches():
+            grouped = OrderedDict()
+            for row in rows:
+                key = tuple(row.get(name) for name in names)
+                grouped.setdefault(key, []).append(row)
+            for key, group_rows in grouped.items():
+                if key not in groups:
+                    groups[key] = Aggregation(aggregates)
+                groups[key].add(group_rows)
+
+        results = []
+        for key, aggregation in groups.items():
+            result = dict(zip(self.fields, key))
+            result.update(aggregation.result())
+            results.append(result)
+        return results
+
+
+class DeferredPageLoader(object):
+    """
+    Loads the deferred fields of all instances that were hydrated from the
+    same page with a single request, the first time one of these fields is
+    accessed on any of the instances.
+    """
+    def __init__(self, queryset, page, fields):
+        self.queryset = queryset
+        self.page = page
+        self.fields = fields
+        self.instances = []
+
+    def add(self, instance):
+        instance._deferred_fields = self.fields
+        instance._deferred_loader = self
+        self.instances.append(instance)
+
+    def load(self):
+        pk_attr = self.queryset.opts.pk.attname
+        queryset = self.queryset.only(*self.fields)
+        content, rows = queryset._request_page(self.page)
+        rows_by_pk = dict((row.get(pk_attr), row) for row in rows)
+
+        for instance in self.instances:
+            instance._deferred_loader = None
+            row = rows_by_pk.get(instance.data.get(pk_attr))
+            if row is None:
+                # The page has shifted, fall back to loading the item.
+                instance.refresh_from_api(fields=self.fields)
+                continue
+            for key in self.fields:
+                if key in row and key not in instance.data:
+                    instance.data[key] = row[key]
+            instance._deferred_fields = frozenset()
+        self.instances = []
@@ -1,3 +1,4 @@
+import threading
 import warnings
 from collections import OrderedDict, defaultdict
 
@@ -9,15 +10,37 @@ class Registry(object):
     """
     def __init__(self):
         # Mapping of app labels => resource names => model classes. Every time
-        # a resource is imported, ResourceBase.__new__ calls register() which
-        # creates an entry in all_resources. All imported resources are
-        # registered, regardless of whether they're defined in an installed
-        # application and whether the apps registry has been populated.
-        # Since it isn't possible to reimport a module safely (it could
-        # reexecute initialization code) all_resources is never overridden
-        # or reset.
+        # a resource is prepared, ResourceBase.prepare() calls register()
+        # which creates an entry in all_resources. All imported resources are
+        # registered once prepared, regardless of whether they're defined in
+        # an installed application and whether the apps registry has been
+        # populated. Since it isn't possible to reimport a module safely (it
+        # could reexecute initialization code) all_resources is never
+        # overridden or reset.
         self.all_resources = defaultdict(OrderedDict)
 
+        # Resources that are imported but not prepared yet, see defer().
+        self.deferred_resources = []
+        self._lock = threading.Lock()
+
+    def defer(self, resource):
+        """
+        Adds a resource that registers itself when it is prepared.
+        """
+        with self._lock:
+            self.deferred_resources.append(resource)
+
+    def prepare_resources(self):
+        """
+        Prepares, and thereby registers, all deferred resources.
+        """
+        while True:
+            with self._lock:
+                if not self.deferred_resources:
+                    return
+                resource = self.deferred_resources.pop(0)
+            resource.prepare()
+
     def register(self, app_label, resource):
         """
         Registers a resource for a given app.
@@ -47,6 +70,9 @@ class Registry(object):
                     "%s and %s." % info)
 
         app_resources[resource_name] = resource
+        with self._lock:
+            if resource in self.deferred_resources:
+                self.deferred_resources.remove(resource)
 
 
 registry = Registry()
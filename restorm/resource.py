@@ -1,24 +1,28 @@
 from collections import OrderedDict
 import sys, json
+import threading
+from urllib.parse import urlencode
 
-from django.apps import apps
-from django.apps.config import MODELS_MODULE_NAME
-from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
-from django.utils.encoding import force_text
-from django.utils.translation import override
-
+from . import metrics
+from .cache import query_cache
 from .conf import settings
 from .exceptions import RestServerException, RestValidationException
 from .fields import Field, ToOneField, ToManyField
 from .managers import ResourceManager, ResourceManagerDescriptor
 from .patterns import ResourcePattern
 from .registry import registry
+from .sessions import get_session
+
+# As ``django.apps.config.MODELS_MODULE_NAME``, Django is imported lazily.
+MODELS_MODULE_NAME = 'models'
 
 
 class ResourceOptions(object):
     DEFAULT_NAMES = (
         'list', 'item', 'create', 'delete', 'root', 'app_label', 'resource_name', 'verbose_name',
-        'verbose_name_plural', 'client', 'app_config', 'page_size', 'page_size_param')
+        'verbose_name_plural', 'client', 'app_config', 'page_size', 'page_size_param',
+        'fields_param', 'in_bulk_param', 'batch', 'lookups', 'ordering_param',
+        'aggregate')
 
     def __init__(self, meta, app_label=None):
         # Represents this Resource's list URI pattern. For example: A list of
@@ -35,6 +39,18 @@ class ResourceOptions(object):
         # Represents this Resource's delete item URI pattern. 
         self.delete = ''
 
+        # Represents this Resource's batch URI pattern, used by bulk
+        # operations. A list of objects is sent to it with a POST request to
+        # create them, a list of partial objects including their primary key
+        # with a PATCH request to update them and a list of primary keys with
+        # a DELETE request to delete them.
+        self.batch = ''
+
+        # Represents this Resource's aggregate URI pattern. If set,
+        # ``aggregate()`` is computed by the API instead of over all pages.
+        # See ``restorm.aggregates``.
+        self.aggregate = ''
+
         # Indicates the root of the resource. In some cases, a resource is
         # found on a different domain or service. For example: If the regular
         # resource can be found on http://localhost/api/ the search engine
@@ -45,6 +61,28 @@ class ResourceOptions(object):
         self.page_size = None
         self.page_size_param = None
 
+        # The query parameter the API uses to return a sparse fieldset, for
+        # example "fields" to request "book/?fields=id,title". If not set,
+        # ``only()`` and ``defer()`` do not reduce the requested data.
+        self.fields_param = None
+
+        # The query parameter the API uses to filter the list on a comma
+        # separated list of primary keys, for example "id__in". If not set,
+        # ``in_bulk()`` requests each object on its own.
+        self.in_bulk_param = None
+
+        # Translates field lookups like "price__gte" to query parameters. See
+        # ``restorm.lookups``. If set, lookups that are not translated are
+        # evaluated locally on the returned rows; if not, all lookups are sent
+        # to the API as is.
+        self.lookups = {}
+
+        # The query parameter the API uses to order the list on a comma
+        # separated list of fields, for example "ordering" to request
+        # "book/?ordering=-created,title". If not set, ``order_by()`` sorts
+        # the rows locally, which requires fetching all of them.
+        self.ordering_param = None
+
         # Lets make Django think this is an actual Model
         self._get_fields_cache = {}
         self.proxied_children = []
@@ -80,7 +118,6 @@ class ResourceOptions(object):
 
         self.related_fkey_lookups = []
 
-        self.apps = apps
         self.resources = registry
 
         self.default_related_name = None
@@ -141,13 +178,22 @@ class ResourceOptions(object):
         (so that we get the same value regardless of currently active
         locale).
         """
+        from django.utils.encoding import force_text
+        from django.utils.translation import override
+
         with override(None):
             return force_text(self.verbose_name)
 
+    @property
+    def apps(self):
+        from django.apps import apps
+        return apps
+
     def get_field(self, field):
         try:
             field = self._fields[field]
         except KeyError:
+            from django.core.exceptions import FieldDoesNotExist
             raise FieldDoesNotExist
         return field
 
@@ -167,11 +213,34 @@ class ResourceOptions(object):
         return self._fields[self._pk_attr]
 
 
+class _PreparedAttribute(object):
+    """
+    Placeholder for an attribute of a resource class that prepares the class
+    when first accessed, see ``ResourceBase.prepare()``.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        owner.prepare()
+        if instance is None:
+            return getattr(owner, self.name)
+        return getattr(instance, self.name)
+
+
 class ResourceBase(type):
     """
     Meta class for Resource. This class ensures that Resource classes (not
     instances) are magically prepared.
+
+    Building the options, walking the MRO, registering the class and creating
+    the manager are deferred until the ``_meta``, ``_state``, ``objects`` or
+    ``base_fields`` attribute of the class is first accessed, to keep
+    importing modules with many resources fast.
     """
+    PREPARED_ATTRIBUTES = ('_meta', '_state', 'objects', 'base_fields')
+
+    _prepare_lock = threading.RLock()
 
     def __new__(cls, name, bases, attrs):
         super_new = super(ResourceBase, cls).__new__
@@ -192,24 +261,65 @@ class ResourceBase(type):
 
                 current_fields.append((key, value))
 
-        for key,value in current_fields:
-            attrs.pop(key)
-
         current_fields.sort(key=lambda x: x[1].creation_counter)
         attrs['declared_fields'] = OrderedDict(current_fields)
 
+        attr_meta = attrs.get('Meta')
+        manager = attrs.pop('objects', None)
+        for attr in cls.PREPARED_ATTRIBUTES:
+            attrs[attr] = _PreparedAttribute(attr)
+
         new_class = super_new(cls, name, bases, attrs)
 
         # Create the meta class.
-        attr_meta = attrs.pop('Meta', None)
         abstract = getattr(attr_meta, 'abstract', False)
         if not attr_meta:
             meta = getattr(new_class, 'Meta', None)
         else:
             meta = attr_meta
 
-        module = attrs.pop('__module__')
-        app_config = apps.get_containing_app_config(module)
+        if meta and not 'resource_name' in meta.__dict__:
+            meta.resource_name = new_class.__name__
+
+        if abstract:
+            # Abstract resources are not registered, but subclasses should
+            # still be non-abstract by default. Resetting the attribute to
+            # False, following the behavior in Django models.
+            attr_meta.abstract = False
+            new_class.Meta = attr_meta
+
+        new_class._pending = (meta, manager, abstract)
+        if not abstract:
+            registry.defer(new_class)
+        return new_class
+
+    def prepare(cls):
+        """
+        Builds the options of the resource class, collects its fields,
+        creates its manager and registers it, unless this was done before.
+        """
+        with cls._prepare_lock:
+            if '_pending' not in cls.__dict__:
+                return
+            meta, manager, abstract = cls._pending
+            del cls._pending
+            try:
+                cls._prepare(meta, manager, abstract)
+            except Exception:
+                cls._pending = (meta, manager, abstract)
+                raise
+
+    def _prepare(new_class, meta, manager, abstract):
+        module = new_class.__module__
+        # The app label is taken from the app config once Django has imported
+        # the app configs, and from the module path otherwise. Django apps
+        # cannot be ready if ``django.apps`` was not imported, so Django is
+        # not imported to find out.
+        apps = getattr(sys.modules.get('django.apps'), 'apps', None)
+        if apps is not None and apps.apps_ready:
+            app_config = apps.get_containing_app_config(module)
+        else:
+            app_config = None
 
         # TODO: Verify the purpose and use of this.
         # Wrapped in a condition to avoid throwing an
@@ -233,6 +343,7 @@ class ResourceBase(type):
                 try:
                     kwargs = {"app_label": package_components[app_label_index]}
                 except IndexError:
+                    from django.core.exceptions import ImproperlyConfigured
                     raise ImproperlyConfigured(
                         'Unable to detect the app label for model "%s." '
                         'Ensure that its module, "%s", is located inside an '
@@ -245,21 +356,7 @@ class ResourceBase(type):
         else:
             kwargs = {}
 
-        if not 'resource_name' in  meta.__dict__.copy():
-            meta.resource_name = new_class.__name__
-
         opts = ResourceOptions(meta, **kwargs)
-        new_class._meta = opts
-
-        # Assign manager.
-        manager = attrs.pop('objects', None)
-        if manager is None:
-            manager = ResourceManager()
-        manager.object_class = new_class
-
-        # Wrap default or custom managers such that it can only be used on
-        # classes and not on instances.
-        new_class.objects = ResourceManagerDescriptor(manager)
 
         # Walk through the MRO.
         declared_fields = OrderedDict()
@@ -275,17 +372,16 @@ class ResourceBase(type):
 
         primary_key = None
         for attr, value in declared_fields.items():
-            setattr(new_class, attr, value)
             if value.primary_key:
                 if primary_key is not None:
+                    from django.core.exceptions import ImproperlyConfigured
                     raise ImproperlyConfigured('Multiple primary keys.')
                 else:
                     primary_key = value
                     opts._pk_attr = attr
 
-        new_class.base_fields = declared_fields
-        new_class.declared_fields = declared_fields
-        new_class.DoesNotExist = RestServerException
+        for attr, value in declared_fields.items():
+            setattr(new_class, attr, value)
 
         opts._fields = declared_fields
         opts.concrete_fields = declared_fields
@@ -295,20 +391,24 @@ class ResourceBase(type):
             db = opts.client
             adding = False
 
+        # Assign manager.
+        if manager is None:
+            manager = ResourceManager()
+        manager.object_class = new_class
+
+        new_class._meta = opts
         new_class._state = State()
+        # Wrap default or custom managers such that it can only be used on
+        # classes and not on instances.
+        new_class.objects = ResourceManagerDescriptor(manager)
+        new_class.base_fields = declared_fields
+        new_class.declared_fields = declared_fields
+        new_class.DoesNotExist = RestServerException
 
-        if abstract:
-            # Abstract resources are not registered, but subclasses should
-            # still be non-abstract by default. Resetting the attribute to
-            # False, following the behavior in Django models.
-            attr_meta.abstract = False
-            new_class.Meta = attr_meta
-        elif hasattr(opts, 'resources'):
+        if not abstract and hasattr(opts, 'resources'):
             # If resource registry was provided, use it to register new_class
             opts.resources.register(new_class._meta.app_label, new_class)
 
-        return new_class
-
     @property
     def _default_manager(self):
         return self.objects
@@ -337,6 +437,10 @@ class Resource(object, metaclass=ResourceBase):
 
     objects = None
 
+    # Fields that were not requested from the API, see ``RestQuerySet.only``.
+    _deferred_fields = frozenset()
+    _deferred_loader = None
+
     def __init__(self, data={}, client=None, absolute_url=None, delete_url=None):
         self.client = client or self._meta.client
         self.absolute_url = absolute_url
@@ -350,12 +454,24 @@ class Resource(object, metaclass=ResourceBase):
         if self.absolute_url is None and self._meta.pk.attname not in self.data:
             self._state.adding = True
         
-        self._item_pattern = ResourcePattern.parse(self._meta.item)
-        self._list_pattern = ResourcePattern.parse(self._meta.list)
 
-        # default 
-        self._create_pattern = ResourcePattern.parse(self._meta.list) if self._meta.create == '' else ResourcePattern.parse(self._meta.create)
-        self._delete_pattern = ResourcePattern.parse(self._meta.item) if self._meta.delete == '' else ResourcePattern.parse(self._meta.delete)
+    # The URI patterns are parsed when used, not for every instance.
+    @property
+    def _item_pattern(self):
+        return ResourcePattern.parse(self._meta.item)
+
+    @property
+    def _list_pattern(self):
+        return ResourcePattern.parse(self._meta.list)
+
+    @property
+    def _create_pattern(self):
+        # default
+        return ResourcePattern.parse(self._meta.list) if self._meta.create == '' else ResourcePattern.parse(self._meta.create)
+
+    @property
+    def _delete_pattern(self):
+        return ResourcePattern.parse(self._meta.item) if self._meta.delete == '' else ResourcePattern.parse(self._meta.delete)
 
     def __unicode__(self):
         if self.absolute_url:
@@ -380,6 +496,47 @@ class Resource(object, metaclass=ResourceBase):
         except:
             return getattr(self.data, self._meta.pk.attname)
 
+    def get_deferred_fields(self):
+        """
+        Returns the names of the fields that were deferred and are not loaded
+        yet.
+        """
+        return set(
+            f for f in self._deferred_fields if f not in self.data)
+
+    def _load_deferred_fields(self):
+        if self._deferred_loader is not None:
+            self._deferred_loader.load()
+        else:
+            self.refresh_from_api(fields=self.get_deferred_fields())
+
+    def refresh_from_api(self, fields=None):
+        """
+        Performs a GET request to reload the object data. If ``fields`` are
+        given and the resource declares a ``fields_param``, only these fields
+        are requested and updated.
+        """
+        absolute_url = self.absolute_url
+        if fields and self._meta.fields_param:
+            separator = '&' if '?' in absolute_url else '?'
+            absolute_url = '%s%s%s' % (absolute_url, separator, urlencode({
+                self._meta.fields_param: ','.join(sorted(fields))}))
+
+        with metrics.request_labels(self.__class__, 'item'):
+            response = self.client.get(absolute_url)
+        if response.status_code not in [200, 304]:
+            raise RestServerException('Cannot get "%s" (%d): %s' % (
+                response.request.uri, response.status_code, response.content))
+
+        if fields:
+            for key in fields:
+                if key in response.content:
+                    self.data[key] = response.content[key]
+        else:
+            self.data = response.content
+        self._deferred_fields = frozenset(self.get_deferred_fields())
+        self._deferred_loader = None
+
     def _get_unique_checks(self, exclude=None):
         return [], []
 
@@ -397,12 +554,14 @@ class Resource(object, metaclass=ResourceBase):
     def validate_unique(self, *args, **kwargs):
         pass
 
-    def _clean_request_data(self):
+    def _clean_request_data(self, fields=None):
         obj_data = self.data.copy()
         for key, value in self.data.items():
-            try:
-                field = self._meta.get_field(key)
-            except FieldDoesNotExist:
+            if fields is not None and key not in fields:
+                del obj_data[key]
+                continue
+            field = self._meta._fields.get(key)
+            if field is None:
                 del obj_data[key]
                 continue
             if value and isinstance(field, ToOneField):
@@ -416,40 +575,66 @@ class Resource(object, metaclass=ResourceBase):
             obj_data[key] = value
         return obj_data
 
-    def save(self, commit=True):
+    def _set_response_data(self, data, partial=False):
+        """
+        Stores the object data returned by the API after a save and sets the
+        item and delete URLs from the (possibly server assigned) primary key.
         """
-        Performs a PUT request to update the object.
+        if partial:
+            self.data.update(data)
+        else:
+            self.data = data
+        pk_attr = self._meta.pk.attname
+        if pk_attr not in self.data:
+            return
+        session = get_session()
+        if session is not None:
+            session.add(self)
+        if not self.absolute_url:
+            self.absolute_url = self._item_pattern.get_absolute_url(
+                root=self._meta.root, **{pk_attr: self.data[pk_attr]})
+
+        # create a delete url for this resource
+        if not self.delete_url:
+            self.delete_url = self._delete_pattern.get_absolute_url(
+                root=self._meta.root, **{pk_attr: self.data[pk_attr]})
+
+    def save(self, commit=True, update_fields=None):
+        """
+        Performs a PUT request to update the object, or a POST request to
+        create it. If ``update_fields`` are given for an existing object, only
+        these fields are sent, with a PATCH request.
 
         No guarantees are given to what this method actually returns due to the
         freedom of API implementations. If there is a body in the response, the
         contents of this body is returned, otherwise ``None``.
         """
-        obj_data = self._clean_request_data()
+        partial = bool(update_fields) and bool(self.absolute_url)
+        obj_data = self._clean_request_data(
+            fields=update_fields if partial else None)
         if not commit:
             return
         if not self.absolute_url:
             created = True
             absolute_url = self._create_pattern.get_absolute_url(root=self._meta.root)
-            response = self.client.post(absolute_url, obj_data)
+            with metrics.request_labels(self.__class__, 'create'):
+                response = self.client.post(absolute_url, obj_data)
+        elif partial:
+            created = False
+            with metrics.request_labels(self.__class__, 'item'):
+                response = self.client.patch(self.absolute_url, obj_data)
         else:
             created = False
             #absolute_url = self.absolute_url
             #absolute_url = self._create_pattern.get_absolute_url(root=self._meta.root)
-            response = self.client.put(self.absolute_url, obj_data)
+            with metrics.request_labels(self.__class__, 'item'):
+                response = self.client.put(self.absolute_url, obj_data)
 
         # Although 204 is the best HTTP status code for a valid PUT response.
         if response.status_code in [200, 201, 204]:
+            query_cache.invalidate(self.__class__)
             if response.content and isinstance(response.content, dict):
-                self.data = response.content
-                pk_attr = self._meta.pk.attname
-                if not self.absolute_url:
-                    self.absolute_url = self._item_pattern.get_absolute_url(
-                        root=self._meta.root, **{pk_attr: self.data[pk_attr]})
-
-                # create a delete url for this resource
-                if not self.delete_url:
-                    self.delete_url = self._delete_pattern.get_absolute_url(
-                        root=self._meta.root, **{pk_attr: self.data[pk_attr]})
+                self._set_response_data(response.content, partial=partial)
             return created
         elif response.status_code in [400]:
             raise RestValidationException('Cannot save "%s" (%d): %s' % (
@@ -467,10 +652,15 @@ class Resource(object, metaclass=ResourceBase):
         freedom of API implementations. If there is a body in the response, the
         contents of this body is returned, otherwise ``None``.
         """
-        response = self.client.delete(self.delete_url)
+        with metrics.request_labels(self.__class__, 'delete'):
+            response = self.client.delete(self.delete_url)
 
         # Although 204 is the best HTTP status code for a valid PUT response.
         if response.status_code in [200, 201, 204]:
+            query_cache.invalidate(self.__class__)
+            session = get_session()
+            if session is not None:
+                session.discard(self)
             self.absolute_url = None
             self.delete_url = None
             if response.content:
@@ -0,0 +1,105 @@
+"""
+Identity map for ``Resource`` instances.
+
+Within a session, each primary key of a resource maps to a single instance.
+Objects retrieved with ``get()``, hydrated from list pages or resolved through
+related fields are registered in the current session, and retrieving an object
+that is already in the session returns the registered instance without a
+request. Rows of later list responses refresh the fields they include on the
+registered instance::
+
+    import restorm
+
+    with restorm.session():
+        book = Book.objects.get(id=1)
+        assert Book.objects.get(id=1) is book
+
+Outside a session, every retrieval creates a new instance. In Django projects,
+add ``restorm.middleware.SessionMiddleware`` to use a session per request.
+"""
+from contextvars import ContextVar
+import threading
+
+
+_current_session = ContextVar('restorm_session', default=None)
+
+
+class Session(object):
+    """
+    Maps ``(resource class, primary key)`` to the loaded instance. Use it as a
+    context manager to make it the current session.
+    """
+    def __init__(self):
+        self._identity_map = {}
+        self._lock = threading.Lock()
+        self._tokens = []
+
+    def _key(self, model, pk):
+        return model, '%s' % pk
+
+    def get(self, model, pk):
+        """
+        Returns the instance of ``model`` with primary key ``pk``, or ``None``
+        if it is not in this session.
+        """
+        return self._identity_map.get(self._key(model, pk))
+
+    def add(self, instance, pk=None):
+        """
+        Registers ``instance`` and returns the instance that is registered for
+        its primary key, which is ``instance`` unless another instance was
+        registered before. Instances without a primary key are not registered.
+
+        The primary key is taken from the instance data unless ``pk`` is
+        given.
+        """
+        if pk is None:
+            pk = instance.data.get(instance._meta.pk.attname)
+        if pk is None:
+            return instance
+        with self._lock:
+            return self._identity_map.setdefault(
+                self._key(instance.__class__, pk), instance)
+
+    def discard(self, instance):
+        """
+        Removes ``instance`` from this session, for example after it was
+        deleted.
+        """
+        pk = instance.data.get(instance._meta.pk.attname)
+        key = self._key(instance.__class__, pk)
+        with self._lock:
+            if self._identity_map.get(key) is instance:
+                del self._identity_map[key]
+
+    def clear(self):
+        with self._lock:
+            self._identity_map.clear()
+
+    def __len__(self):
+        return len(self._identity_map)
+
+    def __contains__(self, instance):
+        pk = instance.data.get(instance._meta.pk.attname)
+        return self.get(instance.__class__, pk) is instance
+
+    def __enter__(self):
+        self._tokens.append(_current_session.set(self))
+        return self
+
+    def __exit__(self, type, value, traceback):
+        _current_session.reset(self._tokens.pop())
+
+
+def session():
+    """
+    Returns a new ``Session`` to use as a context manager.
+    """
+    return Session()
+
+
+def get_session():
+    """
+    Returns the current ``Session``, or ``None`` outside a session.
+    """
+    return _current_session.get()
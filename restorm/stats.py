@@ -0,0 +1,184 @@
+"""
+Request statistics.
+
+Each ``RestQuerySet`` keeps the ``QueryStats`` of the requests it made in
+``qs.stats``: the number of requests, bytes sent and received and the time
+spent in the network, decoding responses and hydrating ``Resource``
+instances, and the last ``settings.QUERY_STATS_SIZE`` requests themselves::
+
+    qs = Book.objects.filter(author=1)
+    books = qs[0:50]
+    print(qs.stats)
+    # 5 requests, 0 bytes sent, 48213 bytes received, network 0.412s,
+    # decode 0.021s, hydration 0.008s
+
+Use ``record()`` to collect the statistics of any code, including all
+requests made by related fields::
+
+    from restorm.stats import record
+
+    with record() as stats:
+        authors = [book.author for book in books]
+    print(stats.request_count)
+
+Before evaluating a queryset, ``qs.explain()`` returns the ``Plan`` of the
+requests it will make::
+
+    print(Book.objects.filter(author=1).explain(slice(100, 300)))
+    # count  GET http://localhost/api/book/?author=1&page_size=50&page=1
+    # page   GET http://localhost/api/book/?author=1&page_size=50&page=3
+    # ...
+"""
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+
+
+_active_stats = ContextVar('restorm_stats', default=())
+
+
+RequestRecord = namedtuple('RequestRecord', [
+    'method', 'uri', 'status_code', 'bytes_sent', 'bytes_received',
+    'network_time', 'decode_time'])
+
+
+PlannedRequest = namedtuple('PlannedRequest', [
+    'kind', 'method', 'uri', 'page', 'cached', 'note'])
+
+
+class Plan(list):
+    """
+    A list of ``PlannedRequest`` tuples, in the order the requests are made.
+    The ``kind`` of a request is ``count`` for the first page requested to
+    know the number of pages, ``page`` for other pages, ``related`` for
+    requests made when accessing related fields and ``index`` for querysets
+    evaluated on cached rows. Requests that are ``cached`` are not made.
+    """
+    @property
+    def request_count(self):
+        """
+        Returns the number of requests that are made when evaluating the
+        queryset, without accessing related fields.
+        """
+        return len([
+            r for r in self if not r.cached and r.kind in ('count', 'page')])
+
+    def __str__(self):
+        lines = []
+        for r in self:
+            line = '%-7s %s %s' % (r.kind, r.method or '-', r.uri or '-')
+            if r.cached:
+                line += ' (cached)'
+            if r.note:
+                line += ' -- %s' % r.note
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+class QueryStats(object):
+    """
+    Statistics of the requests made while it was recording. Requests made
+    concurrently by worker threads are included. ``requests`` keeps the last
+    ``size`` requests, or all of them if ``size`` is ``None``; the counters
+    include all requests.
+    """
+    def __init__(self, size=None):
+        self._lock = threading.Lock()
+        self.requests = deque(maxlen=size)
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.network_time = 0.0
+        self.decode_time = 0.0
+        self.hydration_time = 0.0
+        self.hydrated = 0
+
+    def add_request(self, record):
+        with self._lock:
+            self.requests.append(record)
+            self.request_count += 1
+            self.bytes_sent += record.bytes_sent
+            self.bytes_received += record.bytes_received
+            self.network_time += record.network_time
+            self.decode_time += record.decode_time
+
+    def add_hydration(self, duration, count):
+        with self._lock:
+            self.hydration_time += duration
+            self.hydrated += count
+
+    def __str__(self):
+        return (
+            '%d requests, %d bytes sent, %d bytes received, network %.3fs, '
+            'decode %.3fs, hydration %.3fs' % (
+                self.request_count, self.bytes_sent, self.bytes_received,
+                self.network_time, self.decode_time, self.hydration_time))
+
+    def __repr__(self):
+        return '<QueryStats: %s>' % self
+
+
+def get_active_stats():
+    """
+    Returns a tuple of the ``QueryStats`` that are recording.
+    """
+    return _active_stats.get()
+
+
+@contextmanager
+def record(stats=None):
+    """
+    Records the requests made within the ``with`` block in ``stats``, or in
+    new ``QueryStats``, which are returned.
+    """
+    if stats is None:
+        stats = QueryStats()
+    active = _active_stats.get()
+    if stats in active:
+        yield stats
+        return
+    token = _active_stats.set(active + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+def content_size(content):
+    """
+    Returns the size in bytes of a request or response body.
+    """
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content.encode('utf-8'))
+    try:
+        return len(content)
+    except TypeError:
+        return 0
+
+
+def record_request(request, response, network_time, decode_time,
+                   active_stats=None):
+    """
+    Adds a request to ``active_stats``, by default all recording
+    ``QueryStats``. ``response`` is the transport response, before decoding.
+    """
+    if active_stats is None:
+        active_stats = _active_stats.get()
+    record = RequestRecord(
+        request.method, request.uri, response.status_code,
+        content_size(request.body), content_size(response.content),
+        network_time, decode_time)
+    for stats in active_stats:
+        stats.add_request(record)
+
+
+def record_hydration(duration, count):
+    """
+    Adds the time spent hydrating ``count`` instances to all recording
+    ``QueryStats``.
+    """
+    for stats in _active_stats.get():
+        stats.add_hydration(duration, count)
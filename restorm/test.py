@@ -0,0 +1,88 @@
+"""
+Test helpers to lock in the number of requests made by views and querysets,
+like Django's ``assertNumQueries`` for SQL queries::
+
+    from restorm.test import CaptureRequests, assertNumRequests
+
+    with assertNumRequests(3):
+        books = list(Book.objects.filter(author=1)[0:30])
+
+    with CaptureRequests() as captured:
+        self.client.get('/books/')
+    self.assertEqual(
+        [r.uri for r in captured], ['http://localhost/api/book/?page=1'])
+
+Requests of all clients are captured: ``MockClient``, ``MockApiClient`` and
+real clients, including requests made by worker threads of bulk operations.
+Responses returned by client middleware without sending a request are not
+captured.
+"""
+from restorm.stats import record
+
+
+class CaptureRequests(object):
+    """
+    Captures the requests made within the ``with`` block, as
+    ``restorm.stats.RequestRecord`` tuples with the method, URI, status code,
+    number of bytes sent and received and the network and decode time.
+    """
+    def __init__(self):
+        self.stats = None
+        self._recording = None
+
+    @property
+    def captured_requests(self):
+        if self.stats is None:
+            return []
+        return list(self.stats.requests)
+
+    def __len__(self):
+        return len(self.captured_requests)
+
+    def __iter__(self):
+        return iter(self.captured_requests)
+
+    def __getitem__(self, index):
+        return self.captured_requests[index]
+
+    def __enter__(self):
+        self._recording = record()
+        self.stats = self._recording.__enter__()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        recording, self._recording = self._recording, None
+        return recording.__exit__(type, value, traceback)
+
+
+class _AssertNumRequestsContext(CaptureRequests):
+    def __init__(self, num):
+        super(_AssertNumRequestsContext, self).__init__()
+        self.num = num
+
+    def __exit__(self, type, value, traceback):
+        super(_AssertNumRequestsContext, self).__exit__(type, value, traceback)
+        if type is not None:
+            return
+        executed = len(self)
+        if executed != self.num:
+            raise AssertionError(
+                '%d requests made, %d expected\nCaptured requests were:\n%s' % (
+                    executed, self.num, '\n'.join(
+                        '%d. %s %s (HTTP %s, %.3fs)' % (
+                            idx, r.method, r.uri, r.status_code,
+                            r.network_time + r.decode_time)
+                        for idx, r in enumerate(self, start=1))))
+
+
+def assertNumRequests(num, func=None, *args, **kwargs):
+    """
+    Asserts that ``num`` requests are made within the ``with`` block, or when
+    calling ``func(*args, **kwargs)`` if ``func`` is given.
+    """
+    context = _AssertNumRequestsContext(num)
+    if func is None:
+        return context
+
+    with context:
+        func(*args, **kwargs)
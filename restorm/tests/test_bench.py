@@ -0,0 +1,53 @@
+from unittest2 import TestCase
+
+from restorm.bench import hotpaths, load, memory, middleware, startup
+
+
+class BenchmarkTests(TestCase):
+    """
+    Runs each benchmark briefly, to make sure they keep working.
+    """
+    def test_middleware(self):
+        results = middleware.run(number=10, repeat=1)
+        self.assertEqual(
+            sorted(results),
+            ['direct', 'empty_chain', 'noop_middleware', 'observed',
+             'overhead'])
+        self.assertTrue(results['direct']['best'] > 0)
+
+    def test_hotpaths(self):
+        results = hotpaths.run(
+            number=10, repeat=1, names=['resource_init', 'fetch_page_1k'])
+        self.assertEqual(sorted(results), ['fetch_page_1k', 'resource_init'])
+        self.assertEqual(results['fetch_page_1k']['number'], 1)
+        self.assertTrue(results['fetch_page_1k']['peak_bytes'] > 0)
+
+    def test_memory(self):
+        results = memory.run(size=200, names=['book_page_100'])
+        self.assertEqual(sorted(results), ['book_page_100'])
+        self.assertEqual(results['book_page_100']['rows'], 200)
+        self.assertTrue(results['book_page_100']['bytes_per_row'] > 0)
+
+    def test_load(self):
+        results = load.run(
+            concurrency=2, duration=0.3, mix='get=2,page=1,save=1', size=100,
+            page_size=10, seed=1)
+        self.assertTrue(results['requests'] > 0)
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(sorted(results['kinds']), ['get', 'page', 'save'])
+        self.assertTrue(
+            results['latency']['p50'] <= results['latency']['p99'])
+
+    def test_percentiles(self):
+        result = load.percentiles([float(i) for i in range(1, 101)])
+        self.assertEqual(result['p50'], 50.0)
+        self.assertEqual(result['p99'], 99.0)
+        self.assertEqual(result['max'], 100.0)
+
+    def test_startup(self):
+        results = startup.run(number=5, repeat=1)
+        self.assertEqual(sorted(results), [
+            'define', 'import_restorm', 'import_restorm_clients',
+            'import_restorm_resource', 'prepare'])
+        self.assertEqual(results['define']['number'], 5)
+        self.assertTrue(results['prepare']['best'] > 0)
@@ -0,0 +1,64 @@
+import mock
+from requests import Response
+from unittest2 import TestCase
+
+from restorm.clients.jsonclient import JSONClient
+from restorm.clients.mockclient import MockClient, StringResponse
+from restorm.examples.mock.api import LibraryApiClient
+from restorm.test import CaptureRequests, assertNumRequests
+
+
+class CaptureRequestsTests(TestCase):
+
+    def test_mock_api_client(self):
+        client = LibraryApiClient()
+        with CaptureRequests() as captured:
+            client.get('author/1')
+            client.get('book/')
+        self.assertEqual(len(captured), 2)
+        self.assertEqual(
+            [(r.method, r.uri, r.status_code) for r in captured], [
+                ('GET', 'http://localhost/api/author/1', 200),
+                ('GET', 'http://localhost/api/book/', 200),
+            ])
+        self.assertTrue(captured[0].bytes_received > 0)
+        self.assertTrue(captured[0].network_time >= 0)
+
+    def test_mock_client(self):
+        client = MockClient(responses=[
+            StringResponse({'Status': 201}, '{"id": 1}')])
+        with CaptureRequests() as captured:
+            client.post('http://localhost/api/book/', {'title': 'New'})
+        self.assertEqual(
+            [(r.method, r.status_code) for r in captured], [('POST', 201)])
+        self.assertTrue(captured[0].bytes_sent > 0)
+
+    @mock.patch('requests.request')
+    def test_client(self, request):
+        response = Response()
+        response.status_code = 200
+        response._content = '{"foo": "bar"}'
+        response.headers['Content-Type'] = 'application/json'
+        request.return_value = response
+
+        with CaptureRequests() as captured:
+            JSONClient().get('http://localhost/api')
+        self.assertEqual([r.uri for r in captured], ['http://localhost/api'])
+
+    def test_assert_num_requests(self):
+        client = LibraryApiClient()
+        with assertNumRequests(1):
+            client.get('author/1')
+        assertNumRequests(1, client.get, 'author/1')
+
+        with self.assertRaises(AssertionError) as cm:
+            with assertNumRequests(1):
+                client.get('author/1')
+                client.get('author/2')
+        message = str(cm.exception).splitlines()
+        self.assertEqual(message[:2], [
+            '2 requests made, 1 expected', 'Captured requests were:'])
+        self.assertTrue(message[2].startswith(
+            '1. GET http://localhost/api/author/1 (HTTP 200, '))
+        self.assertTrue(message[3].startswith(
+            '2. GET http://localhost/api/author/2 (HTTP 200, '))
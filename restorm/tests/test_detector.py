@@ -0,0 +1,85 @@
+import logging
+
+from restorm.conf import settings
+from restorm.detector import detect, detected_problems_total
+from restorm.middleware import DetectorMiddleware
+from restorm.tests.test_query import QuerySetTestCase
+
+
+class DetectorTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(DetectorTests, self).setUp()
+        detected_problems_total.reset()
+
+    def get_books(self, ids):
+        for id in ids:
+            self.book_resource.objects.get(id=id)
+
+    def test_n_plus_one(self):
+        with self.assertLogs('restorm.detector', logging.WARNING) as logs:
+            with detect() as unit:
+                self.get_books(range(1, 13))
+                self.book_resource.objects.all()[0]
+        problem, = unit.problems()
+        self.assertEqual(problem.kind, 'n+1')
+        self.assertEqual((problem.resource, problem.pattern), ('Book', 'item'))
+        self.assertEqual(problem.count, 12)
+        self.assertTrue('Book.objects.in_bulk(ids)' in problem.suggestion)
+        self.assertTrue(logs.output[0].startswith(
+            'WARNING:restorm.detector:Book "item" requests for 12 different '
+            'URLs from '))
+        self.assertEqual(detected_problems_total.collect()['values'], {
+            ('Book', 'item', 'n+1'): 1})
+
+    def test_duplicates(self):
+        with detect() as unit:
+            self.get_books([1, 1, 1, 2])
+        problem, = unit.problems()
+        self.assertEqual(problem.kind, 'duplicate')
+        self.assertEqual(problem.uri, 'http://localhost/api/book/1')
+        self.assertEqual(problem.count, 3)
+
+    def test_concurrent_requests(self):
+        # Requests of the worker threads of in_bulk() are counted at the
+        # call site of in_bulk(), not once per worker thread.
+        with detect() as unit:
+            books = self.book_resource.objects.in_bulk(range(1, 15))
+        self.assertEqual(len(books), 14)
+        self.assertEqual(unit.problems(), [])
+        self.assertEqual(detected_problems_total.collect()['values'], {})
+
+    def test_sequential_requests(self):
+        settings.MAX_CONCURRENT_REQUESTS = 1
+        try:
+            with detect() as unit:
+                books = self.book_resource.objects.in_bulk(range(1, 15))
+            self.assertEqual(len(books), 14)
+            self.assertEqual(unit.problems(), [])
+        finally:
+            del settings.MAX_CONCURRENT_REQUESTS
+
+    def test_thresholds(self):
+        settings.N_PLUS_ONE_THRESHOLD = None
+        settings.DUPLICATE_REQUEST_THRESHOLD = 4
+        try:
+            with detect() as unit:
+                self.get_books([1, 1, 1] + list(range(2, 13)))
+            self.assertEqual(unit.problems(), [])
+        finally:
+            del settings.N_PLUS_ONE_THRESHOLD
+            del settings.DUPLICATE_REQUEST_THRESHOLD
+
+    def test_middleware(self):
+        def view(request):
+            self.get_books(range(1, 11))
+            return 'response'
+
+        with self.assertLogs('restorm.detector', logging.WARNING) as logs:
+            self.assertEqual(DetectorMiddleware(view)(None), 'response')
+        self.assertEqual(len(logs.records), 1)
+        # Outside a unit of work, requests are not counted.
+        self.get_books(range(1, 11))
+        self.assertEqual(
+            detected_problems_total.collect()['values'],
+            {('Book', 'item', 'n+1'): 1})
@@ -0,0 +1,75 @@
+import json
+import tracemalloc
+
+import requests.models
+from unittest2 import TestCase
+
+import restorm.query
+import restorm.rest
+from restorm.conf import settings
+from restorm.memory import MemoryReport, STAGES, get_stage, is_enabled
+from restorm.rest import restify
+from restorm.tests.test_query import QuerySetTestCase
+
+
+class MemoryReportTests(QuerySetTestCase):
+    size = 200
+    page_size = 100
+
+    def setUp(self):
+        super(MemoryReportTests, self).setUp()
+        settings.QUERY_CACHE_TIMEOUT = 0
+
+    def tearDown(self):
+        del settings.QUERY_CACHE_TIMEOUT
+
+    def test_queryset(self):
+        qs = self.book_resource.objects.all()
+        report = qs.memory_report()
+        self.assertFalse(is_enabled())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(list(report.retained), list(STAGES))
+        self.assertEqual(report.rows, 200)
+        self.assertEqual(report.stats.request_count, 2)
+        # The rows are kept in the result cache, the responses are not.
+        self.assertTrue(report.retained['hydrate'] > 0)
+        self.assertTrue(report.retained['deserialize'] > 0)
+        self.assertTrue(
+            report.peak['response'] > report.retained['response'])
+        self.assertTrue(report.bytes_per_row > 0)
+        self.assertTrue(
+            report.peak_total >= sum(report.retained.values()) // 2)
+        self.assertTrue(str(report).endswith(
+            '200 rows, %d bytes per row' % report.bytes_per_row))
+
+    def test_slice(self):
+        report = self.book_resource.objects.all().memory_report(slice(0, 10))
+        self.assertEqual(report.rows, 100)
+        self.assertEqual(report.stats.request_count, 1)
+
+
+class StageTests(TestCase):
+
+    def test_rest_objects(self):
+        class DummyResource(object):
+            client = None
+
+        with MemoryReport() as report:
+            objects = restify([{'id': idx} for idx in range(100)],
+                              DummyResource())
+        self.assertTrue(report.retained['rest_objects'] > 0)
+        self.assertEqual(report.rows, 0)
+        self.assertEqual(report.bytes_per_row, None)
+        del objects
+
+    def test_get_stage(self):
+        def traceback(*modules):
+            # Frames are given from the most recent to the oldest.
+            return tracemalloc.Traceback(tuple(
+                (module.__file__, 1) for module in modules))
+
+        self.assertEqual(get_stage(traceback(requests.models)), 'response')
+        self.assertEqual(
+            get_stage(traceback(json, restorm.rest, restorm.query)),
+            'rest_objects')
+        self.assertEqual(get_stage(traceback(json)), 'other')
@@ -0,0 +1,135 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from unittest2 import TestCase, skipUnless
+
+from restorm.conf import settings
+from restorm.examples.mock.api import LibraryApiClient
+from restorm.metrics import MetricsRegistry, registry
+from restorm.metrics.prometheus import render
+from restorm.metrics.shared import SharedSegment, share
+
+
+class SharedSegmentTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'metrics')
+        self.registry = MetricsRegistry()
+        self.counter = self.registry.counter('requests', 'Requests.', ('name',))
+        self.histogram = self.registry.histogram(
+            'latency', 'Latency.', ('name',), buckets=(0.1, 1.0))
+
+    def tearDown(self):
+        registry.share(None)
+        shutil.rmtree(self.tmpdir)
+
+    def fork(self, func):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                func()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+    def get_values(self, metrics, name):
+        for metric in metrics:
+            if metric['name'] == name:
+                return metric['values']
+
+    @skipUnless(hasattr(os, 'fork'), 'Requires os.fork().')
+    def test_aggregate_processes(self):
+        segment = share(self.path, registry=self.registry, clear=True)
+
+        def work():
+            self.counter.inc(('a',))
+            self.counter.inc(('b',), 2)
+            self.histogram.observe(('a',), 0.5)
+
+        for i in range(3):
+            self.fork(work)
+        self.counter.inc(('a',))
+
+        metrics = segment.collect(self.registry)
+        self.assertEqual(
+            self.get_values(metrics, 'requests'), {('a',): 4, ('b',): 6})
+        self.assertEqual(
+            self.get_values(metrics, 'latency'), {('a',): [0, 3, 0, 1.5, 3]})
+        # Slots of exited processes are adopted by the next process.
+        self.assertEqual(
+            [segment._ints[segment._slot_offset(s) // 8]
+             for s in range(3)], [os.getpid(), 0, 0])
+
+        # The segment survives reopening it, unless it is cleared.
+        reopened = SharedSegment(self.path)
+        self.assertEqual(reopened.read()[('requests', 'b')][0], 6)
+        reopened.clear()
+        self.assertEqual(segment.read(), {})
+        reopened.close()
+        segment.close()
+
+    def test_dropped(self):
+        segment = share(
+            self.path, registry=self.registry, series=1, values=4,
+            key_size=32)
+        self.counter.inc(('a',))
+        self.counter.inc(('b',))
+        # Histograms with two buckets need five values.
+        self.histogram.observe(('a',), 0.5)
+        self.assertEqual(segment.read(), {('requests', 'a'): [1, 0, 0, 0]})
+        self.assertEqual(segment.dropped, 2)
+        # Values are still kept in the process.
+        self.assertEqual(
+            self.get_values(self.registry.collect(), 'requests'),
+            {('a',): 1, ('b',): 1})
+        segment.close()
+
+    def test_threads(self):
+        segment = share(self.path, registry=self.registry, series=4096)
+        counters = [
+            self.registry.counter('counter_%d' % idx, 'Counter.', ('label',))
+            for idx in range(8)]
+        barrier = threading.Barrier(len(counters))
+
+        def work(counter):
+            barrier.wait()
+            for label in range(300):
+                counter.inc((str(label),))
+
+        # Switch threads often, such that they race on the same slot.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [
+                threading.Thread(target=work, args=(counter,))
+                for counter in counters]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        values = segment.read()
+        self.assertEqual(len(values), 2400)
+        self.assertEqual(set(v[0] for v in values.values()), set([1]))
+        self.assertEqual(segment.dropped, 0)
+        segment.close()
+
+    def test_client_metrics(self):
+        segment = share(self.path, clear=True)
+        registry.reset()
+        settings.COLLECT_METRICS = True
+        try:
+            LibraryApiClient().get('author/1')
+        finally:
+            del settings.COLLECT_METRICS
+        text = render(segment.collect())
+        self.assertEqual(text, render())
+        self.assertTrue('restorm_requests_total{resource="",pattern="",'
+                        'method="GET",status="200"} 1\n' in text)
+        segment.close()
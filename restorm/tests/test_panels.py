@@ -0,0 +1,73 @@
+import mock
+from unittest2 import skipUnless
+
+from restorm.panels import DEBUG_TOOLBAR_FOUND, PanelStats, RequestsPanel
+from restorm.stats import record
+from restorm.tests.test_query import QuerySetTestCase
+
+
+class PanelStatsTests(QuerySetTestCase):
+
+    def test_calls(self):
+        stats = PanelStats()
+        with record(stats):
+            for id in [1, 1, 1] + list(range(2, 12)):
+                self.book_resource.objects.get(id=id)
+        self.book_resource.objects.get(id=1)
+
+        self.assertEqual(len(stats.calls), 13)
+        call = stats.calls[0]
+        self.assertEqual(call['uri'], 'http://localhost/api/book/1')
+        self.assertEqual(
+            (call['resource'], call['pattern'], call['status_code']),
+            ('Book', 'item', 200))
+        self.assertTrue(call['stack'])
+        self.assertEqual(
+            [p.kind for p in stats.unit_of_work.problems()],
+            ['n+1', 'duplicate'])
+
+    def test_concurrent_calls(self):
+        stats = PanelStats()
+        with record(stats):
+            self.book_resource.objects.in_bulk(range(1, 15))
+        # Calls of worker threads have the call site of in_bulk().
+        self.assertEqual(len(stats.calls), 14)
+        self.assertEqual(len(set(c['call_site'] for c in stats.calls)), 1)
+        self.assertFalse('concurrent' in stats.calls[0]['call_site'])
+        self.assertEqual(stats.unit_of_work.problems(), [])
+
+
+@skipUnless(DEBUG_TOOLBAR_FOUND, 'Requires Django Debug Toolbar.')
+class RequestsPanelTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(RequestsPanelTests, self).setUp()
+        self.stats = {}
+        patcher = mock.patch.multiple(
+            RequestsPanel, record_stats=self.stats.update,
+            get_stats=lambda panel: self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.panel = RequestsPanel(mock.Mock(), mock.Mock())
+
+    def test_calls(self):
+        self.panel.enable_instrumentation()
+        for id in [1, 1, 1] + list(range(2, 12)):
+            self.book_resource.objects.get(id=id)
+        self.panel.disable_instrumentation()
+        self.book_resource.objects.get(id=1)
+        self.panel.generate_stats(None, None)
+
+        calls = self.stats['calls']
+        self.assertEqual(len(calls), 13)
+        self.assertEqual(calls[0]['uri'], 'http://localhost/api/book/1')
+        self.assertEqual(
+            (calls[0]['resource'], calls[0]['pattern']), ('Book', 'item'))
+        self.assertTrue(calls[0]['duplicate'])
+        self.assertFalse(calls[-1]['duplicate'])
+        self.assertTrue(calls[-1]['n_plus_one'])
+        self.assertEqual(
+            [p['kind'] for p in self.stats['problems']], ['n+1', 'duplicate'])
+        self.assertTrue(self.panel.nav_subtitle.startswith('13 calls in '))
+        self.assertTrue('<td>http://localhost/api/book/11</td>' in
+                        self.panel.content)
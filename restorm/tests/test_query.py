@@ -0,0 +1,912 @@
+from decimal import Decimal
+import io
+import math
+
+import mock
+import requests
+from unittest2 import TestCase, skipUnless
+
+from restorm import fields
+from restorm.aggregates import Avg, Count, Max, Min, Sum
+from restorm.apps import RestormAppSetup
+from restorm.cache import query_cache
+from restorm.columns import NUMPY_FOUND, PANDAS_FOUND, PYARROW_FOUND
+from restorm.examples.mock.api import CatalogApiClient
+from restorm.exceptions import (
+    ResourceException, RestNotFoundException, RestServerException)
+from restorm.conf import settings
+from restorm.lookups import DJANGO_LOOKUPS
+from restorm.metrics import registry
+from restorm.metrics.prometheus import render
+from restorm.profiler import profiler
+from restorm.resource import Resource
+from restorm.stats import record
+
+
+class RecordingCatalogApiClient(CatalogApiClient):
+    """
+    Catalog API client that keeps track of all requested URIs.
+    """
+    def __init__(self, *args, **kwargs):
+        self.requests = []
+        super(RecordingCatalogApiClient, self).__init__(*args, **kwargs)
+
+    def get_response_from_request(self, request):
+        self.requests.append((request.method, request.uri))
+        return super(RecordingCatalogApiClient, self).get_response_from_request(
+            request)
+
+
+class QuerySetTestCase(TestCase):
+    size = 25
+    page_size = 10
+
+    def setUp(self):
+        RestormAppSetup()
+        self.client = RecordingCatalogApiClient(size=self.size)
+        self.hydrated = []
+
+        test = self
+
+        class Book(Resource):
+            id = fields.IntegerField(primary_key=True)
+            isbn = fields.CharField()
+            title = fields.CharField()
+            price = fields.DecimalField()
+
+            class Meta:
+                resource_name = 'catalog_book'
+                list = r'^book/$'
+                item = r'^book/(?P<id>\d+)$'
+                client = self.client
+                page_size = self.page_size
+
+            def __init__(self, *args, **kwargs):
+                test.hydrated.append(self)
+                super(Book, self).__init__(*args, **kwargs)
+
+        self.book_resource = Book
+
+
+class ValuesTests(QuerySetTestCase):
+
+    def test_values(self):
+        rows = self.book_resource.objects.all().values('id', 'title')
+        self.assertEqual(len(rows), self.size)
+        self.assertEqual(rows[0], {'id': 1, 'title': 'Book 1'})
+        self.assertEqual(rows[-1], {'id': 25, 'title': 'Book 25'})
+        self.assertEqual(self.hydrated, [])
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_values_without_fields(self):
+        rows = self.book_resource.objects.all().values()
+        self.assertEqual(rows[0], self.client.books[1])
+
+    def test_values_list(self):
+        qs = self.book_resource.objects.all()
+        self.assertEqual(qs.values_list('pk', 'title')[1], (2, 'Book 2'))
+        self.assertEqual(qs.values_list('id', flat=True), list(range(1, 26)))
+
+        row = qs.values_list('id', 'isbn', named=True)[0]
+        self.assertEqual(row.id, 1)
+        self.assertEqual(row.isbn, '978-0000000001')
+        self.assertEqual(self.hydrated, [])
+
+    def test_values_list_invalid_arguments(self):
+        qs = self.book_resource.objects.all()
+        self.assertRaises(TypeError, qs.values_list, 'id', 'title', flat=True)
+        self.assertRaises(TypeError, qs.values_list, 'id', flat=True, named=True)
+
+    def test_values_uses_fetched_pages(self):
+        qs = self.book_resource.objects.all()
+        qs[0]
+        requests = len(self.client.requests)
+        self.assertEqual(qs.values_list('id', flat=True), list(range(1, 26)))
+        self.assertEqual(len(self.client.requests), requests + 2)
+
+
+class SparseFieldsetTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(SparseFieldsetTests, self).setUp()
+        self.book_resource._meta.fields_param = 'fields'
+
+    def test_only(self):
+        qs = self.book_resource.objects.all().only('title')
+        book = qs[0]
+        self.assertEqual(
+            self.client.requests[-1][1],
+            'http://localhost/api/book/?fields=id%2Ctitle&page_size=10&page=1')
+        self.assertEqual(sorted(book.data), ['id', 'title'])
+        self.assertEqual(book.get_deferred_fields(), set(['isbn', 'price']))
+
+    def test_defer(self):
+        qs = self.book_resource.objects.all().defer('price', 'isbn')
+        self.assertEqual(qs.values_list('id', 'title')[0], (1, 'Book 1'))
+        self.assertTrue(
+            self.client.requests[-1][1].startswith(
+                'http://localhost/api/book/?fields=id%2Ctitle&'))
+
+    def test_deferred_fields_load_per_page(self):
+        qs = self.book_resource.objects.all().only('title')
+        books = qs[0:10]
+        requests = len(self.client.requests)
+
+        self.assertEqual(books[0].isbn, '978-0000000001')
+        self.assertEqual(len(self.client.requests), requests + 1)
+
+        # The other books of the page are loaded by the same request.
+        self.assertEqual([b.isbn for b in books][-1], '978-0000000010')
+        self.assertEqual(len(self.client.requests), requests + 1)
+        self.assertEqual(books[5].get_deferred_fields(), set())
+
+    def test_deferred_fields_load_per_instance(self):
+        book = self.book_resource.objects.all().only('title').get(id=3)
+        self.assertEqual(book.absolute_url, 'book/3')
+        self.assertEqual(sorted(book.data), ['id', 'title'])
+
+        self.assertEqual(book.isbn, '978-0000000003')
+        self.assertEqual(
+            self.client.requests[-1][1],
+            'http://localhost/api/book/3?fields=isbn%2Cprice')
+        self.assertEqual(book.get_deferred_fields(), set())
+
+    def test_absolute_url_without_fields(self):
+        qs = self.book_resource.objects.all()
+        book = qs.get(id=3)
+        sparse_book = qs.only('title').get(id=3)
+        self.assertEqual(book.absolute_url, 'book/3')
+        self.assertEqual(sparse_book.absolute_url, book.absolute_url)
+
+    def test_without_fields_param(self):
+        self.book_resource._meta.fields_param = None
+        book = self.book_resource.objects.all().only('title')[0]
+        self.assertEqual(self.client.requests[-1][1],
+                         'http://localhost/api/book/?page_size=10&page=1')
+        self.assertEqual(book.get_deferred_fields(), set())
+        self.assertEqual(book.isbn, '978-0000000001')
+
+
+class LookupTests(QuerySetTestCase):
+
+    def test_translated_lookups(self):
+        self.book_resource._meta.lookups = DJANGO_LOOKUPS
+        qs = self.book_resource.objects.filter(
+            id__gte=20, title__in=['Book 21', 'Book 3'])
+        self.assertEqual(qs.values_list('id', flat=True), [21])
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertTrue('id__gte=20' in self.client.requests[0][1])
+        self.assertTrue(
+            'title__in=Book+21%2CBook+3' in self.client.requests[0][1])
+
+    def test_field_specific_translation(self):
+        self.book_resource._meta.lookups = {
+            'id__lt': lambda field, value: {'id__lte': value - 1}}
+        qs = self.book_resource.objects.filter(pk__lt=4)
+        self.assertEqual(qs.values_list('id', flat=True), [1, 2, 3])
+        self.assertTrue('id__lte=3' in self.client.requests[0][1])
+
+    def test_local_lookups(self):
+        # The API only supports the "in" lookup.
+        self.book_resource._meta.lookups = {'in': '%(field)s__in'}
+        qs = self.book_resource.objects.filter(
+            price__lt=Decimal('10'), title__icontains='BOOK 1')
+        expected = [
+            b['id'] for b in self.client.books.values()
+            if Decimal(b['price']) < 10 and 'book 1' in b['title'].lower()]
+        self.assertEqual(len(qs), len(expected))
+        self.assertEqual([b.id for b in qs[0:len(qs)]], expected)
+        self.assertEqual(qs.values_list('id', flat=True), expected)
+        # All pages are requested once, without the local lookups.
+        self.assertEqual(len(self.client.requests), 3)
+        self.assertFalse('price' in self.client.requests[0][1])
+
+    def test_lookups_are_sent_as_is_without_table(self):
+        qs = self.book_resource.objects.filter(pk__lt=4, title__contains='2')
+        self.assertEqual(qs.values_list('id', flat=True), [2])
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertTrue('id__lt=4' in self.client.requests[0][1])
+        self.assertTrue('title__contains=2' in self.client.requests[0][1])
+
+    def test_local_in_lookup_with_string(self):
+        self.book_resource._meta.lookups = {'gte': '%(field)s__gte'}
+        qs = self.book_resource.objects.filter(id__in='3,12')
+        self.assertEqual(qs.values_list('id', flat=True), [3, 12])
+
+    def test_unknown_filters_are_sent_as_is(self):
+        qs = self.book_resource.objects.filter(author=2, author__in='3')
+        self.assertEqual(len(qs), 0)
+        self.assertTrue('author=2' in self.client.requests[0][1])
+
+
+class OrderingTests(QuerySetTestCase):
+
+    def test_order_by_with_ordering_param(self):
+        self.book_resource._meta.ordering_param = 'ordering'
+        qs = self.book_resource.objects.order_by('-pk')
+        self.assertTrue(qs.ordered)
+        self.assertEqual(qs[0].id, 25)
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertTrue('ordering=-id' in self.client.requests[0][1])
+
+    def test_local_order_by(self):
+        self.book_resource._meta.lookups = {'in': '%(field)s__in'}
+        qs = self.book_resource.objects.filter(price__gte=20).order_by(
+            '-price', 'title')
+        books = sorted(
+            self.client.books.values(), key=lambda b: b['title'])
+        books.sort(key=lambda b: Decimal(b['price']), reverse=True)
+        expected = [b['id'] for b in books if Decimal(b['price']) >= 20]
+        self.assertEqual(qs[1].id, expected[1])
+        self.assertEqual(qs.values_list('id', flat=True), expected)
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_local_order_by_converts_values(self):
+        # Prices are sent as strings of different lengths, like "6.01" and
+        # "10.05", and are sorted as decimals.
+        books = sorted(
+            self.client.books.values(), key=lambda b: Decimal(b['price']))
+        qs = self.book_resource.objects.order_by('price', 'id')
+        self.assertEqual(
+            qs.values_list('id', flat=True), [b['id'] for b in books])
+
+        indexed = self.book_resource.objects.all().index_by('id')
+        qs = indexed.filter(id__in=[5, 6, 7]).order_by('-price')
+        self.assertEqual(
+            [b.price for b in qs[0:3]],
+            sorted((Decimal(self.client.books[pk]['price'])
+                    for pk in (5, 6, 7)), reverse=True))
+
+    def test_order_by_unknown_field(self):
+        self.assertRaises(
+            ValueError, self.book_resource.objects.order_by, 'author')
+
+
+class IndexTests(QuerySetTestCase):
+
+    def tearDown(self):
+        query_cache.clear()
+
+    def test_index_by(self):
+        qs = self.book_resource.objects.all().index_by('isbn')
+        self.assertEqual(len(self.client.requests), 3)
+
+        book = qs.get(isbn='978-0000000012')
+        self.assertEqual(book.id, 12)
+        self.assertTrue(book is qs[11])
+        books = qs.filter(isbn__in=['978-0000000003', '978-0000000001'])
+        self.assertEqual(books.values_list('id', flat=True), [1, 3])
+        self.assertEqual(qs.filter(isbn='978-0000000099').count(), 0)
+        self.assertEqual(len(self.client.requests), 3)
+
+        self.assertRaises(
+            RestNotFoundException, qs.get, isbn='978-0000000099')
+
+    def test_sorted_index(self):
+        qs = self.book_resource.objects.all().index_by('price', kind='sorted')
+        books = qs.filter(price__lt=10).order_by('-price')
+        expected = sorted(
+            [b for b in self.client.books.values()
+             if Decimal(b['price']) < 10],
+            key=lambda b: Decimal(b['price']), reverse=True)
+        self.assertEqual(
+            books.values_list('id', flat=True), [b['id'] for b in expected])
+        self.assertEqual(
+            qs.filter(price__range=(20, 22), title__endswith='6')
+            .values_list('id', flat=True), [16])
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_equivalent_querysets_use_index(self):
+        from restorm.cache import query_cache
+
+        # Equivalent querysets share their results through the query cache.
+        settings.QUERY_CACHE_TIMEOUT = 5
+        try:
+            self.book_resource.objects.all().index_by('isbn')
+            book = self.book_resource.objects.all().get(isbn='978-0000000005')
+            self.assertEqual(book.id, 5)
+            self.assertEqual(len(self.client.requests), 3)
+
+            # Filters on fields that are not indexed are requested from the
+            # API.
+            self.book_resource.objects.all().filter(title='Book 5')[0]
+            self.assertEqual(len(self.client.requests), 4)
+        finally:
+            del settings.QUERY_CACHE_TIMEOUT
+            query_cache.clear()
+
+    def test_invalid_kind(self):
+        self.assertRaises(
+            ValueError, self.book_resource.objects.all().index_by, 'isbn',
+            kind='btree')
+
+
+class ColumnsTests(QuerySetTestCase):
+
+    @skipUnless(NUMPY_FOUND, 'NumPy is not installed.')
+    def test_to_columns(self):
+        columns = self.book_resource.objects.all().to_columns(
+            'pk', 'price', 'title')
+        self.assertEqual(list(columns), ['pk', 'price', 'title'])
+        self.assertEqual(columns['pk'].dtype.name, 'int64')
+        self.assertEqual(columns['pk'].tolist(), list(range(1, 26)))
+        self.assertEqual(columns['price'].dtype.name, 'float64')
+        self.assertAlmostEqual(columns['price'][0], 6.01)
+        self.assertEqual(columns['title'].dtype, object)
+        self.assertEqual(columns['title'][24], 'Book 25')
+        self.assertEqual(self.hydrated, [])
+        self.assertEqual(len(self.client.requests), 3)
+
+    @skipUnless(NUMPY_FOUND, 'NumPy is not installed.')
+    def test_missing_values(self):
+        self.client.books[2]['id'] = None
+        columns = self.book_resource.objects.all().to_columns('id')
+        self.assertEqual(columns['id'].dtype.name, 'float64')
+        self.assertTrue(math.isnan(columns['id'][1]))
+
+    def test_to_columns_without_numpy(self):
+        with mock.patch('restorm.columns.NUMPY_FOUND', False):
+            columns = self.book_resource.objects.filter(
+                id__lte=3).to_columns('id', 'isbn')
+        self.assertEqual(columns['id'], [1, 2, 3])
+        self.assertEqual(columns['isbn'][2], '978-0000000003')
+
+    @skipUnless(PANDAS_FOUND, 'pandas is not installed.')
+    def test_to_pandas(self):
+        frame = self.book_resource.objects.all().to_columns(
+            'id', 'title').to_pandas()
+        self.assertEqual(list(frame.columns), ['id', 'title'])
+        self.assertEqual(len(frame), 25)
+
+    @skipUnless(PYARROW_FOUND, 'PyArrow is not installed.')
+    def test_to_arrow(self):
+        table = self.book_resource.objects.all().to_columns(
+            'id', 'title').to_arrow()
+        self.assertEqual(table.column_names, ['id', 'title'])
+        self.assertEqual(table.num_rows, 25)
+
+    def test_conversion_requirements(self):
+        columns = self.book_resource.objects.all().to_columns('id')
+        with mock.patch.dict('sys.modules', {'pandas': None, 'pyarrow': None}):
+            self.assertRaises(ImportError, columns.to_pandas)
+            self.assertRaises(ImportError, columns.to_arrow)
+
+
+class AggregateTests(QuerySetTestCase):
+
+    def books(self, **kwargs):
+        return [
+            b for b in self.client.books.values()
+            if all(b[k] == v for k, v in kwargs.items())]
+
+    def test_aggregate(self):
+        result = self.book_resource.objects.all().aggregate(
+            Sum('price'), Min('price'), Max('id'), Avg('id'),
+            books=Count('id'))
+        prices = [Decimal(b['price']) for b in self.books()]
+        self.assertEqual(result, {
+            'price__sum': sum(prices),
+            'price__min': '%s' % min(prices),
+            'id__max': 25,
+            'id__avg': 13.0,
+            'books': 25,
+        })
+        self.assertEqual(self.hydrated, [])
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_aggregate_without_numpy(self):
+        with mock.patch('restorm.aggregates.NUMPY_FOUND', False):
+            result = self.book_resource.objects.all().aggregate(
+                Sum('id'), Max('id'))
+        self.assertEqual(result, {'id__sum': 325, 'id__max': 25})
+
+    def test_aggregate_empty(self):
+        result = self.book_resource.objects.filter(
+            title__startswith='Magazine').aggregate(Sum('price'), Count('id'))
+        self.assertEqual(result, {'price__sum': None, 'id__count': 0})
+
+    def test_group_by(self):
+        results = self.book_resource.objects.all().group_by(
+            'author').aggregate(Count('id'), total=Sum('price'))
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[0], {
+            'author': 2,
+            'id__count': len(self.books(author=2)),
+            'total': sum(Decimal(b['price']) for b in self.books(author=2)),
+        })
+
+    def test_aggregate_endpoint(self):
+        self.book_resource._meta.aggregate = r'^book/aggregate/$'
+        qs = self.book_resource.objects.filter(author=3)
+        result = qs.aggregate(Count('id'), total=Sum('price'))
+        self.assertEqual(result, {
+            'id__count': len(self.books(author=3)),
+            'total': '%s' % sum(
+                Decimal(b['price']) for b in self.books(author=3)),
+        })
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertEqual(
+            self.client.requests[0][1],
+            'http://localhost/api/book/aggregate/'
+            '?author=3&aggregate=id__count%2Cprice__sum')
+
+        results = self.book_resource.objects.all().group_by(
+            'author').aggregate(Count('id'))
+        self.assertEqual(results[0], {'author': 2, 'id__count': 4})
+        self.assertEqual(len(self.client.requests), 2)
+
+
+class ExplainTests(QuerySetTestCase):
+
+    def test_explain_slice(self):
+        plan = self.book_resource.objects.all().explain(slice(12, 22))
+        self.assertEqual(
+            [(r.kind, r.page, r.cached) for r in plan],
+            [('count', 0, False), ('page', 1, False), ('page', 2, False)])
+        self.assertEqual(
+            plan[2].uri, 'http://localhost/api/book/?page_size=10&page=3')
+        self.assertEqual(plan.request_count, 3)
+        # Only the first page was requested, to know the count.
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_explain_cached_pages(self):
+        qs = self.book_resource.objects.all()
+        qs[15]
+        plan = qs.explain()
+        self.assertEqual(
+            [(r.kind, r.page, r.cached) for r in plan],
+            [('count', 0, True), ('page', 1, True), ('page', 2, False)])
+        self.assertEqual(plan.request_count, 1)
+        self.assertTrue('(cached)' in str(plan))
+
+    def test_explain_without_count(self):
+        plan = self.book_resource.objects.all().explain(count=False)
+        self.assertEqual([r.kind for r in plan], ['count', 'page'])
+        self.assertEqual(plan[1].page, None)
+        self.assertEqual(self.client.requests, [])
+
+    def test_explain_local_lookups(self):
+        self.book_resource._meta.lookups = {'in': '%(field)s__in'}
+        plan = self.book_resource.objects.filter(
+            title__contains='2').explain(0)
+        self.assertEqual(len(plan), 3)
+        self.assertTrue(plan[0].note)
+
+
+class StatsTests(QuerySetTestCase):
+
+    def test_stats(self):
+        qs = self.book_resource.objects.all()
+        qs[0:15]
+        self.assertEqual(qs.stats.request_count, 2)
+        self.assertEqual(
+            [r.uri for r in qs.stats.requests],
+            [uri for method, uri in self.client.requests])
+        self.assertTrue(qs.stats.bytes_received > 0)
+        self.assertEqual(qs.stats.bytes_sent, 0)
+        self.assertEqual(qs.stats.hydrated, 20)
+        self.assertTrue(qs.stats.network_time >= 0)
+        self.assertTrue(qs.stats.decode_time > 0)
+        self.assertTrue(qs.stats.hydration_time > 0)
+        self.assertTrue(str(qs.stats).startswith('2 requests'))
+
+        # Only the last requests are kept, the counters include all.
+        settings.QUERY_STATS_SIZE = 1
+        try:
+            qs = self.book_resource.objects.all()
+            qs[0:15]
+        finally:
+            del settings.QUERY_STATS_SIZE
+        self.assertEqual(qs.stats.request_count, 2)
+        self.assertEqual(
+            [r.uri for r in qs.stats.requests], [self.client.requests[-1][1]])
+        self.assertEqual(qs.stats.hydrated, 20)
+
+        # Other querysets have their own statistics.
+        self.book_resource.objects.get(id=1)
+        self.assertEqual(qs.stats.request_count, 2)
+
+    def test_record(self):
+        self.book_resource._meta.lookups = {'in': '%(field)s__in'}
+        with record() as stats:
+            self.book_resource.objects.get(id=1)
+            self.book_resource.objects.filter(
+                title__endswith='5').values_list('id')
+        self.assertEqual(stats.request_count, 4)
+        self.assertEqual(stats.hydrated, 1)
+
+
+class MetricsTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(MetricsTests, self).setUp()
+        settings.COLLECT_METRICS = True
+        registry.reset()
+
+    def tearDown(self):
+        del settings.COLLECT_METRICS
+
+    def get_values(self, name):
+        for metric in registry.collect():
+            if metric['name'] == name:
+                return metric['values']
+
+    def test_metrics(self):
+        self.book_resource.objects.all()[0:15]
+        self.book_resource.objects.get(id=1)
+
+        self.assertEqual(self.get_values('restorm_requests_total'), {
+            ('Book', 'list', 'GET', '200'): 2,
+            ('Book', 'item', 'GET', '200'): 1,
+        })
+        phases = self.get_values('restorm_request_phase_seconds')
+        for phase in ('serialize', 'wait', 'transfer', 'deserialize',
+                      'hydrate'):
+            self.assertEqual(phases[('Book', 'list', phase)][-1], 2)
+        self.assertTrue(
+            self.get_values('restorm_response_bytes_total')[
+                ('Book', 'list')] > 0)
+
+    def test_render(self):
+        self.book_resource.objects.get(id=1)
+        text = render()
+        self.assertTrue(
+            '# TYPE restorm_request_phase_seconds histogram' in text)
+        self.assertTrue(
+            'restorm_requests_total{resource="Book",pattern="item",'
+            'method="GET",status="200"} 1\n' in text)
+        self.assertTrue(
+            'restorm_request_phase_seconds_bucket{resource="Book",'
+            'pattern="item",phase="wait",le="+Inf"} 1\n' in text)
+        self.assertTrue(
+            'restorm_request_phase_seconds_count{resource="Book",'
+            'pattern="item",phase="wait"} 1\n' in text)
+
+    def test_disabled(self):
+        settings.COLLECT_METRICS = False
+        self.book_resource.objects.get(id=1)
+        self.assertEqual(self.get_values('restorm_requests_total'), {})
+
+
+class ProfilerTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(ProfilerTests, self).setUp()
+        profiler.clear()
+
+    def tearDown(self):
+        if 'SLOW_REQUEST_THRESHOLD' in settings.__dict__:
+            del settings.SLOW_REQUEST_THRESHOLD
+        profiler.clear()
+
+    def test_slow_requests(self):
+        settings.SLOW_REQUEST_THRESHOLD = 0
+        self.book_resource._meta.lookups = {'in': '%(field)s__in'}
+        self.book_resource.objects.filter(
+            price__gte=20).order_by('-title').only('title')[0]
+
+        records = profiler.records()
+        self.assertEqual(len(records), 3)
+        record = records[0]
+        self.assertEqual(record.method, 'GET')
+        self.assertEqual(record.status_code, 200)
+        self.assertEqual((record.resource, record.pattern), ('Book', 'list'))
+        self.assertEqual(
+            record.lineage,
+            "Book.objects.filter(price__gte=20).order_by('-title')"
+            ".only('id', 'title')")
+        self.assertEqual(
+            sorted(record.timings),
+            ['deserialize', 'serialize', 'transfer', 'wait'])
+        # The stack only contains the frames of the callers of RestORM.
+        self.assertTrue(record.stack)
+        self.assertFalse([f for f in record.stack if '/restorm/' in f])
+
+        stream = io.StringIO()
+        profiler.dump(stream)
+        self.assertEqual(len(stream.getvalue().splitlines()), 3)
+
+    def test_threshold(self):
+        settings.SLOW_REQUEST_THRESHOLD = 60
+        self.book_resource.objects.get(id=1)
+        self.assertEqual(profiler.records(), [])
+        self.assertEqual(profiler.size, 100)
+
+
+class InBulkTests(QuerySetTestCase):
+
+    def test_in_bulk_with_in_bulk_param(self):
+        self.book_resource._meta.in_bulk_param = 'id__in'
+        books = self.book_resource.objects.in_bulk([3, 12, 24, 99])
+        self.assertEqual(list(books), [3, 12, 24])
+        self.assertEqual(books[12].title, 'Book 12')
+        self.assertEqual(books[12].absolute_url, 'book/12')
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertTrue('id__in=3%2C12%2C24%2C99' in self.client.requests[0][1])
+
+    def test_in_bulk_chunks_long_urls(self):
+        from restorm.conf import settings
+
+        self.book_resource._meta.in_bulk_param = 'id__in'
+        settings.MAX_URL_LENGTH = 100
+        try:
+            books = self.book_resource.objects.in_bulk(range(1, 21))
+        finally:
+            del settings.MAX_URL_LENGTH
+        self.assertEqual(list(books), list(range(1, 21)))
+        self.assertTrue(len(self.client.requests) > 1)
+        for method, uri in self.client.requests:
+            self.assertTrue(len(uri) <= 100)
+
+    def test_in_bulk_with_item_requests(self):
+        books = self.book_resource.objects.in_bulk(['4', '2', '404'])
+        self.assertEqual(list(books), ['4', '2'])
+        self.assertEqual(books['2'].title, 'Book 2')
+        self.assertEqual(
+            sorted(uri for method, uri in self.client.requests),
+            ['http://localhost/api/book/2', 'http://localhost/api/book/4',
+             'http://localhost/api/book/404'])
+
+    def test_in_bulk_uses_result_cache(self):
+        qs = self.book_resource.objects.all()
+        first = qs[0]
+        requests = len(self.client.requests)
+        books = qs.in_bulk([1, 2])
+        self.assertTrue(books[1] is first)
+        self.assertEqual(len(self.client.requests), requests)
+
+    def test_get_many(self):
+        books = self.book_resource.objects.get_many([5, 1, 404])
+        self.assertEqual([b.title for b in books], ['Book 5', 'Book 1'])
+
+
+class BulkSaveTests(QuerySetTestCase):
+
+    def test_bulk_create_with_batch(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        objs = [self.book_resource({'title': 'New %d' % i}) for i in range(5)]
+        result = self.book_resource.objects.bulk_create(objs, batch_size=2)
+
+        self.assertEqual(result, objs)
+        self.assertEqual(result.errors, [])
+        self.assertEqual([o.id for o in objs], [26, 27, 28, 29, 30])
+        self.assertEqual(objs[0].absolute_url, 'book/26')
+        self.assertEqual(objs[0].delete_url, 'book/26')
+        self.assertEqual(
+            [r for r in self.client.requests],
+            [('POST', 'http://localhost/api/book/batch/')] * 3)
+
+    def test_bulk_create_with_batch_errors(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        objs = [self.book_resource({'title': 'New'}),
+                self.book_resource({'isbn': 'untitled'}),
+                self.book_resource({'title': 'Newer'})]
+        result = self.book_resource.objects.bulk_create(objs, batch_size=2)
+
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual([obj for obj, e in result.errors], objs[:2])
+        self.assertEqual(
+            result.errors[0][1].response.content[1],
+            {'title': ['This field is required.']})
+        self.assertEqual(objs[2].id, 26)
+
+    def test_bulk_create_concurrently(self):
+        objs = [self.book_resource({'title': 'New %d' % i}) for i in range(6)]
+        objs.insert(3, self.book_resource({'isbn': 'untitled'}))
+        result = self.book_resource.objects.bulk_create(objs)
+
+        self.assertEqual(result, objs)
+        self.assertEqual([obj for obj, e in result.errors], [objs[3]])
+        self.assertEqual(
+            sorted(o.id for o in objs if o.id), list(range(26, 32)))
+        for obj in objs:
+            if obj.id:
+                self.assertEqual(obj.absolute_url, 'book/%d' % obj.id)
+        self.assertEqual(len(self.client.requests), 7)
+
+    def test_bulk_create_with_batch_length_mismatch(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        objs = [self.book_resource({'title': 'New %d' % i}) for i in range(3)]
+        batch = self.client.batch
+
+        def first_only(method, data):
+            status_code, content = batch(method, data)
+            return status_code, content[:1]
+
+        with mock.patch.object(self.client, 'batch', first_only):
+            result = self.book_resource.objects.bulk_create(objs, batch_size=2)
+
+        # Nothing is written back from a response for a different number of
+        # objects.
+        self.assertEqual([obj for obj, e in result.errors], objs[:2])
+        self.assertIsInstance(result.errors[0][1], RestServerException)
+        self.assertEqual([o.id for o in objs], [None, None, 28])
+
+    def test_bulk_create_connection_errors(self):
+        objs = [self.book_resource({'title': 'New %d' % i}) for i in range(3)]
+        request = self.client.request
+
+        def flaky_request(uri, method, data=None, *args, **kwargs):
+            if data and data.get('title') == 'New 1':
+                raise requests.ConnectionError('Connection refused')
+            return request(uri, method, data, *args, **kwargs)
+
+        with mock.patch.object(self.client, 'request', flaky_request):
+            result = self.book_resource.objects.bulk_create(objs)
+
+        self.assertEqual(result, objs)
+        self.assertEqual([obj for obj, e in result.errors], [objs[1]])
+        self.assertIsInstance(result.errors[0][1], requests.ConnectionError)
+        self.assertEqual(sorted(o.id for o in objs if o.id), [26, 27])
+
+    def test_bulk_update_with_batch(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        objs = self.book_resource.objects.all()[0:3]
+        for obj in objs:
+            obj.title = obj.title.upper()
+        result = self.book_resource.objects.bulk_update(objs, fields=['title'])
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(self.client.requests[-1],
+                         ('PATCH', 'http://localhost/api/book/batch/'))
+        self.assertEqual(self.client.books[2]['title'], 'BOOK 2')
+        self.assertEqual(self.client.books[2]['isbn'], '978-0000000002')
+
+    def test_bulk_update_concurrently(self):
+        objs = self.book_resource.objects.all()[0:3]
+        objs[1].title = ''
+        objs[2].title = 'Changed'
+        result = self.book_resource.objects.bulk_update(objs, fields=['title'])
+
+        self.assertEqual([obj for obj, e in result.errors], [objs[1]])
+        self.assertEqual(self.client.books[3]['title'], 'Changed')
+        self.assertEqual(
+            sorted(self.client.requests[-3:]),
+            [('PATCH', 'http://localhost/api/book/%d' % pk) for pk in (1, 2, 3)])
+
+    def test_bulk_update_unsaved(self):
+        for batch in (None, r'^book/batch/$'):
+            self.book_resource._meta.batch = batch
+            objs = self.book_resource.objects.all()[0:2]
+            objs.insert(1, self.book_resource({'title': 'New'}))
+            requests = len(self.client.requests)
+            result = self.book_resource.objects.bulk_update(objs)
+
+            self.assertEqual(result, objs)
+            self.assertEqual([obj for obj, e in result.errors], [objs[1]])
+            self.assertIsInstance(result.errors[0][1], ResourceException)
+            self.assertEqual(objs[1].id, None)
+            self.assertEqual(len(self.client.books), 25)
+            self.assertFalse(any(
+                method == 'POST'
+                for method, uri in self.client.requests[requests:]))
+
+
+class FanOutTests(QuerySetTestCase):
+
+    def test_delete(self):
+        counter = self.book_resource.objects.filter(in_stock='True').delete()
+        self.assertEqual(counter, {204: 17})
+        self.assertEqual(len(self.client.books), 8)
+        self.assertFalse(any(b['in_stock'] for b in self.client.books.values()))
+
+    def test_delete_pages_backwards(self):
+        self.book_resource.objects.all().delete()
+        self.assertEqual(self.client.books, {})
+        self.assertEqual(
+            [uri for method, uri in self.client.requests if method == 'GET'],
+            ['http://localhost/api/book/?page_size=10&page=%d' % page
+             for page in (1, 3, 2)])
+
+    def test_delete_with_batch(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        counter = self.book_resource.objects.all().delete()
+        self.assertEqual(counter, {204: 25})
+        self.assertEqual(self.client.books, {})
+        self.assertEqual(
+            [method for method, uri in self.client.requests].count('DELETE'), 3)
+
+    def test_update(self):
+        counter = self.book_resource.objects.filter(
+            author='1').update(title='Updated')
+        self.assertEqual(counter, {200: 3})
+        self.assertEqual(
+            [b['id'] for b in self.client.books.values()
+             if b['title'] == 'Updated'], [7, 14, 21])
+        self.assertEqual(self.client.books[7]['isbn'], '978-0000000007')
+
+    def test_update_with_batch(self):
+        self.book_resource._meta.batch = r'^book/batch/$'
+        counter = self.book_resource.objects.all().update(price='1.00')
+        self.assertEqual(counter, {200: 25})
+        self.assertEqual(
+            set(b['price'] for b in self.client.books.values()), set(['1.00']))
+        self.assertEqual(
+            [method for method, uri in self.client.requests].count('PATCH'), 3)
+
+    def test_empty(self):
+        self.assertEqual(self.book_resource.objects.all().none().delete(), {})
+        self.assertEqual(self.client.requests, [])
+
+
+class QueryCacheTests(QuerySetTestCase):
+
+    def setUp(self):
+        super(QueryCacheTests, self).setUp()
+        settings.QUERY_CACHE_TIMEOUT = 5
+
+    def tearDown(self):
+        from restorm.cache import query_cache
+        del settings.QUERY_CACHE_TIMEOUT
+        query_cache.clear()
+
+    def test_clones_share_results(self):
+        qs = self.book_resource.objects.filter(author='2')
+        self.assertEqual(qs.count(), 4)
+        self.assertEqual(len(self.client.requests), 1)
+
+        other = self.book_resource.objects.all().filter(author='2')
+        self.assertEqual(other.count(), 4)
+        self.assertTrue(other[0] is qs[0])
+        self.assertEqual(other.values_list('id', flat=True), [1, 8, 15, 22])
+        self.assertEqual(len(self.client.requests), 1)
+
+        self.book_resource.objects.filter(author='3').count()
+        self.book_resource.objects.all().only('title').filter(author='2').count()
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_save_invalidates(self):
+        book = self.book_resource.objects.all()[0]
+        book.title = 'Changed'
+        book.save()
+
+        self.assertEqual(self.book_resource.objects.all()[0].title, 'Changed')
+        self.assertEqual(
+            [m for m, uri in self.client.requests], ['GET', 'PUT', 'GET'])
+
+    def test_explicit_invalidation(self):
+        from restorm.cache import query_cache
+
+        self.book_resource.objects.all().count()
+        query_cache.invalidate(self.book_resource)
+        self.book_resource.objects.all().count()
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_expiry(self):
+        import mock
+
+        self.book_resource.objects.all().count()
+        with mock.patch('restorm.cache.time.time') as now:
+            now.return_value = 2 ** 40
+            self.book_resource.objects.all().count()
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_size(self):
+        from restorm.cache import query_cache
+        from restorm.conf import settings
+
+        settings.QUERY_CACHE_SIZE = 2
+        try:
+            for author in range(1, 5):
+                self.book_resource.objects.filter(author=author).count()
+            self.assertEqual(len(query_cache), 2)
+        finally:
+            del settings.QUERY_CACHE_SIZE
+
+    def test_failed_hydration(self):
+        import mock
+
+        qs = self.book_resource.objects.all()
+        with mock.patch.object(
+                type(qs), '_hydrate_row', side_effect=ValueError):
+            self.assertRaises(ValueError, qs.count)
+        # The page is not shared as fetched without its rows.
+        other = self.book_resource.objects.all()
+        self.assertEqual(other._pages_fetched, {})
+        self.assertEqual(other[0].id, 1)
+
+    def test_disabled(self):
+        settings.QUERY_CACHE_TIMEOUT = 0
+        self.book_resource.objects.all().count()
+        self.book_resource.objects.all().count()
+        self.assertEqual(len(self.client.requests), 2)
@@ -1,9 +1,16 @@
+import os
+import subprocess
+import sys
+
 from unittest2 import TestCase
 
+import restorm
+
 from restorm.examples.mock.api import LibraryApiClient, TicketApiClient
 from restorm import fields
 from restorm.resource import ResourceManager, ResourceOptions, Resource, SimpleResource
 from restorm.query import RestQuerySet
+from restorm.registry import registry
 from restorm.apps import RestormAppSetup
 
 
@@ -249,3 +256,113 @@ class SimpleResourceTests(TestCase):
         result = Book.objects.all()
         self.assertIsInstance(result, RestQuerySet)
         self.assertEqual(len(result), 2)
+
+
+class LazyPreparationTests(TestCase):
+    def setUp(self):
+        RestormAppSetup()
+        self.client = LibraryApiClient()
+
+        class Author(Resource):
+            id = fields.IntegerField(primary_key=True)
+            name = fields.CharField()
+
+            class Meta:
+                resource_name = 'lazy_author'
+                list = r'^author/$'
+                item = r'^author/(?P<id>\d)$'
+                client = self.client
+
+        self.author_resource = Author
+
+    def test_prepared_on_first_use(self):
+        Author = self.author_resource
+        self.assertTrue('_pending' in Author.__dict__)
+        self.assertTrue(Author in registry.deferred_resources)
+        self.assertIsInstance(Author.__dict__['name'], fields.CharField)
+
+        self.assertEqual(Author._meta.resource_name, 'lazy_author')
+        self.assertFalse('_pending' in Author.__dict__)
+        self.assertFalse(Author in registry.deferred_resources)
+        self.assertTrue(
+            registry.all_resources['test_resource']['lazy_author'] is Author)
+        self.assertEqual(Author._meta.pk.attname, 'id')
+        self.assertTrue(Author.objects.object_class is Author)
+
+    def test_instance(self):
+        author = self.author_resource({'id': 1, 'name': 'Author'})
+        self.assertEqual(author.name, 'Author')
+        self.assertEqual(
+            author._item_pattern.get_absolute_url(root='', id=1), 'author/1')
+        self.assertFalse('_pending' in self.author_resource.__dict__)
+
+    def test_subclass(self):
+        class Writer(self.author_resource):
+            bio = fields.CharField()
+
+            class Meta:
+                resource_name = 'lazy_writer'
+                list = r'^writer/$'
+                item = r'^writer/(?P<id>\d)$'
+                client = self.client
+
+        self.author_resource._meta
+        self.assertTrue('_pending' in Writer.__dict__)
+        self.assertEqual(
+            list(Writer._meta.get_fields()), ['id', 'name', 'bio'])
+        self.assertEqual(
+            list(self.author_resource._meta.get_fields()), ['id', 'name'])
+        self.assertTrue(Writer.objects.object_class is Writer)
+        self.assertTrue(
+            self.author_resource.objects.object_class is self.author_resource)
+
+    def test_prepare_resources(self):
+        registry.prepare_resources()
+        self.assertEqual(registry.deferred_resources, [])
+        self.assertFalse('_pending' in self.author_resource.__dict__)
+
+
+class WithoutDjangoTests(TestCase):
+    # Runs code in a new process, as the tests themselves load Django.
+    def run_python(self, code):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(
+            restorm.__file__)))
+        return subprocess.check_output(
+            [sys.executable, '-c', code], cwd=root).strip()
+
+    def test_import(self):
+        code = (
+            'import sys\n'
+            'import restorm.clients.jsonclient\n'
+            'from restorm import fields\n'
+            'from restorm.examples.mock.api import CatalogApiClient\n'
+            'from restorm.resource import Resource\n'
+            'class Book(Resource):\n'
+            '    id = fields.IntegerField(primary_key=True)\n'
+            '    author = fields.ToOneField("author", "__main__.Book")\n'
+            '    class Meta:\n'
+            '        list = r"^book/$"\n'
+            '        item = r"^book/(?P<id>\\d+)$"\n'
+            '        client = CatalogApiClient(size=2)\n'
+            'assert Book.objects.get(id=2).pk == 2\n'
+            'assert Book.author.rel.to is Book\n'
+            'print(",".join(m for m in sys.modules if m.startswith("django")))\n'
+        )
+        self.assertEqual(self.run_python(code), b'')
+
+    def test_app_label(self):
+        # The app label does not depend on whether Django was imported, as
+        # long as its apps are not set up.
+        code = (
+            '%s'
+            'from restorm import fields\n'
+            'from restorm.resource import Resource\n'
+            'class Book(Resource):\n'
+            '    id = fields.IntegerField(primary_key=True)\n'
+            '    class Meta:\n'
+            '        list = r"^book/$"\n'
+            'print(Book._meta.app_label)\n'
+        )
+        self.assertEqual(self.run_python(code % ''), b'__main__')
+        self.assertEqual(
+            self.run_python(code % 'import django.apps\n'), b'__main__')
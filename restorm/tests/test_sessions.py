@@ -0,0 +1,127 @@
+from unittest2 import TestCase
+
+import restorm
+from restorm import fields
+from restorm.apps import RestormAppSetup
+from restorm.cache import query_cache
+from restorm.examples.mock.api import LibraryApiClient
+from restorm.middleware import SessionMiddleware
+from restorm.resource import Resource
+from restorm.sessions import get_session
+from restorm.tests.test_query import QuerySetTestCase
+
+
+class RecordingLibraryApiClient(LibraryApiClient):
+    def __init__(self, *args, **kwargs):
+        self.requests = []
+        super(RecordingLibraryApiClient, self).__init__(*args, **kwargs)
+
+    def get_response_from_request(self, request):
+        self.requests.append((request.method, request.uri))
+        return super(RecordingLibraryApiClient, self).get_response_from_request(
+            request)
+
+
+class SessionTests(QuerySetTestCase):
+
+    def tearDown(self):
+        query_cache.clear()
+
+    def test_get(self):
+        with restorm.session() as session:
+            book = self.book_resource.objects.get(id=3)
+            self.assertTrue(self.book_resource.objects.get(id='3') is book)
+            self.assertTrue(book in session)
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertFalse(self.book_resource.objects.get(id=3) is book)
+
+    def test_list_and_get(self):
+        with restorm.session():
+            first = self.book_resource.objects.all()[0]
+            self.assertTrue(self.book_resource.objects.get(id=1) is first)
+            query_cache.clear()
+            self.assertTrue(self.book_resource.objects.all()[0] is first)
+            self.assertTrue(
+                self.book_resource.objects.filter(author=2)[0] is first)
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_list_refreshes_instance(self):
+        with restorm.session():
+            book = self.book_resource.objects.get(id=1)
+            self.client.books[1]['title'] = 'Changed'
+            self.assertTrue(self.book_resource.objects.all()[0] is book)
+            self.assertEqual(book.title, 'Changed')
+
+    def test_in_bulk(self):
+        with restorm.session():
+            book = self.book_resource.objects.get(id=3)
+            books = self.book_resource.objects.in_bulk([3, 4, 5])
+            self.assertTrue(books[3] is book)
+            self.assertEqual(
+                sorted(uri for method, uri in self.client.requests[1:]),
+                ['http://localhost/api/book/4', 'http://localhost/api/book/5'])
+            self.assertEqual(len(get_session()), 3)
+
+    def test_create_and_delete(self):
+        with restorm.session() as session:
+            book = self.book_resource.objects.create(title='New')
+            self.assertTrue(self.book_resource.objects.get(id=26) is book)
+            book.delete()
+            self.assertFalse(book in session)
+
+    def test_nested(self):
+        with restorm.session() as outer:
+            with restorm.session() as inner:
+                self.assertTrue(get_session() is inner)
+            self.assertTrue(get_session() is outer)
+        self.assertTrue(get_session() is None)
+
+    def test_middleware(self):
+        def view(request):
+            first = self.book_resource.objects.get(id=1)
+            return first is self.book_resource.objects.get(id=1)
+
+        self.assertTrue(SessionMiddleware(view)(None))
+        self.assertTrue(get_session() is None)
+
+
+class RelatedSessionTests(TestCase):
+
+    def setUp(self):
+        RestormAppSetup()
+        self.client = RecordingLibraryApiClient()
+
+        class Author(Resource):
+            id = fields.IntegerField(primary_key=True)
+            name = fields.CharField()
+
+            class Meta:
+                resource_name = 'session_author'
+                list = (r'^author/$', 'author_set')
+                item = r'^author/(?P<id>\d)$'
+                client = self.client
+
+        def get_author_id(data, resource):
+            return {'id': data.split('/')[-1]}
+
+        class Book(Resource):
+            isbn = fields.CharField(primary_key=True)
+            title = fields.CharField()
+            author = fields.ToOneField('author', Author, get_author_id)
+
+            class Meta:
+                resource_name = 'session_book'
+                list = r'^book/$'
+                item = r'^book/(?P<isbn>[\d-]+)$'
+                client = self.client
+
+        self.author_resource = Author
+        self.book_resource = Book
+
+    def test_related_resources(self):
+        with restorm.session():
+            book = self.book_resource.objects.get(isbn='978-1441413024')
+            author = book.author
+            self.assertTrue(book.author is author)
+            self.assertTrue(self.author_resource.objects.get(id=1) is author)
+        self.assertEqual(len(self.client.requests), 2)
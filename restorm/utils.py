@@ -1,14 +1,10 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from importlib import import_module
 import re
 import sys
 
-from django.utils import six
-try:
-    # Django versions >= 1.9
-    from django.utils.module_loading import import_module
-except ImportError:
-    # Django versions < 1.9
-    from django.utils.importlib import import_module
-
 
 def reverse(pattern, **kwargs):
     template = pattern.strip('^$')
@@ -27,6 +23,68 @@ def reverse(pattern, **kwargs):
     return result
 
 
+def import_string(dotted_path):
+    """
+    Imports a dotted module path and returns the attribute or class
+    designated by the last name in the path, like Django's
+    ``import_string()``. Raises ``ImportError`` if the import failed.
+    """
+    try:
+        module_path, class_name = dotted_path.rsplit('.', 1)
+    except ValueError as e:
+        raise ImportError(
+            "%s doesn't look like a module path" % dotted_path) from e
+
+    module = import_module(module_path)
+    try:
+        return getattr(module, class_name)
+    except AttributeError as e:
+        raise ImportError(
+            'Module "%s" does not define a "%s" attribute/class' % (
+                module_path, class_name)) from e
+
+
+def concurrent_map(func, iterable, max_workers=None):
+    """
+    Yields ``func(item)`` for each item in ``iterable``, in order, while
+    calling ``func`` from at most ``max_workers`` threads at the same time.
+
+    Items are consumed from ``iterable`` as results are yielded, so long or
+    lazy iterables are never held in memory as a whole. Exceptions raised by
+    ``func`` are raised when the corresponding result is yielded.
+    """
+    from restorm.profiler import _fan_out, get_call_site
+
+    if max_workers is None:
+        from restorm.conf import settings
+        max_workers = settings.MAX_CONCURRENT_REQUESTS
+
+    # The stack of the worker threads does not include the caller.
+    call_site = get_call_site()
+
+    if not max_workers or max_workers <= 1:
+        for item in iterable:
+            # Mark the calls as fanned out like the threaded ones, without
+            # leaking into the caller's context while suspended.
+            context = copy_context()
+            context.run(_fan_out.set, (call_site,))
+            yield context.run(func, item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in iterable:
+            # Run in a copy of the current context, such that the current
+            # session is also used by the worker threads.
+            context = copy_context()
+            context.run(_fan_out.set, (call_site,))
+            pending.append(executor.submit(context.run, func, item))
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class patch(object):
     def __init__(self, dotted_path, new):
         self._dotted_path = dotted_path
@@ -35,7 +93,7 @@ class patch(object):
             module_path, class_name = self._dotted_path.rsplit('.', 1)
         except ValueError:
             msg = "%s doesn't look like a module path" % dotted_path
-            six.reraise(ImportError, ImportError(msg), sys.exc_info()[2])
+            raise ImportError(msg).with_traceback(sys.exc_info()[2])
         self._module_path = module_path
         self._class_name = class_name
         self._module = import_module(self._module_path)
@@ -44,7 +102,7 @@ class patch(object):
         except AttributeError:
             msg = 'Module "%s" does not define a "%s" attribute/class' % (
                 self._module_path, self._class_name)
-            six.reraise(ImportError, ImportError(msg), sys.exc_info()[2])
+            raise ImportError(msg).with_traceback(sys.exc_info()[2])
 
     def __enter__(self):
         setattr(self._module, self._class_name, self._new)
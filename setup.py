@@ -22,6 +22,7 @@ tests_require = [
     'nose',
     'unittest2',
     'mock',
+    'django-debug-toolbar',
     'oauth2', # For Twitter example.
 ]
 